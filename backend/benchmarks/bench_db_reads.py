@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark: podcast list reads on the sync session vs the async session.
+
+Starts a throwaway uvicorn server process with two copies of the podcast list
+query (newest first, one page):
+  /sync   - the old handler, a sync Session used inside ``async def``
+  /async  - database.get_async_db with select() and ``await db.execute``
+then keeps 100 keep-alive clients busy against each and reports requests per
+second and latency.
+
+The default database is a temporary SQLite file seeded with podcasts. Pass
+--database-url postgresql://... to measure against a real server, which is
+where the blocking sync driver hurts most.
+
+Usage (from backend/):
+    python benchmarks/bench_db_reads.py [--clients 100] [--seconds 10] [--database-url URL]
+
+Requests that take longer than --request-timeout are counted as errors.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import uvicorn
+
+SEED_PODCASTS = 500
+PAGE_SIZE = 20
+
+
+def seed(database_url: str) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    from database import Base, SessionLocal, engine
+    from models import Podcast
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(Podcast).count() < SEED_PODCASTS:
+            db.add_all([
+                Podcast(
+                    title=f"Episode {i}",
+                    host="Host",
+                    type="episode",
+                    category="faith",
+                    description="Benchmark episode " * 20,
+                    audio_url=f"/storage/podcasts/audio/episode{i}.m4a",
+                )
+                for i in range(SEED_PODCASTS)
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+def build_app():
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+
+    from database import get_async_db, get_db
+    from models import Podcast
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/sync")
+    async def sync_reads(db: Session = Depends(get_db)):
+        podcasts = db.query(Podcast).order_by(Podcast.publish_date.desc()).limit(PAGE_SIZE).all()
+        return [{"id": p.id, "title": p.title} for p in podcasts]
+
+    @app.get("/async")
+    async def async_reads(db: AsyncSession = Depends(get_async_db)):
+        result = await db.execute(select(Podcast).order_by(Podcast.publish_date.desc()).limit(PAGE_SIZE))
+        return [{"id": p.id, "title": p.title} for p in result.scalars().all()]
+
+    return app
+
+
+def serve(database_url: str, port: int) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    uvicorn.run(build_app(), host="127.0.0.1", port=port, log_level="warning")
+
+
+def wait_for_server(base_url: str) -> None:
+    for _ in range(200):
+        try:
+            httpx.get(f"{base_url}/ping")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("benchmark server did not start")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def fetch(reader, writer, request: bytes) -> bytes:
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+    await reader.readexactly(length)
+    return head
+
+
+async def run_scenario(host: str, port: int, path: str, clients: int, seconds: float, timeout: float) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+
+    async def client():
+        # Raw keep-alive HTTP/1.1 so the client side stays cheap
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        while time.perf_counter() < deadline:
+            began = time.perf_counter()
+            try:
+                head = await asyncio.wait_for(fetch(reader, writer, request), timeout)
+            except asyncio.TimeoutError:
+                # Stalled request: count it and start over on a fresh connection
+                errors += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors += 1
+            latencies.append(time.perf_counter() - began)
+        writer.close()
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - began
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else float("nan"),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--request-timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seeder = multiprocessing.Process(target=seed, args=(database_url,))
+        seeder.start()
+        seeder.join()
+
+        print(f"{args.clients} concurrent clients, {args.seconds:.0f}s per scenario, "
+              f"{PAGE_SIZE} podcasts per page ({database_url.split(':', 1)[0]})")
+        print(f"{'scenario':<8} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name in ("sync", "async"):
+            # Fresh server per scenario so a stalled pool cannot leak into the next one
+            port = free_port()
+            server = multiprocessing.Process(target=serve, args=(database_url, port), daemon=True)
+            server.start()
+            wait_for_server(f"http://127.0.0.1:{port}")
+
+            result = asyncio.run(run_scenario("127.0.0.1", port, f"/{name}", args.clients, args.seconds,
+                                               args.request_timeout))
+            print(f"{name:<8} {result['requests']:>9} {result['rps']:>9.1f} "
+                  f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['errors']:>7}")
+
+            # kill, not terminate: a graceful shutdown waits on stalled requests
+            server.kill()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
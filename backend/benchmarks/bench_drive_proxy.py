@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first byte for the Google Drive audio proxy.
+
+Runs a local HTTPS stand-in for Drive (self-signed certificate) that answers
+``/uc?export=open&id=...`` with a redirect to ``/download/<id>`` after a small
+delay, the way drive.google.com bounces to its content host. Compares:
+  per-play  - a new httpx.AsyncClient per play (the old proxy behaviour)
+  shared    - utils.drive_client with the pooled client and redirect cache
+
+Usage (from backend/):
+    python benchmarks/bench_drive_proxy.py [--plays 200] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+FILE_IDS = [f"file{i}" for i in range(10)]
+BODY_SIZE = 512 * 1024
+
+
+def build_standin(redirect_delay: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/uc")
+    async def uc(id: str, export: str = "open"):
+        await asyncio.sleep(redirect_delay)
+        return RedirectResponse(f"/download/{id}", status_code=303)
+
+    @app.get("/download/{file_id}")
+    async def download(file_id: str):
+        async def body():
+            chunk = b"\0" * 65536
+            for _ in range(BODY_SIZE // len(chunk)):
+                yield chunk
+        return StreamingResponse(body(), media_type="audio/mp4")
+
+    return app
+
+
+def write_self_signed_cert(directory: str):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+def serve(port: int, cert_path: str, key_path: str, redirect_delay: float) -> None:
+    uvicorn.run(
+        build_standin(redirect_delay),
+        host="127.0.0.1",
+        port=port,
+        ssl_certfile=cert_path,
+        ssl_keyfile=key_path,
+        log_level="warning",
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def play_per_client(file_id: str) -> float:
+    from utils.drive_client import drive_download_url
+
+    began = time.perf_counter()
+    first_byte = None
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async with client.stream("GET", drive_download_url(file_id), follow_redirects=True) as response:
+            async for _ in response.aiter_bytes(chunk_size=8192):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - began
+    return first_byte
+
+
+async def play_shared(file_id: str) -> float:
+    from utils.drive_client import open_drive_stream
+
+    began = time.perf_counter()
+    first_byte = None
+    stream = await open_drive_stream(file_id)
+    try:
+        # Drain the body like a listener would so the connection is reused
+        async for _ in stream.iter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - began
+    finally:
+        await stream.aclose()
+    return first_byte
+
+
+async def run_scenario(play, plays: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one(index: int):
+        async with semaphore:
+            timings.append(await play(FILE_IDS[index % len(FILE_IDS)]))
+
+    await asyncio.gather(*(one(i) for i in range(plays)))
+    return timings
+
+
+async def run_all(plays: int, concurrency: int) -> None:
+    from utils.drive_client import close_drive_client, start_drive_client
+
+    print(f"{plays} plays, concurrency {concurrency}, TTFB in ms")
+    print(f"{'scenario':<10} {'mean':>8} {'p50':>8} {'p99':>8}")
+    for name, play in (("per-play", play_per_client), ("shared", play_shared)):
+        await start_drive_client()
+        timings = await run_scenario(play, plays, concurrency)
+        await close_drive_client()
+        print(f"{name:<10} {statistics.mean(timings) * 1000:>8.1f} "
+              f"{statistics.median(timings) * 1000:>8.1f} {percentile(timings, 99) * 1000:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plays", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--redirect-delay-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path, key_path = write_self_signed_cert(tmp)
+        port = free_port()
+        server = multiprocessing.Process(
+            target=serve,
+            args=(port, cert_path, key_path, args.redirect_delay_ms / 1000),
+            daemon=True,
+        )
+        server.start()
+
+        # Point the proxy at the stand-in and trust its certificate
+        os.environ["SSL_CERT_FILE"] = cert_path
+        os.environ["DRIVE_DOWNLOAD_URL"] = f"https://127.0.0.1:{port}/uc"
+        for _ in range(100):
+            try:
+                httpx.get(f"https://127.0.0.1:{port}/download/ping", verify=cert_path)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        asyncio.run(run_all(args.plays, args.concurrency))
+
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Benchmark: login throughput with bcrypt on the event loop vs the hash pool.
+
+Starts a throwaway uvicorn server process with two copies of the login check
+(look up the user, verify the password, issue a token):
+  /blocking  - the old handler, verify_password called inside ``async def``
+  /pooled    - utils.auth.verify_password_async (bounded pool, 503 when full)
+While --clients keep-alive clients log in as fast as they can, one more
+client requests /ping, which stands in for everything else the server does
+(streaming, listing podcasts). The ping latency shows how long the event loop
+is held up by hashing.
+
+The default database is a temporary SQLite file with one user. Pass
+--rounds to hash the user's password with another bcrypt cost.
+
+Usage (from backend/):
+    python benchmarks/bench_login.py [--clients 20] [--seconds 10] [--rounds 12]
+
+Rejected logins (503 from the pool) are counted separately from errors.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import uvicorn
+
+USERNAME = "bench"
+PASSWORD = "correct horse battery staple"
+
+
+def seed(database_url: str, rounds: int) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["BCRYPT_ROUNDS"] = str(rounds)
+    from database import Base, SessionLocal, engine
+    from models import User
+    from utils.auth import get_password_hash
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(User).filter(User.username == USERNAME).first() is None:
+            db.add(User(
+                email="bench@example.com",
+                username=USERNAME,
+                full_name="Benchmark User",
+                hashed_password=get_password_hash(PASSWORD),
+            ))
+            db.commit()
+    finally:
+        db.close()
+
+
+def build_app():
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from database import get_async_db
+    from models import User
+    from schemas import LoginRequest
+    from utils.auth import create_access_token, verify_password, verify_password_async
+
+    app = FastAPI()
+
+    async def load_user(db: AsyncSession, username: str) -> User:
+        result = await db.execute(select(User).where(User.username == username))
+        user = result.scalars().first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return user
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/blocking")
+    async def blocking_login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+        user = await load_user(db, login_data.username)
+        if not verify_password(login_data.password, user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {"access_token": create_access_token({"sub": user.username})}
+
+    @app.post("/pooled")
+    async def pooled_login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+        user = await load_user(db, login_data.username)
+        verified, _ = await verify_password_async(login_data.password, user.hashed_password)
+        if not verified:
+            raise HTTPException(status_code=401)
+        return {"access_token": create_access_token({"sub": user.username})}
+
+    return app
+
+
+def serve(database_url: str, port: int, rounds: int) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["BCRYPT_ROUNDS"] = str(rounds)
+    uvicorn.run(build_app(), host="127.0.0.1", port=port, log_level="warning")
+
+
+def wait_for_server(base_url: str) -> None:
+    for _ in range(200):
+        try:
+            httpx.get(f"{base_url}/ping")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("benchmark server did not start")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def fetch(reader, writer, request: bytes) -> bytes:
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+    await reader.readexactly(length)
+    return head
+
+
+async def run_scenario(host: str, port: int, path: str, clients: int, seconds: float, timeout: float) -> dict:
+    latencies = []
+    ping_latencies = []
+    errors = 0
+    rejected = 0
+    deadline = time.perf_counter() + seconds
+    body = json.dumps({"username": USERNAME, "password": PASSWORD}).encode()
+    login_request = (
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+    ping_request = f"GET /ping HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+
+    async def client():
+        # Raw keep-alive HTTP/1.1 so the client side stays cheap
+        nonlocal errors, rejected
+        reader, writer = await asyncio.open_connection(host, port)
+        while time.perf_counter() < deadline:
+            began = time.perf_counter()
+            try:
+                head = await asyncio.wait_for(fetch(reader, writer, login_request), timeout)
+            except asyncio.TimeoutError:
+                errors += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            if head.startswith(b"HTTP/1.1 503"):
+                rejected += 1
+                await asyncio.sleep(0.05)
+                continue
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors += 1
+            latencies.append(time.perf_counter() - began)
+        writer.close()
+
+    async def pinger():
+        reader, writer = await asyncio.open_connection(host, port)
+        while time.perf_counter() < deadline:
+            began = time.perf_counter()
+            await fetch(reader, writer, ping_request)
+            ping_latencies.append(time.perf_counter() - began)
+            await asyncio.sleep(0.01)
+        writer.close()
+
+    began = time.perf_counter()
+    await asyncio.gather(pinger(), *(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - began
+
+    return {
+        "logins": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else float("nan"),
+        "ping_p99_ms": percentile(ping_latencies, 99) * 1000 if ping_latencies else float("nan"),
+        "rejected": rejected,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seeder = multiprocessing.Process(target=seed, args=(database_url, args.rounds))
+        seeder.start()
+        seeder.join()
+
+        print(f"{args.clients} concurrent clients, {args.seconds:.0f}s per scenario, bcrypt cost {args.rounds}")
+        print(f"{'scenario':<9} {'logins':>7} {'login/s':>8} {'p50 ms':>9} {'p99 ms':>9} "
+              f"{'ping p99':>9} {'503s':>6} {'errors':>7}")
+        for name in ("blocking", "pooled"):
+            port = free_port()
+            server = multiprocessing.Process(target=serve, args=(database_url, port, args.rounds), daemon=True)
+            server.start()
+            wait_for_server(f"http://127.0.0.1:{port}")
+
+            result = asyncio.run(run_scenario("127.0.0.1", port, f"/{name}", args.clients, args.seconds,
+                                               args.request_timeout))
+            print(f"{name:<9} {result['logins']:>7} {result['rps']:>8.1f} {result['p50_ms']:>9.1f} "
+                  f"{result['p99_ms']:>9.1f} {result['ping_p99_ms']:>9.1f} {result['rejected']:>6} "
+                  f"{result['errors']:>7}")
+
+            server.kill()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local podcast Range requests, legacy generator vs range engine.
+
+Starts a throwaway uvicorn server process with two endpoints serving the same file:
+  /legacy  - the old 8 KiB blocking-read async generator
+  /engine  - utils.streaming.RangeFileResponse
+then runs 50 concurrent clients that keep seeking to random offsets, while a
+probe client pings /ping to measure how long other requests are stalled.
+
+Usage (from backend/):
+    python benchmarks/bench_range_streaming.py [--clients 50] [--seconds 10]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import multiprocessing
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from utils.streaming import RangeFileResponse, parse_range_header
+
+FILE_SIZE = 64 * 1024 * 1024
+RANGE_SIZE = 1024 * 1024
+
+
+def build_app(file_path: str) -> FastAPI:
+    app = FastAPI()
+    file_size = os.path.getsize(file_path)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/legacy")
+    async def legacy(request: Request):
+        start, end = parse_range_header(request.headers["range"], file_size)
+        content_length = end - start + 1
+
+        async def generate_range():
+            with open(file_path, "rb") as f:
+                f.seek(start)
+                remaining = content_length
+                while remaining > 0:
+                    chunk = f.read(min(8192, remaining))
+                    if not chunk:
+                        break
+                    yield chunk
+                    remaining -= len(chunk)
+
+        return StreamingResponse(
+            generate_range(),
+            status_code=206,
+            media_type="audio/mp4",
+            headers={
+                "Content-Range": f"bytes {start}-{end}/{file_size}",
+                "Content-Length": str(content_length),
+            },
+        )
+
+    @app.get("/engine")
+    async def engine(request: Request):
+        start, end = parse_range_header(request.headers["range"], file_size)
+        return RangeFileResponse(file_path, start=start, end=end, file_size=file_size, media_type="audio/mp4")
+
+    return app
+
+
+def serve(file_path: str, port: int) -> None:
+    uvicorn.run(build_app(file_path), host="127.0.0.1", port=port, log_level="warning")
+
+
+def wait_for_server(base_url: str) -> None:
+    for _ in range(100):
+        try:
+            httpx.get(f"{base_url}/ping")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("benchmark server did not start")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_scenario(base_url: str, path: str, clients: int, seconds: float) -> dict:
+    latencies = []
+    probe_latencies = []
+    total_bytes = 0
+    deadline = time.perf_counter() + seconds
+
+    host, port = base_url.rsplit("/", 1)[1].split(":")
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+
+        async def listener():
+            # Raw keep-alive HTTP/1.1 so the client side stays cheap and the
+            # numbers reflect the server
+            nonlocal total_bytes
+            reader, writer = await asyncio.open_connection(host, int(port))
+            while time.perf_counter() < deadline:
+                start = random.randrange(0, FILE_SIZE - RANGE_SIZE)
+                began = time.perf_counter()
+                writer.write(
+                    f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+                    f"Range: bytes={start}-{start + RANGE_SIZE - 1}\r\n\r\n".encode()
+                )
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+                remaining = length
+                while remaining:
+                    remaining -= len(await reader.read(min(remaining, 1024 * 1024)))
+                latencies.append(time.perf_counter() - began)
+                total_bytes += length
+            writer.close()
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                began = time.perf_counter()
+                await client.get("/ping")
+                probe_latencies.append(time.perf_counter() - began)
+                await asyncio.sleep(0.05)
+
+        began = time.perf_counter()
+        await asyncio.gather(probe(), *(listener() for _ in range(clients)))
+        elapsed = time.perf_counter() - began
+
+    return {
+        "requests": len(latencies),
+        "throughput_mb_s": total_bytes / elapsed / (1024 * 1024),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "probe_p99_ms": percentile(probe_latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "episode.m4a")
+        with open(file_path, "wb") as f:
+            f.write(os.urandom(FILE_SIZE))
+
+        port = free_port()
+        server = multiprocessing.Process(target=serve, args=(file_path, port), daemon=True)
+        server.start()
+        base_url = f"http://127.0.0.1:{port}"
+        wait_for_server(base_url)
+
+        print(f"{args.clients} concurrent seeking clients, {args.seconds:.0f}s per scenario, "
+              f"{RANGE_SIZE // 1024} KiB ranges of a {FILE_SIZE // (1024 * 1024)} MiB file")
+        print(f"{'scenario':<8} {'requests':>9} {'MiB/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'ping p99':>9}")
+        for name in ("legacy", "engine"):
+            result = asyncio.run(run_scenario(base_url, f"/{name}", args.clients, args.seconds))
+            print(f"{name:<8} {result['requests']:>9} {result['throughput_mb_s']:>9.1f} "
+                  f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['probe_p99_ms']:>9.1f}")
+
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Check and benchmark the fast JSON path for list endpoints (utils/fast_json.py).
+
+Seeds a temporary SQLite database with catalog rows (long descriptions and
+transcripts, non-ASCII text, empty optional fields) and, for every
+RowSerializer used by a list route, compares:
+  schema - the old path: ORM objects -> Schema.model_validate().model_dump()
+           -> FastAPI's response validation -> Pydantic dump_json
+  fast   - column select -> RowSerializer.to_dicts() -> encode_json()
+with every deferred field included. The bodies must match byte for byte; any
+difference is printed and the script exits with status 1. The size of a
+default page (deferred fields left out) is shown next to it. It then times both paths on one page of podcasts,
+with the query (a response cache miss) and from already loaded rows (a hit:
+FastAPI's validation and encoding vs encode_json alone).
+
+Usage (from backend/):
+    python benchmarks/bench_serializers.py [--rows 100] [--repeat 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PARAGRAPH = "Faith, family and the road to greatness — “quoted”, naïve, 日本語, emoji 🙏. " * 12
+
+
+def seed(rows: int) -> None:
+    from database import Base, SessionLocal, engine
+    from models import Announcement, Devotional, Event, GeniusAcademyCourse, LibraryItem, Podcast, User
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(email="bench@example.com", username="bench", full_name="Bench", is_admin=True)
+        db.add(user)
+        db.flush()
+        start = datetime(2024, 1, 1, 6, 30, 0, 123456)
+        for i in range(rows):
+            when = start + timedelta(days=i, seconds=i * 7)
+            with_extras = i % 3 != 0
+            db.add(Podcast(
+                title=f"Episode {i}: Walking in purpose", host="Pastor Host", type="sermon", category="faith",
+                description=PARAGRAPH, transcript=PARAGRAPH * 20 if with_extras else None,
+                cover=f"/storage/podcasts/covers/c{i}.jpg" if with_extras else None,
+                audio_url=f"/storage/podcasts/audio/e{i}.m4a", duration="42:10", tags="faith,family",
+                rating=4.5 + i / 1000, plays=i * 31, publish_date=when,
+                duration_seconds=2530.25 if with_extras else None, bitrate=128000, sample_rate=44100,
+                audio_codec="mp4a.40.2", faststart=with_extras, peaks_version="abcdef123456" if with_extras else None,
+                created_by=user.id,
+            ))
+            db.add(LibraryItem(
+                title=f"Book {i}", author="Author", author_id=user.id, type="book", category="growth",
+                description=PARAGRAPH, content=PARAGRAPH * 10 if with_extras else None,
+                preview_content=PARAGRAPH if with_extras else None, is_free=bool(i % 2), price=9.99 if i % 2 == 0 else None,
+                cover_image=f"/storage/library/covers/b{i}.png" if with_extras else None,
+                rating=0.0, downloads=i, views=i * 3, publish_date=when,
+            ))
+            db.add(Event(
+                title=f"Gathering {i}", description=PARAGRAPH, category="worship", date=when, time="18:00",
+                location="Main hall", max_attendees=200 if with_extras else None, featured=bool(i % 2),
+                image=f"/storage/events/images/g{i}.webp" if with_extras else None, current_attendees=i,
+                created_by=user.id,
+            ))
+            db.add(Devotional(
+                title=f"Morning word {i}", scripture="John 3:16", verse=PARAGRAPH, author="Author",
+                content=PARAGRAPH * 5, read_time="5 min", date=when, featured=bool(i % 2), created_by=user.id,
+            ))
+            db.add(GeniusAcademyCourse(
+                title=f"Course {i}", instructor="Coach", category="leadership", level="beginner",
+                description=PARAGRAPH, price=49.0, original_price=99.5 if with_extras else None,
+                sessions=8, start_date=when if with_extras else None, curriculum=PARAGRAPH * 4,
+                features=PARAGRAPH, cover=f"/storage/courses/covers/k{i}.jpg" if with_extras else None,
+                students=i, rating=4.0, is_enrolled=False, created_by=user.id,
+            ))
+            db.add(Announcement(
+                title=f"Notice {i}", content=PARAGRAPH, priority=("high", "medium", "low")[i % 3],
+                expires_at=when + timedelta(days=365) if with_extras else None, is_active=True,
+                date=when, created_by=user.id,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def schema_path(db, serializer, limit):
+    """What the routes did before: validate ORM rows, then FastAPI validates and dumps again."""
+    from typing import List
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+
+    model, schema = serializer.model, serializer.schema
+    objects = db.execute(select(model).order_by(model.id).limit(limit)).scalars().all()
+    body = [schema.model_validate(obj).model_dump() for obj in objects]
+    adapter = TypeAdapter(List[schema])
+    return adapter.dump_json(adapter.validate_python(body), by_alias=True)
+
+
+def fast_path(db, serializer, limit, included=None):
+    from utils.fast_json import encode_json
+
+    if included is None:
+        included = serializer.deferred
+    rows = db.execute(serializer.select(included).order_by(serializer.model.id).limit(limit)).all()
+    return encode_json(serializer.to_dicts(rows))
+
+
+def encode_cached_schema(serializer, body):
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(List[serializer.schema])
+    return adapter.dump_json(adapter.validate_python(body), by_alias=True)
+
+
+def encode_cached_fast(serializer, body):
+    from utils.fast_json import encode_json
+
+    return encode_json(body)
+
+
+def best_of(repeat, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - began)
+    return min(timings) * 1000
+
+
+def first_difference(expected: bytes, actual: bytes) -> str:
+    index = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), min(len(expected), len(actual)))
+    return f"at byte {index}: schema {expected[max(0, index - 60):index + 60]!r}\n" \
+           f"{' ' * (len(str(index)) + 10)}fast   {actual[max(0, index - 60):index + 60]!r}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(args.rows)
+
+        from database import SessionLocal
+        from routes.announcements import announcement_rows
+        from routes.courses import course_rows
+        from routes.devotionals import devotional_rows
+        from routes.events import event_rows
+        from routes.library import library_rows
+        from routes.podcasts import podcast_rows
+        from utils.fast_json import orjson
+
+        print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'pydantic_core.to_json'}")
+        serializers = [podcast_rows, library_rows, event_rows, devotional_rows, course_rows, announcement_rows]
+        db = SessionLocal()
+        failed = False
+        try:
+            for serializer in serializers:
+                expected = schema_path(db, serializer, args.rows)
+                actual = fast_path(db, serializer, args.rows)
+                default_page = fast_path(db, serializer, args.rows, included=())
+                same = expected == actual
+                failed |= not same
+                print(f"  {serializer.schema.__name__:<20} {len(actual):>9} bytes  {'identical' if same else 'DIFFERENT'}"
+                      f"  default page {len(default_page):>9} bytes (without {', '.join(serializer.deferred) or '-'})")
+                if not same:
+                    print("    " + first_difference(expected, actual))
+
+            body = podcast_rows.to_dicts(
+                db.execute(podcast_rows.select(podcast_rows.deferred).order_by(podcast_rows.model.id).limit(args.rows)).all()
+            )
+            print(f"\n{args.rows} podcasts per page, best of {args.repeat} (ms per page)")
+            print(f"{'path':<8} {'cache miss':>11} {'cache hit':>10}")
+            for name, path, cached in (
+                ("schema", schema_path, encode_cached_schema),
+                ("fast", fast_path, encode_cached_fast),
+            ):
+                miss = best_of(args.repeat, path, db, podcast_rows, args.rows)
+                hit = best_of(args.repeat, cached, podcast_rows, body)
+                print(f"{name:<8} {miss:>11.2f} {hit:>10.2f}")
+        finally:
+            db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 
 # Database URL - Railway provides both DATABASE_URL (internal) and DATABASE_PUBLIC_URL (external)
@@ -55,15 +56,7 @@ try:
     )
     print(f"✅ Database engine created successfully")
     print(f"   Database type: {'SQLite' if DATABASE_URL.startswith('sqlite') else 'PostgreSQL'}")
-    # Test the connection
-    try:
-        from sqlalchemy import text
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        print(f"   ✅ Database connection test passed")
-    except Exception as conn_error:
-        print(f"   ⚠️  Database connection test failed: {conn_error}")
-        print(f"   Server will start, but database operations may fail")
+    # No connection is made here; check_database_connection() runs at startup
 except Exception as e:
     print(f"❌ Error creating database engine: {e}")
     print(f"   DATABASE_URL: {DATABASE_URL[:50]}..." if len(DATABASE_URL) > 50 else f"   DATABASE_URL: {DATABASE_URL}")
@@ -71,9 +64,59 @@ except Exception as e:
     print(f"   ⚠️  Continuing without database connection (app may have limited functionality)")
     raise  # Re-raise for now, but we could make this more graceful
 
+def check_database_connection() -> bool:
+    """Run SELECT 1 against the database; returns whether it succeeded."""
+    try:
+        from sqlalchemy import text
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        print(f"✅ Database connection verified")
+        return True
+    except Exception as conn_error:
+        print(f"⚠️  Database connection test failed: {conn_error}")
+        return False
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers, so queries don't block the event loop.
+# The sync engine above stays for writes and scripts (init_db.py, view_database.py, ...)
+def get_async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://") or url.startswith("postgres://"):
+        url = "postgresql+asyncpg://" + url.split("://", 1)[1]
+        # asyncpg spells libpq's sslmode as ssl
+        return url.replace("sslmode=", "ssl=")
+    return url
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+
+try:
+    if ASYNC_DATABASE_URL.startswith("sqlite"):
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+    else:
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            echo=False,
+            pool_size=5,
+            max_overflow=10
+        )
+except ImportError as e:
+    # Driver not installed; async routes will fail loudly when used
+    print(f"⚠️  Async database driver not available: {e}")
+    async_engine = None
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class
 Base = declarative_base()
 
@@ -84,3 +127,10 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session (read paths)
+async def get_async_db():
+    if async_engine is None:
+        raise RuntimeError("Async database driver is not installed (pip install asyncpg aiosqlite)")
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -5,16 +5,36 @@ Stores and serves podcasts, images, and other media files
 """
 
 import os
+import re
 import shutil
+import hashlib
+import tempfile
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import AsyncIterator, Callable, NamedTuple, Optional, Tuple
 import uuid
 
+import anyio
+
+from utils.content_store import ContentStore
+from utils.storage_usage import StorageUsage
+from utils.image_variants import schedule_variants, remove_variants
+from utils.peaks import remove_peaks
+
 # Base directory for file storage
 BASE_STORAGE_DIR = Path(__file__).parent.parent / "storage"
 STORAGE_DIR = BASE_STORAGE_DIR / "files"
 
+# Content-addressed blobs behind the files in STORAGE_DIR (see utils/content_store.py)
+BLOB_DIR = BASE_STORAGE_DIR / "blobs"
+STORAGE_INDEX_PATH = BASE_STORAGE_DIR / "index.db"
+LEGACY_STORAGE_INDEX_PATH = BASE_STORAGE_DIR / "index.json"
+content_store = ContentStore(BLOB_DIR, STORAGE_INDEX_PATH, STORAGE_DIR, LEGACY_STORAGE_INDEX_PATH)
+
+# File counts and bytes per storage directory (see utils/storage_usage.py)
+STORAGE_USAGE_PATH = BASE_STORAGE_DIR / "usage.db"
+storage_usage = StorageUsage(STORAGE_USAGE_PATH, STORAGE_DIR)
+
 # Directory structure
 DIRECTORIES = {
     "podcasts": {
@@ -64,23 +84,62 @@ MIME_TYPES = {
 }
 
 
-def initialize_storage():
-    """Initialize storage directories."""
-    print("📁 Initializing file storage directories...")
-    
-    # Create base storage directory
+# Streaming uploads: chunk size and per-type size limits (MB, from the environment)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_SIZE = {
+    "audio": int(os.getenv("MAX_AUDIO_UPLOAD_MB", "500")) * 1024 * 1024,
+    "image": int(os.getenv("MAX_IMAGE_UPLOAD_MB", "20")) * 1024 * 1024,
+    "document": int(os.getenv("MAX_DOCUMENT_UPLOAD_MB", "100")) * 1024 * 1024,
+}
+
+
+class FileTooLargeError(Exception):
+    """Raised when a streamed upload goes over its size limit."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File is larger than the {max_size // (1024 * 1024)} MB limit")
+
+
+class SavedFile(NamedTuple):
+    """Result of a streamed save."""
+    path: str
+    url: str
+    size: int
+    sha256: str
+
+
+def initialize_storage(reconcile: bool = True):
+    """
+    Initialize storage directories. With ``reconcile`` the usage index is also
+    brought up to date; lazy startup leaves that to reconcile_storage_usage().
+    """
+    # Create base storage directory and all subdirectories
     STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    directories = storage_directories()
+    for subdir_path in directories:
+        subdir_path.mkdir(parents=True, exist_ok=True)
     
-    # Create all subdirectories
-    for category, subdirs in DIRECTORIES.items():
-        for subdir_name, subdir_path in subdirs.items():
-            subdir_path.mkdir(parents=True, exist_ok=True)
-            print(f"  ✅ Created: {subdir_path}")
+    if reconcile:
+        reconcile_storage_usage()
     
-    print(f"✅ Storage initialized at: {STORAGE_DIR}")
+    print(f"✅ Storage initialized at: {STORAGE_DIR} ({len(directories)} directories)")
     return True
 
 
+def reconcile_storage_usage() -> int:
+    """Bring the usage index up to date (only directories that changed are scanned)."""
+    scanned = storage_usage.reconcile(storage_directories())
+    if scanned:
+        print(f"  📊 Storage usage re-scanned for {scanned} director{'y' if scanned == 1 else 'ies'}")
+    return scanned
+
+
+def storage_directories() -> list:
+    """Every category/subcategory directory."""
+    return [path for subdirs in DIRECTORIES.values() for path in subdirs.values()]
+
+
 def get_mime_type(filename: str) -> str:
     """Get MIME type from file extension."""
     ext = Path(filename).suffix.lower()
@@ -154,29 +213,13 @@ def save_file(
     
     target_dir = DIRECTORIES[category][subcategory]
     
-    # Choose filename strategy
-    if preserve_filename:
-        # Use original filename (sanitized)
-        filename = sanitize_filename(original_filename)
-        file_path = target_dir / filename
-        
-        # If file exists, add a number suffix
-        if file_path.exists():
-            base = file_path.stem
-            ext = file_path.suffix
-            counter = 1
-            while file_path.exists():
-                file_path = target_dir / f"{base}_{counter}{ext}"
-                counter += 1
-    else:
-        # Generate unique filename
-        unique_filename = generate_unique_filename(original_filename)
-        file_path = target_dir / unique_filename
-    
     # Save file
     try:
-        with open(file_path, "wb") as f:
+        fd, temp_name = tempfile.mkstemp(dir=content_store.temp_dir(), prefix=".upload-", suffix=".part")
+        with os.fdopen(fd, "wb") as f:
             f.write(file_content)
+        sha256 = hashlib.sha256(file_content).hexdigest()
+        file_path = _store(Path(temp_name), sha256, len(file_content), target_dir, original_filename, preserve_filename)
         
         # Generate public URL (relative to storage base)
         relative_path = file_path.relative_to(STORAGE_DIR)
@@ -185,6 +228,9 @@ def save_file(
         print(f"✅ File saved: {file_path}")
         print(f"   Public URL: {public_url}")
         
+        if file_type == "image":
+            schedule_variants(file_path)
+        
         return str(file_path), public_url
     
     except Exception as e:
@@ -192,6 +238,188 @@ def save_file(
         return None, None
 
 
+async def _iter_chunks(source, chunk_size: int) -> AsyncIterator[bytes]:
+    """Chunks from an async file-like object (``await read(n)``) or an async iterator."""
+    if hasattr(source, "read"):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            if chunk:
+                yield chunk
+
+
+async def _stream_to_temp(source, directory: Path, max_size: Optional[int]) -> Tuple[Path, int, str]:
+    """
+    Write ``source`` to a new temp file in ``directory`` in UPLOAD_CHUNK_SIZE
+    chunks, hashing as it goes. The caller renames the temp file into place.
+    Raises FileTooLargeError as soon as more than ``max_size`` bytes arrive
+    (the temp file is removed).
+
+    Returns (temp path, size in bytes, sha256 hex digest).
+    """
+    known_size = getattr(source, "size", None)
+    if max_size is not None and known_size is not None and known_size > max_size:
+        raise FileTooLargeError(max_size)
+
+    fd, temp_name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    temp_path = Path(temp_name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in _iter_chunks(source, UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise FileTooLargeError(max_size)
+                digest.update(chunk)
+                await anyio.to_thread.run_sync(f.write, chunk)
+            await anyio.to_thread.run_sync(os.fsync, f.fileno())
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return temp_path, size, digest.hexdigest()
+
+
+async def write_stream(source, destination: Path, max_size: Optional[int] = None) -> Tuple[int, str]:
+    """
+    Stream ``source`` into ``destination`` without holding it in memory.
+    The file only appears under its name once it is complete.
+
+    Returns (size in bytes, sha256 hex digest).
+    """
+    destination = Path(destination)
+    temp_path, size, sha256 = await _stream_to_temp(source, destination.parent, max_size)
+    try:
+        os.replace(temp_path, destination)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return size, sha256
+
+
+def _unique_path(target_dir: Path, original_filename: str, preserve_filename: bool) -> Path:
+    """Storage path for a new file, following save_file's naming rules."""
+    if not preserve_filename:
+        return target_dir / generate_unique_filename(original_filename)
+    file_path = target_dir / sanitize_filename(original_filename)
+    if file_path.exists():
+        base = file_path.stem
+        ext = file_path.suffix
+        counter = 1
+        while file_path.exists():
+            file_path = target_dir / f"{base}_{counter}{ext}"
+            counter += 1
+    return file_path
+
+
+def _same_upload_name(original_filename: str, preserve_filename: bool) -> Callable[[str], bool]:
+    """
+    Whether an existing file name could have come from saving ``original_filename``
+    (the name itself or a numbered variant; any generated name with the same extension).
+    """
+    if not preserve_filename:
+        ext = Path(original_filename).suffix.lower()
+        return lambda name: Path(name).suffix.lower() == ext
+    name = sanitize_filename(original_filename)
+    numbered = re.compile(re.escape(Path(name).stem) + r"_\d+" + re.escape(Path(name).suffix))
+    return lambda candidate: candidate == name or numbered.fullmatch(candidate) is not None
+
+
+def _store(
+    temp_path: Path,
+    sha256: str,
+    size: int,
+    target_dir: Path,
+    original_filename: str,
+    preserve_filename: bool
+) -> Path:
+    """
+    Move a fully written temp file into the content store. If the same bytes
+    were already saved under this name, that file is reused (and ``temp_path``
+    dropped) instead of storing another copy.
+    """
+    try:
+        existing = content_store.find(sha256, target_dir, _same_upload_name(original_filename, preserve_filename))
+        if existing is not None:
+            temp_path.unlink(missing_ok=True)
+            print(f"♻️  Already stored, reusing: {existing}")
+            return existing
+        # Pick the name once the data is complete, right before linking it
+        with storage_usage.change(target_dir) as usage:
+            file_path = _unique_path(target_dir, original_filename, preserve_filename)
+            content_store.add(temp_path, sha256, size, file_path)
+            usage.add(size)
+        return file_path
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+async def save_file_stream(
+    source,
+    original_filename: str,
+    category: str,
+    subcategory: str,
+    file_type: str = "image",
+    preserve_filename: bool = False,
+    max_size: Optional[int] = None
+) -> Optional[SavedFile]:
+    """
+    Streaming variant of save_file for uploads.
+    
+    Args:
+        source: UploadFile or other object with ``async read(n)``, or an async iterator of bytes
+        original_filename: Original filename
+        category: Category (podcasts, images, documents)
+        subcategory: Subcategory (audio, covers, events, etc.)
+        file_type: Type of file (audio, image, document)
+        preserve_filename: If True, use original filename (sanitized). If False, generate unique name.
+        max_size: Size limit in bytes (defaults to MAX_UPLOAD_SIZE for the file type)
+    
+    Returns:
+        SavedFile, or None if the file type or category is invalid or the write failed
+    
+    Raises:
+        FileTooLargeError: if the upload is over the size limit
+    """
+    if not validate_file_extension(original_filename, file_type):
+        return None
+    
+    if category not in DIRECTORIES or subcategory not in DIRECTORIES[category]:
+        return None
+    
+    if max_size is None:
+        max_size = MAX_UPLOAD_SIZE.get(file_type)
+    
+    target_dir = DIRECTORIES[category][subcategory]
+    target_dir.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        temp_path, size, sha256 = await _stream_to_temp(source, content_store.temp_dir(), max_size)
+        file_path = _store(temp_path, sha256, size, target_dir, original_filename, preserve_filename)
+        
+        relative_path = file_path.relative_to(STORAGE_DIR)
+        public_url = f"/storage/{relative_path.as_posix()}"
+        
+        print(f"✅ File saved: {file_path} ({size} bytes)")
+        print(f"   Public URL: {public_url}")
+        
+        if file_type == "image":
+            schedule_variants(file_path)
+        
+        return SavedFile(str(file_path), public_url, size, sha256)
+    
+    except FileTooLargeError:
+        raise
+    except Exception as e:
+        print(f"❌ Error saving file: {e}")
+        return None
+
+
 def save_file_from_path(
     source_path: str,
     category: str,
@@ -251,19 +479,53 @@ def delete_file(file_url: str) -> bool:
         
         file_path = STORAGE_DIR / relative_path
         
-        if file_path.exists():
-            file_path.unlink()
-            print(f"✅ File deleted: {file_path}")
-            return True
-        else:
-            print(f"⚠️ File not found: {file_path}")
-            return False
+        with storage_usage.change(file_path.parent) as usage:
+            existed = file_path.exists()
+            size = file_path.stat().st_size if existed else 0
+            
+            # Deduplicated file: only removed once nothing references it
+            if content_store.release(file_path):
+                if existed and not file_path.exists():
+                    usage.remove(size)
+                    remove_variants(file_path)
+                    remove_peaks(file_path)
+                print(f"✅ File released: {file_path}")
+                return True
+            
+            if existed:
+                file_path.unlink()
+                usage.remove(size)
+                remove_variants(file_path)
+                remove_peaks(file_path)
+                print(f"✅ File deleted: {file_path}")
+                return True
+        
+        print(f"⚠️ File not found: {file_path}")
+        return False
     
     except Exception as e:
         print(f"❌ Error deleting file: {e}")
         return False
 
 
+def replace_file(file_path: Path, temp_path: Path, sha256: str, size: int) -> None:
+    """
+    Atomically replace a stored file with a rewritten version of it (e.g. a
+    remuxed episode). ``temp_path`` must be on the same filesystem and is consumed.
+    """
+    file_path = Path(file_path)
+    try:
+        with storage_usage.change(file_path.parent) as usage:
+            old_size = file_path.stat().st_size
+            if not content_store.replace(file_path, temp_path, sha256, size):
+                os.replace(temp_path, file_path)
+            usage.remove(old_size)
+            usage.add(size)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
 def get_file_path(file_url: str) -> Optional[Path]:
     """
     Get local file path from public URL.
@@ -292,32 +554,66 @@ def get_file_path(file_url: str) -> Optional[Path]:
         return None
 
 
-def get_storage_info() -> dict:
-    """Get information about storage usage."""
-    total_size = 0
-    file_count = 0
-    
+def deduplicate_storage() -> dict:
+    """
+    Bring files saved before the content store existed into it, so identical
+    files (e.g. "episode.mp3" and "episode_1.mp3") share one blob on disk.
+    File names and URLs do not change.
+    """
+    adopted = 0
+    bytes_saved = 0
     for root, dirs, files in os.walk(STORAGE_DIR):
-        for file in files:
-            file_path = Path(root) / file
-            total_size += file_path.stat().st_size
-            file_count += 1
+        # Skip image variants and other hidden folders
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for name in files:
+            file_path = Path(root) / name
+            if name.startswith(".") or content_store.sha256_of(file_path):
+                continue
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+            size = file_path.stat().st_size
+            if content_store.blob_path(sha256).exists():
+                bytes_saved += size
+            if content_store.adopt(file_path, sha256, size):
+                adopted += 1
+    return {"files_adopted": adopted, "bytes_saved": bytes_saved}
+
+
+def get_storage_info() -> dict:
+    """
+    Get information about storage usage, from the usage index (no directory
+    walk). Sizes are per stored file, so a deduplicated file counts once per name.
+    """
+    usage = storage_usage.stats()
+    total_size = usage["total_size_bytes"]
     
     return {
         "storage_path": str(STORAGE_DIR),
-        "total_files": file_count,
+        "total_files": usage["total_files"],
         "total_size_bytes": total_size,
         "total_size_mb": round(total_size / (1024 * 1024), 2),
         "total_size_gb": round(total_size / (1024 * 1024 * 1024), 2),
+        "categories": usage["categories"],
+        "last_reconcile": usage["last_reconcile"],
     }
 
 
 if __name__ == "__main__":
+    import sys
+    
     # Initialize storage when run directly
     print("🚀 FOG Platform File Server")
     print("=" * 50)
     initialize_storage()
     
+    if "--dedupe" in sys.argv:
+        result = deduplicate_storage()
+        print(f"\n♻️  Deduplicated: {result['files_adopted']} files indexed, "
+              f"{round(result['bytes_saved'] / (1024 * 1024), 2)} MB freed")
+    
     # Show storage info
     info = get_storage_info()
     print("\n📊 Storage Information:")
@@ -1,63 +1,75 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse
 import uvicorn
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 import os
 
-from database import engine, get_db
-from models import Base
+from database import engine, async_engine, get_db
+from models import Base, User, ensure_columns, ensure_indexes
 from sqlalchemy.orm import Session
-from routes import auth, library, users, prayer, events, podcasts, courses, devotionals, announcements
-from utils.auth import get_current_user
-from file_server import initialize_storage, STORAGE_DIR
+from routes import auth, library, users, prayer, events, podcasts, courses, devotionals, announcements, search, storage
+from utils.auth import get_current_user, get_current_admin_user, shutdown_hash_workers
+from file_server import initialize_storage, STORAGE_DIR, storage_usage, storage_directories
+from utils.drive_client import start_drive_client, close_drive_client
+from utils.counters import counters
+from utils.progress import progress
+from utils.search import ensure_search_indexes
+from utils.cache import response_cache
+from utils.image_variants import VariantStaticFiles, shutdown_variant_workers
+from utils.faststart import shutdown_faststart_worker
+from utils.hls import shutdown_hls_worker
+from utils.peaks import shutdown_peaks_workers
+from utils.startup import STARTUP_MODE, startup
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-try:
-    print("Initializing database tables...")
-    # Test connection first
-    try:
-        from sqlalchemy import text
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        print("✅ Database connection verified")
-    except Exception as conn_err:
-        print(f"⚠️  Database connection test failed: {conn_err}")
-        print("   Will retry table creation...")
-    
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created successfully")
-    
-    # Verify tables were created
-    try:
-        from sqlalchemy import inspect
-        inspector = inspect(engine)
-        tables = inspector.get_table_names()
-        print(f"   Created {len(tables)} tables: {', '.join(sorted(tables))}")
-    except Exception as inspect_err:
-        print(f"⚠️  Could not verify tables: {inspect_err}")
-except Exception as e:
-    print(f"❌ Error creating database tables: {e}")
-    import traceback
-    traceback.print_exc()
-    print("⚠️  Server will continue, but database operations may fail")
-    print("   Check Railway logs and DATABASE_URL configuration")
+# Database schema: set up now in eager mode, otherwise by startup.start() in the lifespan
+if STARTUP_MODE == "eager":
+    startup.prepare()
 
 # Initialize file storage
 try:
-    initialize_storage()
+    initialize_storage(reconcile=STARTUP_MODE == "eager")
 except Exception as e:
     print(f" Warning: File storage initialization failed: {e}")
     print("   Server will continue, but file uploads may not work properly")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop application-lifetime resources."""
+    # Pooled HTTP client for the Google Drive audio proxy
+    await start_drive_client()
+    # Write-behind play/view/download counters
+    counters.start()
+    # Write-behind listening progress (resume positions)
+    progress.start()
+    # Periodic re-scan of storage directories changed outside file_server
+    storage_usage.start(storage_directories)
+    # Schema setup (lazy mode) and backfills for older podcasts
+    await startup.start()
+    yield
+    await startup.stop()
+    await storage_usage.stop()
+    await progress.stop()
+    await counters.stop()
+    await close_drive_client()
+    shutdown_variant_workers()
+    shutdown_faststart_worker()
+    shutdown_hls_worker()
+    shutdown_peaks_workers()
+    shutdown_hash_workers()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 app = FastAPI(
     title="FOG API",
     description="Backend API for FOG (Faith-based Organization) Platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -80,6 +92,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Security
@@ -87,20 +100,17 @@ security = HTTPBearer()
 
 # Mount static files for uploaded content
 # Legacy uploads directory (for backward compatibility)
-os.makedirs("uploads", exist_ok=True)
-os.makedirs("uploads/events", exist_ok=True)
-os.makedirs("uploads/podcasts", exist_ok=True)
-os.makedirs("uploads/podcasts/audio", exist_ok=True)
-os.makedirs("uploads/courses", exist_ok=True)
+for upload_dir in ("uploads/events", "uploads/podcasts/audio", "uploads/courses"):
+    os.makedirs(upload_dir, exist_ok=True)
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", VariantStaticFiles(directory="uploads"), name="uploads")
 
 # Mount file server storage directory
 # This serves files from the centralized storage location
 try:
     storage_path = str(STORAGE_DIR)
     if os.path.exists(storage_path):
-        app.mount("/storage", StaticFiles(directory=storage_path), name="storage")
+        app.mount("/storage", VariantStaticFiles(directory=storage_path), name="storage")
         print(f"Storage mounted at /storage from {storage_path}")
     else:
         print(f"Warning: Storage directory not found: {storage_path}")
@@ -117,6 +127,8 @@ app.include_router(podcasts.router, prefix="/api/podcasts", tags=["Podcasts"])
 app.include_router(courses.router, prefix="/api/courses", tags=["Genius Academy Courses"])
 app.include_router(devotionals.router, prefix="/api/devotionals", tags=["Devotionals"])
 app.include_router(announcements.router, prefix="/api/announcements", tags=["Announcements"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(storage.router, prefix="/api/storage", tags=["Storage"])
 
 @app.get("/")
 async def root():
@@ -128,8 +140,19 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
+    """Liveness: answers as soon as the server is up, without touching the database."""
     return {"status": "healthy", "message": "FOG API is running"}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness: 503 until the database schema is set up (see utils/startup.py)."""
+    return JSONResponse(startup.status(), status_code=200 if startup.ready else 503)
+
+@app.get("/api/cache/stats")
+async def cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """Hit/miss counters for the in-process response cache (admin only)."""
+    return response_cache.stats()
+
 @app.get("/api/test-db")
 async def test_database(db: Session = Depends(get_db)):
     """Test database connection and table existence."""
@@ -167,6 +190,9 @@ async def init_database():
     try:
         print("Manually initializing database tables...")
         Base.metadata.create_all(bind=engine)
+        ensure_columns(engine)
+        ensure_indexes(engine)
+        ensure_search_indexes()
         from sqlalchemy import inspect
         inspector = inspect(engine)
         tables = inspector.get_table_names()
@@ -295,6 +321,13 @@ async def create_tables_from_sql():
         plays INTEGER DEFAULT 0,
         tags VARCHAR(255),
         audio_url VARCHAR(500),
+        duration_seconds DOUBLE PRECISION,
+        bitrate INTEGER,
+        sample_rate INTEGER,
+        audio_codec VARCHAR(50),
+        moov_offset BIGINT,
+        faststart BOOLEAN,
+        peaks_version VARCHAR(64),
         transcript TEXT,
         created_by INTEGER REFERENCES users(id),
         created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
@@ -371,6 +404,27 @@ async def create_tables_from_sql():
     
     CREATE INDEX IF NOT EXISTS idx_announcements_date ON announcements(date);
     CREATE INDEX IF NOT EXISTS idx_announcements_is_active ON announcements(is_active);
+    
+    -- Listening progress (resume positions)
+    CREATE TABLE IF NOT EXISTS listening_progress (
+        user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+        podcast_id INTEGER NOT NULL REFERENCES podcasts(id) ON DELETE CASCADE,
+        position_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+        duration_seconds DOUBLE PRECISION,
+        completed BOOLEAN DEFAULT FALSE,
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        PRIMARY KEY (user_id, podcast_id)
+    );
+    
+    CREATE INDEX IF NOT EXISTS ix_listening_progress_user_id_updated_at ON listening_progress(user_id, updated_at);
+    
+    -- Admin dashboard counts per day (STATS_TABLE_ENABLED)
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        metric VARCHAR NOT NULL,
+        day DATE NOT NULL,
+        value BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (metric, day)
+    );
     """
     
     try:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Float, Date, DateTime, Text, ForeignKey, Index, inspect, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -53,6 +53,11 @@ class LibraryItem(Base):
 
 class PrayerRequest(Base):
     __tablename__ = "prayer_requests"
+    __table_args__ = (
+        # Keyset pagination: newest first, overall and per requester
+        Index("ix_prayer_requests_created_at_id", "created_at", "id"),
+        Index("ix_prayer_requests_requester_created_at_id", "requester_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     requester_id = Column(Integer, ForeignKey("users.id"))
@@ -65,6 +70,9 @@ class PrayerRequest(Base):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_date_id", "date", "id"),  # Keyset pagination
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)
@@ -83,6 +91,9 @@ class Event(Base):
 
 class Podcast(Base):
     __tablename__ = "podcasts"
+    __table_args__ = (
+        Index("ix_podcasts_publish_date_id", "publish_date", "id"),  # Keyset pagination
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)
@@ -99,6 +110,14 @@ class Podcast(Base):
     plays = Column(Integer, default=0)
     tags = Column(String, nullable=True)  # Comma-separated tags
     audio_url = Column(String, nullable=True)
+    # Read from the uploaded audio file (utils/audio_metadata.py)
+    duration_seconds = Column(Float, nullable=True)
+    bitrate = Column(Integer, nullable=True)  # bits per second
+    sample_rate = Column(Integer, nullable=True)
+    audio_codec = Column(String, nullable=True)  # aac, mp3, pcm, ...
+    moov_offset = Column(BigInteger, nullable=True)  # MP4 only: byte offset of the moov atom
+    faststart = Column(Boolean, nullable=True)  # MP4 only: moov precedes the media data
+    peaks_version = Column(String, nullable=True)  # Hash of the waveform peaks sidecar (utils/peaks.py)
     transcript = Column(Text, nullable=True)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -106,6 +125,9 @@ class Podcast(Base):
 
 class GeniusAcademyCourse(Base):
     __tablename__ = "genius_academy_courses"
+    __table_args__ = (
+        Index("ix_genius_academy_courses_created_at_id", "created_at", "id"),  # Keyset pagination
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)
@@ -134,6 +156,9 @@ class GeniusAcademyCourse(Base):
 
 class Devotional(Base):
     __tablename__ = "devotionals"
+    __table_args__ = (
+        Index("ix_devotionals_date_id", "date", "id"),  # Keyset pagination
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)
@@ -161,3 +186,54 @@ class Announcement(Base):
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class ListeningProgress(Base):
+    __tablename__ = "listening_progress"
+    __table_args__ = (
+        Index("ix_listening_progress_user_id_updated_at", "user_id", "updated_at"),  # Recently played
+    )
+    
+    # Written in batches by utils/progress.py, one row per listener and episode
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    podcast_id = Column(Integer, ForeignKey("podcasts.id", ondelete="CASCADE"), primary_key=True)
+    position_seconds = Column(Float, nullable=False, default=0.0)
+    duration_seconds = Column(Float, nullable=True)
+    completed = Column(Boolean, default=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+class DailyStat(Base):
+    __tablename__ = "daily_stats"
+    
+    # Admin dashboard counts per day the counted rows were created (utils/stats.py, STATS_TABLE_ENABLED)
+    metric = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+def ensure_indexes(bind) -> None:
+    """
+    Create any model index that is missing. create_all() only creates indexes
+    together with a new table, so indexes added to existing tables need this.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def ensure_columns(bind) -> None:
+    """
+    Add any nullable model column missing from an existing table. Like
+    indexes, create_all() leaves existing tables alone.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+            print(f"✅ Added column {table.name}.{column.name}")
@@ -1,15 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, case
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from database import get_db
+from database import get_db, get_async_db
 from models import Announcement, User
 from schemas import AnnouncementCreate, AnnouncementUpdate, Announcement as AnnouncementSchema
 from utils.auth import get_current_user, get_current_admin_user
+from utils.cache import response_cache, cache_key, CacheEntry
+from utils.search import search_filter
+from utils.fast_json import RowSerializer, json_response
 
 router = APIRouter()
 
+# List pages are built from column tuples and encoded directly (see utils/fast_json.py)
+announcement_rows = RowSerializer(AnnouncementSchema, Announcement)
+
+def seconds_until_first_expiry(announcements, now: datetime) -> Optional[float]:
+    """Seconds until the first of these announcements expires (None if none do)."""
+    expiries = [
+        a.expires_at.replace(tzinfo=None) - (a.expires_at.utcoffset() or timedelta())
+        for a in announcements if a.expires_at is not None
+    ]
+    if not expiries:
+        return None
+    return max((min(expiries) - now).total_seconds(), 0.0)
+
 @router.get("/", response_model=List[AnnouncementSchema])
 async def get_announcements(
     skip: int = 0,
@@ -17,32 +35,27 @@ async def get_announcements(
     priority: Optional[str] = None,
     is_active: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all announcements with optional filtering."""
-    query = db.query(Announcement)
+    query = announcement_rows.select()
     
     if priority and priority != "all":
-        query = query.filter(Announcement.priority == priority)
+        query = query.where(Announcement.priority == priority)
     
     if is_active is not None:
-        query = query.filter(Announcement.is_active == is_active)
+        query = query.where(Announcement.is_active == is_active)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Announcement.title.ilike(search_term)) |
-            (Announcement.content.ilike(search_term))
-        )
+        query = query.where(search_filter(Announcement, search))
     
     # Filter out expired announcements
     now = datetime.utcnow()
-    query = query.filter(
+    query = query.where(
         (Announcement.expires_at.is_(None)) | (Announcement.expires_at > now)
     )
     
     # Order by priority (high first) then date (newest first)
-    from sqlalchemy import case
     priority_order = case(
         (Announcement.priority == "high", 1),
         (Announcement.priority == "medium", 2),
@@ -51,35 +64,44 @@ async def get_announcements(
     )
     query = query.order_by(priority_order, Announcement.date.desc())
     
-    announcements = query.offset(skip).limit(limit).all()
-    return announcements
+    result = await db.execute(query.offset(skip).limit(limit))
+    return json_response(announcement_rows.to_dicts(result.all()))
 
 @router.get("/active", response_model=List[AnnouncementSchema])
 async def get_active_announcements(
     limit: int = 10,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get active announcements (for dashboard)."""
-    now = datetime.utcnow()
-    announcements = db.query(Announcement).filter(
-        Announcement.is_active == True,
-        (Announcement.expires_at.is_(None)) | (Announcement.expires_at > now)
-    ).order_by(
-        case(
-            (Announcement.priority == "high", 1),
-            (Announcement.priority == "medium", 2),
-            (Announcement.priority == "low", 3),
-            else_=4
-        ),
-        Announcement.date.desc()
-    ).limit(limit).all()
+    async def load():
+        now = datetime.utcnow()
+        query = announcement_rows.select().where(
+            Announcement.is_active == True,
+            (Announcement.expires_at.is_(None)) | (Announcement.expires_at > now)
+        ).order_by(
+            case(
+                (Announcement.priority == "high", 1),
+                (Announcement.priority == "medium", 2),
+                (Announcement.priority == "low", 3),
+                else_=4
+            ),
+            Announcement.date.desc()
+        ).limit(limit)
+        result = await db.execute(query)
+        announcements = result.all()
+        return CacheEntry(
+            announcement_rows.to_dicts(announcements),
+            ttl=seconds_until_first_expiry(announcements, now)
+        )
     
-    return announcements
+    entry = await response_cache.get_or_load(cache_key(Announcement.__tablename__, "active", limit=limit), load)
+    return json_response(entry.body)
 
 @router.get("/{announcement_id}", response_model=AnnouncementSchema)
-async def get_announcement(announcement_id: int, db: Session = Depends(get_db)):
+async def get_announcement(announcement_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific announcement by ID."""
-    announcement = db.query(Announcement).filter(Announcement.id == announcement_id).first()
+    result = await db.execute(select(Announcement).where(Announcement.id == announcement_id))
+    announcement = result.scalars().first()
     if not announcement:
         raise HTTPException(status_code=404, detail="Announcement not found")
     return announcement
@@ -99,6 +121,7 @@ async def create_announcement(
     db.add(db_announcement)
     db.commit()
     db.refresh(db_announcement)
+    response_cache.invalidate(Announcement.__tablename__)
     
     return db_announcement
 
@@ -121,6 +144,7 @@ async def update_announcement(
     db_announcement.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_announcement)
+    response_cache.invalidate(Announcement.__tablename__)
     
     return db_announcement
 
@@ -137,5 +161,6 @@ async def delete_announcement(
     
     db.delete(db_announcement)
     db.commit()
+    response_cache.invalidate(Announcement.__tablename__)
     
     return {"message": "Announcement deleted successfully"}
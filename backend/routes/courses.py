@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-import shutil
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_async_db
 from models import GeniusAcademyCourse, User
 from schemas import GeniusAcademyCourseCreate, GeniusAcademyCourseUpdate, GeniusAcademyCourse as CourseSchema
 from utils.auth import get_current_user, get_current_admin_user
+from file_server import write_stream, FileTooLargeError, MAX_UPLOAD_SIZE
+from utils.image_variants import schedule_variants
+from utils.cache import response_cache, cache_key, CacheEntry
+from utils.pagination import paginate, page_with_cursor, cursor_headers
+from utils.fast_json import RowSerializer, json_response
 
 router = APIRouter()
 
+# List pages are built from column tuples and encoded directly (see utils/fast_json.py)
+# Curriculum and features are only sent with include=curriculum,features
+course_rows = RowSerializer(CourseSchema, GeniusAcademyCourse, deferred=["curriculum", "features"])
+
 # File upload configuration
 UPLOAD_DIR = "uploads/courses"
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
@@ -25,40 +35,61 @@ def is_valid_file_extension(filename: str) -> bool:
 
 @router.get("/", response_model=List[CourseSchema])
 async def get_courses(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
     level: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all courses with optional filtering."""
-    query = db.query(GeniusAcademyCourse)
+    """
+    Get all courses with optional filtering.
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next one.
+    `curriculum` and `features` are left out unless named in `include`.
+    """
+    included = course_rows.included(include)
+    query = course_rows.select(included)
     
     if category and category != "all":
-        query = query.filter(GeniusAcademyCourse.category == category)
+        query = query.where(GeniusAcademyCourse.category == category)
     
     if level and level != "all":
-        query = query.filter(GeniusAcademyCourse.level == level)
+        query = query.where(GeniusAcademyCourse.level == level)
     
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             (GeniusAcademyCourse.title.ilike(search_term)) |
             (GeniusAcademyCourse.instructor.ilike(search_term)) |
             (GeniusAcademyCourse.description.ilike(search_term))
         )
     
     # Order by creation date (newest first)
-    query = query.order_by(GeniusAcademyCourse.created_at.desc())
+    query = paginate(query, GeniusAcademyCourse.created_at, descending=True, cursor=cursor, skip=skip, limit=limit)
+    
+    key = cache_key(
+        GeniusAcademyCourse.__tablename__, "list",
+        skip=skip, limit=limit, category=category, level=level,
+        search=search, cursor=cursor, include=",".join(included) or None
+    )
+    
+    async def load():
+        result = await db.execute(query)
+        courses = page_with_cursor(result.all(), "created_at", limit, response)
+        return CacheEntry(course_rows.to_dicts(courses), headers=cursor_headers(response))
     
-    courses = query.offset(skip).limit(limit).all()
-    return courses
+    entry = await response_cache.get_or_load(key, load)
+    entry.apply_headers(response)
+    return json_response(entry.body, response)
 
 @router.get("/{course_id}", response_model=CourseSchema)
-async def get_course(course_id: int, db: Session = Depends(get_db)):
+async def get_course(course_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific course by ID."""
-    course = db.query(GeniusAcademyCourse).filter(GeniusAcademyCourse.id == course_id).first()
+    result = await db.execute(select(GeniusAcademyCourse).where(GeniusAcademyCourse.id == course_id))
+    course = result.scalars().first()
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
@@ -78,6 +109,7 @@ async def create_course(
     db.add(db_course)
     db.commit()
     db.refresh(db_course)
+    response_cache.invalidate(GeniusAcademyCourse.__tablename__)
     
     return db_course
 
@@ -100,6 +132,7 @@ async def update_course(
     db_course.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_course)
+    response_cache.invalidate(GeniusAcademyCourse.__tablename__)
     
     return db_course
 
@@ -125,6 +158,7 @@ async def delete_course(
     
     db.delete(db_course)
     db.commit()
+    response_cache.invalidate(GeniusAcademyCourse.__tablename__)
     
     return {"message": "Course deleted successfully"}
 
@@ -150,8 +184,10 @@ async def upload_course_cover(
     file_path = os.path.join(UPLOAD_DIR, filename)
     
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await write_stream(file, file_path, MAX_UPLOAD_SIZE["image"])
+        schedule_variants(file_path)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
     
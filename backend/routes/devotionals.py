@@ -1,32 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_async_db
 from models import Devotional, User
 from schemas import DevotionalCreate, DevotionalUpdate, Devotional as DevotionalSchema
 from utils.auth import get_current_user, get_current_admin_user
+from utils.cache import response_cache, cache_key, CacheEntry
+from utils.etag import check_etag
+from utils.pagination import paginate, page_with_cursor
+from utils.fast_json import RowSerializer, json_response
 
 router = APIRouter()
 
+# List pages are built from column tuples and encoded directly (see utils/fast_json.py)
+# The full text is only sent with include=content
+devotional_rows = RowSerializer(DevotionalSchema, Devotional, deferred=["content"])
+
 @router.get("/", response_model=List[DevotionalSchema])
 async def get_devotionals(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     featured: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all devotionals with optional filtering."""
-    query = db.query(Devotional)
+    """
+    Get all devotionals with optional filtering.
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next one.
+    The full text is left out unless requested with `include=content`.
+    """
+    included = devotional_rows.included(include)
+    query = devotional_rows.select(included)
     
     if featured is not None:
-        query = query.filter(Devotional.featured == featured)
+        query = query.where(Devotional.featured == featured)
     
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             (Devotional.title.ilike(search_term)) |
             (Devotional.scripture.ilike(search_term)) |
             (Devotional.author.ilike(search_term)) |
@@ -34,23 +53,51 @@ async def get_devotionals(
         )
     
     # Order by date (newest first)
-    query = query.order_by(Devotional.date.desc())
+    query = paginate(query, Devotional.date, descending=True, cursor=cursor, skip=skip, limit=limit)
     
-    devotionals = query.offset(skip).limit(limit).all()
-    return devotionals
+    key = cache_key(
+        Devotional.__tablename__, "list",
+        skip=skip, limit=limit, featured=featured, search=search, cursor=cursor,
+        include=",".join(included) or None
+    )
+    not_modified = check_etag(request, response, key)
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(query)
+    devotionals = page_with_cursor(result.all(), "date", limit, response)
+    return json_response(devotional_rows.to_dicts(devotionals), response)
 
 @router.get("/latest", response_model=DevotionalSchema)
-async def get_latest_devotional(db: Session = Depends(get_db)):
+async def get_latest_devotional(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get the latest devotional."""
-    devotional = db.query(Devotional).order_by(Devotional.date.desc()).first()
-    if not devotional:
-        raise HTTPException(status_code=404, detail="No devotionals found")
-    return devotional
+    key = cache_key(Devotional.__tablename__, "latest")
+    not_modified = check_etag(request, response, key)
+    if not_modified is not None:
+        return not_modified
+    
+    entry = response_cache.get(key)
+    if entry is None:
+        generation = response_cache.generation(Devotional.__tablename__)
+        result = await db.execute(select(Devotional).order_by(Devotional.date.desc()).limit(1))
+        devotional = result.scalars().first()
+        if not devotional:
+            # Not cached, so the first devotional shows up straight away
+            raise HTTPException(status_code=404, detail="No devotionals found")
+        entry = response_cache.set(
+            key, CacheEntry(DevotionalSchema.model_validate(devotional).model_dump()), generation
+        )
+    return entry.body
 
 @router.get("/{devotional_id}", response_model=DevotionalSchema)
-async def get_devotional(devotional_id: int, db: Session = Depends(get_db)):
+async def get_devotional(devotional_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific devotional by ID."""
-    devotional = db.query(Devotional).filter(Devotional.id == devotional_id).first()
+    result = await db.execute(select(Devotional).where(Devotional.id == devotional_id))
+    devotional = result.scalars().first()
     if not devotional:
         raise HTTPException(status_code=404, detail="Devotional not found")
     return devotional
@@ -70,6 +117,7 @@ async def create_devotional(
     db.add(db_devotional)
     db.commit()
     db.refresh(db_devotional)
+    response_cache.invalidate(Devotional.__tablename__)
     
     return db_devotional
 
@@ -92,6 +140,7 @@ async def update_devotional(
     db_devotional.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_devotional)
+    response_cache.invalidate(Devotional.__tablename__)
     
     return db_devotional
 
@@ -108,5 +157,6 @@ async def delete_devotional(
     
     db.delete(db_devotional)
     db.commit()
+    response_cache.invalidate(Devotional.__tablename__)
     
     return {"message": "Devotional deleted successfully"}
@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-import shutil
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_async_db
 from models import Event, User
 from schemas import EventCreate, EventUpdate, Event as EventSchema
 from utils.auth import get_current_user, get_current_admin_user
+from file_server import write_stream, FileTooLargeError, MAX_UPLOAD_SIZE
+from utils.image_variants import schedule_variants
+from utils.cache import response_cache, cache_key, CacheEntry
+from utils.etag import check_etag
+from utils.search import search_filter
+from utils.pagination import paginate, page_with_cursor, cursor_headers
+from utils.fast_json import RowSerializer, json_response
 
 router = APIRouter()
 
+# List pages are built from column tuples and encoded directly (see utils/fast_json.py)
+event_rows = RowSerializer(EventSchema, Event)
+
 # File upload configuration
 UPLOAD_DIR = "uploads/events"
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
@@ -25,39 +36,57 @@ def is_valid_file_extension(filename: str) -> bool:
 
 @router.get("/", response_model=List[EventSchema])
 async def get_events(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
     featured: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all events with optional filtering."""
-    query = db.query(Event)
+    """
+    Get all events with optional filtering.
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next one.
+    """
+    query = event_rows.select()
     
     if category and category != "all":
-        query = query.filter(Event.category == category)
+        query = query.where(Event.category == category)
     
     if featured is not None:
-        query = query.filter(Event.featured == featured)
+        query = query.where(Event.featured == featured)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Event.title.ilike(search_term)) |
-            (Event.description.ilike(search_term))
-        )
+        query = query.where(search_filter(Event, search))
     
     # Order by date (upcoming first)
-    query = query.order_by(Event.date.asc())
+    query = paginate(query, Event.date, descending=False, cursor=cursor, skip=skip, limit=limit)
     
-    events = query.offset(skip).limit(limit).all()
-    return events
+    key = cache_key(
+        Event.__tablename__, "list",
+        skip=skip, limit=limit, category=category, featured=featured,
+        search=search, cursor=cursor
+    )
+    not_modified = check_etag(request, response, key)
+    if not_modified is not None:
+        return not_modified
+    
+    async def load():
+        result = await db.execute(query)
+        events = page_with_cursor(result.all(), "date", limit, response)
+        return CacheEntry(event_rows.to_dicts(events), headers=cursor_headers(response))
+    
+    entry = await response_cache.get_or_load(key, load)
+    entry.apply_headers(response)
+    return json_response(entry.body, response)
 
 @router.get("/{event_id}", response_model=EventSchema)
-async def get_event(event_id: int, db: Session = Depends(get_db)):
+async def get_event(event_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific event by ID."""
-    event = db.query(Event).filter(Event.id == event_id).first()
+    result = await db.execute(select(Event).where(Event.id == event_id))
+    event = result.scalars().first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
@@ -78,6 +107,7 @@ async def create_event(
     db.add(db_event)
     db.commit()
     db.refresh(db_event)
+    response_cache.invalidate(Event.__tablename__)
     
     return db_event
 
@@ -100,6 +130,7 @@ async def update_event(
     db_event.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_event)
+    response_cache.invalidate(Event.__tablename__)
     
     return db_event
 
@@ -125,6 +156,7 @@ async def delete_event(
     
     db.delete(db_event)
     db.commit()
+    response_cache.invalidate(Event.__tablename__)
     
     return {"message": "Event deleted successfully"}
 
@@ -150,8 +182,10 @@ async def upload_event_image(
     file_path = os.path.join(UPLOAD_DIR, filename)
     
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await write_stream(file, file_path, MAX_UPLOAD_SIZE["image"])
+        schedule_variants(file_path)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
     
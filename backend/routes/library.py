@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-import shutil
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_async_db
 from models import LibraryItem, User
 from schemas import LibraryItemCreate, LibraryItemUpdate, LibraryItem as LibraryItemSchema
 from utils.auth import get_current_user, get_current_admin_user
+from file_server import write_stream, FileTooLargeError, MAX_UPLOAD_SIZE
+from utils.image_variants import schedule_variants
+from utils.counters import counters, client_key
+from utils.search import search_filter
+from utils.fast_json import RowSerializer, json_response
 
 router = APIRouter()
 
+# List pages are built from column tuples and encoded directly (see utils/fast_json.py)
+# Content and preview are only sent with include=content,preview_content
+library_rows = RowSerializer(LibraryItemSchema, LibraryItem, deferred=["preview_content", "content"])
+
 # File upload configuration
 UPLOAD_DIR = "uploads"
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".pdf", ".doc", ".docx", ".txt"}
@@ -30,38 +40,39 @@ async def get_library_items(
     type_filter: Optional[str] = None,
     category_filter: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all library items with optional filtering."""
-    query = db.query(LibraryItem)
+    """
+    Get all library items with optional filtering.
+    `content` and `preview_content` are left out unless named in `include`.
+    """
+    query = library_rows.select(library_rows.included(include))
     
     if type_filter and type_filter != "all":
-        query = query.filter(LibraryItem.type == type_filter)
+        query = query.where(LibraryItem.type == type_filter)
     
     if category_filter and category_filter != "all":
-        query = query.filter(LibraryItem.category == category_filter)
+        query = query.where(LibraryItem.category == category_filter)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (LibraryItem.title.ilike(search_term)) |
-            (LibraryItem.author.ilike(search_term)) |
-            (LibraryItem.description.ilike(search_term))
-        )
+        query = query.where(search_filter(LibraryItem, search))
     
-    items = query.offset(skip).limit(limit).all()
-    return items
+    result = await db.execute(query.offset(skip).limit(limit))
+    items = library_rows.to_dicts(result.all())
+    return json_response(counters.overlay_dicts(LibraryItem, items, "views", "downloads"))
 
 @router.get("/{item_id}", response_model=LibraryItemSchema)
-async def get_library_item(item_id: int, db: Session = Depends(get_db)):
+async def get_library_item(item_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get a specific library item by ID."""
-    item = db.query(LibraryItem).filter(LibraryItem.id == item_id).first()
+    result = await db.execute(select(LibraryItem).where(LibraryItem.id == item_id))
+    item = result.scalars().first()
     if not item:
         raise HTTPException(status_code=404, detail="Library item not found")
     
-    # Increment view count
-    item.views += 1
-    db.commit()
+    # Increment view count (buffered, written in batches)
+    counters.increment(LibraryItem, item.id, "views", client=client_key(request))
+    counters.overlay([item], "views", "downloads")
     
     return item
 
@@ -153,39 +164,43 @@ async def upload_cover_image(
     file_path = os.path.join(UPLOAD_DIR, filename)
     
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await write_stream(file, file_path, MAX_UPLOAD_SIZE["image"])
+        schedule_variants(file_path)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
     
     return {"filename": filename, "url": f"/uploads/{filename}"}
 
 @router.get("/categories")
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(db: AsyncSession = Depends(get_async_db)):
     """Get all available categories."""
-    categories = db.query(LibraryItem.category).distinct().all()
+    result = await db.execute(select(LibraryItem.category).distinct())
+    categories = result.all()
     return [cat[0] for cat in categories if cat[0]]
 
 @router.get("/types")
-async def get_types(db: Session = Depends(get_db)):
+async def get_types(db: AsyncSession = Depends(get_async_db)):
     """Get all available types."""
-    types = db.query(LibraryItem.type).distinct().all()
+    result = await db.execute(select(LibraryItem.type).distinct())
+    types = result.all()
     return [t[0] for t in types if t[0]]
 
 @router.post("/{item_id}/download")
 async def download_library_item(
     item_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Record a download for a library item."""
-    db_item = db.query(LibraryItem).filter(LibraryItem.id == item_id).first()
+    result = await db.execute(select(LibraryItem).where(LibraryItem.id == item_id))
+    db_item = result.scalars().first()
     if not db_item:
         raise HTTPException(status_code=404, detail="Library item not found")
     
-    # Increment download count
-    db_item.downloads += 1
-    db.commit()
+    # Increment download count (buffered, written in batches)
+    counters.increment(LibraryItem, db_item.id, "downloads")
     
     return {"message": "Download recorded successfully"}
 
@@ -5,15 +5,45 @@ import shutil
 from datetime import datetime
 import httpx
 import re
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from database import get_db
-from models import Podcast, User
-from schemas import PodcastCreate, PodcastUpdate, Podcast as PodcastSchema
+from database import get_db, get_async_db
+from models import Podcast, User, ListeningProgress
+from schemas import (
+    PodcastCreate, PodcastUpdate, Podcast as PodcastSchema,
+    ListeningProgressUpdate, ListeningProgress as ListeningProgressSchema
+)
 from utils.auth import get_current_user, get_current_admin_user
+from utils.streaming import (
+    RangeFileResponse,
+    content_range_covers_file,
+    file_validators,
+    if_range_matches,
+    parse_range_header,
+)
+from utils.drive_client import DRIVE_POOL_RETRY_AFTER, open_drive_stream
+from utils.drive_cache import drive_cache
+from utils.counters import counters, client_key
+from utils.search import search_filter
+from utils.pagination import paginate, page_with_cursor, cursor_headers
+from utils.cache import response_cache, cache_key, CacheEntry
+from utils.etag import check_etag, etag_matches
+from utils.fast_json import FastJSONResponse, RowSerializer, json_response
+from utils.stats import count_where
+from utils.image_variants import schedule_variants
+from utils.audio_metadata import read_metadata, apply_metadata, attach_peaks, local_media_path
+from utils.faststart import schedule_faststart
+from utils.hls import schedule_hls, remove_hls, hls_file, PLAYLIST_NAME
+from utils.peaks import can_compute_peaks, peaks_path, schedule_peaks
+from utils.progress import progress
 from file_server import (
-    save_file,
+    save_file_stream,
+    write_stream,
+    FileTooLargeError,
+    MAX_UPLOAD_SIZE,
     delete_file as delete_storage_file,
     get_mime_type,
     validate_file_extension
@@ -34,6 +64,10 @@ STORAGE_MODE = "local"  # Always use local storage
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(AUDIO_DIR, exist_ok=True)
 
+# List pages are built from column tuples and encoded directly (see utils/fast_json.py)
+# Transcripts are only sent with include=transcript
+podcast_rows = RowSerializer(PodcastSchema, Podcast, deferred=["transcript"])
+
 def is_valid_file_extension(filename: str, file_type: str = "image") -> bool:
     """Check if file has valid extension."""
     allowed = ALLOWED_AUDIO_EXTENSIONS if file_type == "audio" else ALLOWED_IMAGE_EXTENSIONS
@@ -41,56 +75,118 @@ def is_valid_file_extension(filename: str, file_type: str = "image") -> bool:
 
 @router.get("/", response_model=List[PodcastSchema])
 async def get_podcasts(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
     type_filter: Optional[str] = None,
     is_live: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all podcasts with optional filtering."""
-    query = db.query(Podcast)
+    """
+    Get all podcasts with optional filtering.
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next one.
+    Transcripts are left out unless requested with `include=transcript`.
+    """
+    included = podcast_rows.included(include)
+    query = podcast_rows.select(included)
     
     if category and category != "all":
-        query = query.filter(Podcast.category == category)
+        query = query.where(Podcast.category == category)
     
     if type_filter and type_filter != "all":
-        query = query.filter(Podcast.type == type_filter)
+        query = query.where(Podcast.type == type_filter)
     
     if is_live is not None:
-        query = query.filter(Podcast.is_live == is_live)
+        query = query.where(Podcast.is_live == is_live)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Podcast.title.ilike(search_term)) |
-            (Podcast.host.ilike(search_term)) |
-            (Podcast.description.ilike(search_term))
-        )
+        query = query.where(search_filter(Podcast, search))
     
     # Order by publish date (newest first)
-    query = query.order_by(Podcast.publish_date.desc())
+    query = paginate(query, Podcast.publish_date, descending=True, cursor=cursor, skip=skip, limit=limit)
+    
+    key = cache_key(
+        Podcast.__tablename__, "list",
+        skip=skip, limit=limit, category=category, type_filter=type_filter,
+        is_live=is_live, search=search, cursor=cursor, include=",".join(included) or None
+    )
+    # Buffered plays are part of the body, so they are part of the ETag too
+    not_modified = check_etag(request, response, key, counters.version(Podcast))
+    if not_modified is not None:
+        return not_modified
+    
+    async def load():
+        result = await db.execute(query)
+        podcasts = page_with_cursor(result.all(), "publish_date", limit, response)
+        return CacheEntry(podcast_rows.to_dicts(podcasts), headers=cursor_headers(response))
     
     try:
-        podcasts = query.offset(skip).limit(limit).all()
-        return podcasts
+        entry = await response_cache.get_or_load(key, load)
+        entry.apply_headers(response)
+        return json_response(counters.overlay_dicts(Podcast, entry.body, "plays"), response)
     except Exception as e:
         import traceback
         print(f"Error in get_podcasts: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error fetching podcasts: {str(e)}")
 
+# Declared before /{podcast_id} so "stats" is not taken for an id
+@router.get("/stats")
+async def get_podcast_stats(
+    limit: int = 5,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Podcast totals and the most played episodes (admin only), from one
+    aggregate query instead of the whole catalog.
+    """
+    limit = max(1, min(limit, 50))
+
+    async def load():
+        totals = (await db.execute(select(
+            func.count().label("total_podcasts"),
+            func.coalesce(func.sum(Podcast.plays), 0).label("total_plays"),
+            count_where(Podcast.is_live == True).label("live_podcasts"),
+            func.coalesce(func.sum(Podcast.duration_seconds), 0).label("total_duration_seconds"),
+        ))).one()
+        top = await db.execute(
+            select(Podcast.id, Podcast.title, Podcast.plays)
+            .order_by(Podcast.plays.desc().nulls_last(), Podcast.id)
+            .limit(limit)
+        )
+        return CacheEntry({
+            **{name: value for name, value in totals._mapping.items()},
+            "top_podcasts": [dict(row._mapping) for row in top.all()],
+        })
+
+    entry = await response_cache.get_or_load(cache_key(Podcast.__tablename__, "stats", limit=limit), load)
+    # Plays not yet written by the counter buffer
+    top_podcasts = counters.overlay_dicts(Podcast, entry.body["top_podcasts"], "plays")
+    top_podcasts.sort(key=lambda podcast: podcast["plays"] or 0, reverse=True)
+    return {
+        **entry.body,
+        "total_plays": int(entry.body["total_plays"]) + counters.pending_total(Podcast, "plays"),
+        "total_duration_seconds": float(entry.body["total_duration_seconds"]),
+        "top_podcasts": top_podcasts,
+    }
+
 @router.get("/{podcast_id}", response_model=PodcastSchema)
-async def get_podcast(podcast_id: int, db: Session = Depends(get_db)):
+async def get_podcast(podcast_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get a specific podcast by ID."""
-    podcast = db.query(Podcast).filter(Podcast.id == podcast_id).first()
+    result = await db.execute(select(Podcast).where(Podcast.id == podcast_id))
+    podcast = result.scalars().first()
     if not podcast:
         raise HTTPException(status_code=404, detail="Podcast not found")
     
-    # Increment plays count
-    podcast.plays += 1
-    db.commit()
+    # Increment plays count (buffered, written in batches)
+    counters.increment(Podcast, podcast.id, "plays", client=client_key(request))
+    counters.overlay([podcast], "plays")
     
     return podcast
 
@@ -110,10 +206,14 @@ async def create_podcast(
             **podcast_data.dict(),
             created_by=None  # Temporary: disabled auth, no user required
         )
+        apply_metadata(db_podcast, await read_metadata(db_podcast.audio_url))
+        await attach_peaks(db_podcast)
         
         db.add(db_podcast)
         db.commit()
         db.refresh(db_podcast)
+        response_cache.invalidate(Podcast.__tablename__)
+        schedule_hls(db_podcast.id, db_podcast.audio_url)
         
         return db_podcast
     except Exception as e:
@@ -144,10 +244,16 @@ async def update_podcast(
     update_data = podcast_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_podcast, field, value)
+    if "audio_url" in update_data:
+        apply_metadata(db_podcast, await read_metadata(db_podcast.audio_url))
+        await attach_peaks(db_podcast)
     
     db_podcast.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_podcast)
+    response_cache.invalidate(Podcast.__tablename__)
+    if "audio_url" in update_data:
+        schedule_hls(db_podcast.id, db_podcast.audio_url)
     
     return db_podcast
 
@@ -189,8 +295,12 @@ async def delete_podcast(
         except Exception as e:
             print(f"Error deleting audio file: {e}")
     
+    remove_hls(podcast_id)
+    progress.discard(podcast_id)
+    
     db.delete(db_podcast)
     db.commit()
+    response_cache.invalidate(Podcast.__tablename__)
     
     return {"message": "Podcast deleted successfully"}
 
@@ -210,21 +320,21 @@ async def upload_podcast_cover(
             detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
         )
     
-    # Read file content
-    file_content = await file.read()
-    
-    # Use Python file server (local storage)
-    file_path, public_url = save_file(
-        file_content=file_content,
-        original_filename=file.filename,
-        category="podcasts",
-        subcategory="covers",
-        file_type="image",
-        preserve_filename=True
-    )
+    # Use Python file server (local storage), streaming the upload to disk
+    try:
+        saved = await save_file_stream(
+            file,
+            original_filename=file.filename,
+            category="podcasts",
+            subcategory="covers",
+            file_type="image",
+            preserve_filename=True
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    if file_path and public_url:
-        return {"filename": file.filename, "url": public_url}
+    if saved:
+        return {"filename": file.filename, "url": saved.url}
     
     # Legacy local storage fallback
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -233,8 +343,9 @@ async def upload_podcast_cover(
     file_path = os.path.join(UPLOAD_DIR, filename)
     
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        await file.seek(0)
+        await write_stream(file, file_path, MAX_UPLOAD_SIZE["image"])
+        schedule_variants(file_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
     
@@ -256,21 +367,26 @@ async def upload_podcast_audio(
             detail=f"Invalid audio file type. Allowed: {', '.join(ALLOWED_AUDIO_EXTENSIONS)}"
         )
     
-    # Read file content
-    file_content = await file.read()
-    
-    # Use Python file server (local storage)
-    file_path, public_url = save_file(
-        file_content=file_content,
-        original_filename=file.filename,
-        category="podcasts",
-        subcategory="audio",
-        file_type="audio",
-        preserve_filename=True
-    )
+    # Use Python file server (local storage), streaming the upload to disk
+    try:
+        saved = await save_file_stream(
+            file,
+            original_filename=file.filename,
+            category="podcasts",
+            subcategory="audio",
+            file_type="audio",
+            preserve_filename=True
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    if file_path and public_url:
-        return {"filename": file.filename, "url": public_url}
+    if saved:
+        metadata = await read_metadata(saved.url) or {}
+        # moov after the media data: remux in the background so playback can start from the first request
+        if metadata.get("faststart") is False:
+            schedule_faststart(saved.path)
+        schedule_peaks(saved.path)
+        return {"filename": file.filename, "url": saved.url, **metadata}
     
     # Legacy local storage fallback
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -279,24 +395,100 @@ async def upload_podcast_audio(
     file_path = os.path.join(AUDIO_DIR, filename)
     
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        await file.seek(0)
+        await write_stream(file, file_path, MAX_UPLOAD_SIZE["audio"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving audio file: {str(e)}")
     
-    return {"filename": filename, "url": f"/uploads/podcasts/audio/{filename}"}
+    url = f"/uploads/podcasts/audio/{filename}"
+    metadata = await read_metadata(url) or {}
+    if metadata.get("faststart") is False:
+        schedule_faststart(file_path)
+    schedule_peaks(file_path)
+    return {"filename": filename, "url": url, **metadata}
 
 @router.get("/categories/list")
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(db: AsyncSession = Depends(get_async_db)):
     """Get all available podcast categories."""
-    categories = db.query(Podcast.category).distinct().all()
-    return [cat[0] for cat in categories if cat[0]]
+    async def load():
+        result = await db.execute(select(Podcast.category).distinct())
+        categories = result.all()
+        return CacheEntry([cat[0] for cat in categories if cat[0]])
+    
+    entry = await response_cache.get_or_load(cache_key(Podcast.__tablename__, "categories"), load)
+    return entry.body
 
 @router.get("/types/list")
-async def get_types(db: Session = Depends(get_db)):
+async def get_types(db: AsyncSession = Depends(get_async_db)):
     """Get all available podcast types."""
-    types = db.query(Podcast.type).distinct().all()
-    return [t[0] for t in types if t[0]]
+    async def load():
+        result = await db.execute(select(Podcast.type).distinct())
+        types = result.all()
+        return CacheEntry([t[0] for t in types if t[0]])
+    
+    entry = await response_cache.get_or_load(cache_key(Podcast.__tablename__, "types"), load)
+    return entry.body
+
+async def podcast_durations(db: AsyncSession) -> dict:
+    """Stored audio duration by podcast id (cached; invalidated with the podcasts)."""
+    async def load():
+        result = await db.execute(select(Podcast.id, Podcast.duration_seconds))
+        return CacheEntry(dict(result.all()))
+    
+    entry = await response_cache.get_or_load(cache_key(Podcast.__tablename__, "durations"), load)
+    return entry.body
+
+@router.get("/progress/list", response_model=List[ListeningProgressSchema])
+async def get_listening_progress(
+    limit: int = 20,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """The current user's resume positions, most recently played first."""
+    result = await db.execute(
+        select(ListeningProgress)
+        .where(ListeningProgress.user_id == current_user.id)
+        .order_by(ListeningProgress.updated_at.desc())
+        .limit(limit)
+    )
+    return progress.merge(current_user.id, result.scalars().all())[:limit]
+
+@router.get("/{podcast_id}/progress", response_model=ListeningProgressSchema)
+async def get_podcast_progress(
+    podcast_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """The current user's resume position in one podcast."""
+    pending = progress.pending_for_user(current_user.id).get(podcast_id)
+    if pending is not None:
+        return pending
+    row = await db.get(ListeningProgress, (current_user.id, podcast_id))
+    if row is None:
+        raise HTTPException(status_code=404, detail="No progress for this podcast")
+    return row
+
+@router.put("/{podcast_id}/progress", response_model=ListeningProgressSchema)
+async def report_podcast_progress(
+    podcast_id: int,
+    progress_data: ListeningProgressUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Report the current user's playback position (player heartbeat). Buffered
+    and written in batches, see utils/progress.py.
+    """
+    durations = await podcast_durations(db)
+    if podcast_id not in durations:
+        raise HTTPException(status_code=404, detail="Podcast not found")
+    return progress.report(
+        current_user.id,
+        podcast_id,
+        progress_data.position_seconds,
+        progress_data.duration_seconds or durations[podcast_id],
+        progress_data.completed
+    )
 
 def extract_drive_file_id(url: str) -> Optional[str]:
     """Extract file ID from Google Drive URL."""
@@ -357,7 +549,7 @@ async def stream_podcast_audio_options(
         headers={
             "Access-Control-Allow-Origin": origin,
             "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
-            "Access-Control-Allow-Headers": "Range, Content-Type, Accept, Authorization",
+            "Access-Control-Allow-Headers": "Range, Content-Type, Accept, Authorization, If-Range",
             "Access-Control-Max-Age": "3600",
         }
     )
@@ -365,10 +557,11 @@ async def stream_podcast_audio_options(
 @router.get("/{podcast_id}/test-audio")
 async def test_podcast_audio(
     podcast_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Test endpoint to check audio file info without streaming."""
-    podcast = db.query(Podcast).filter(Podcast.id == podcast_id).first()
+    result = await db.execute(select(Podcast).where(Podcast.id == podcast_id))
+    podcast = result.scalars().first()
     if not podcast:
         raise HTTPException(status_code=404, detail="Podcast not found")
     
@@ -419,11 +612,166 @@ async def test_podcast_audio(
     
     return result
 
-@router.get("/{podcast_id}/stream")
+def serve_local_audio(
+    request: Request,
+    file_path: str,
+    media_type: str,
+    podcast: Podcast
+):
+    """Serve an audio file from local disk, honouring Range and If-Range requests."""
+    stat_result = os.stat(file_path)
+    file_size = stat_result.st_size
+    # The fast-start remux rewrites files under the same URL; these let caches tell the versions apart
+    validators = file_validators(stat_result)
+    
+    # Handle Range requests for audio streaming (required for browser playback)
+    range_header = request.headers.get("range")
+    
+    # A stale If-Range gets the whole current file rather than a range of it
+    if range_header and if_range_matches(request.headers.get("if-range"), validators):
+        # Parse range header (e.g., "bytes=0-1023")
+        byte_range = parse_range_header(range_header, file_size)
+        if byte_range:
+            start, end = byte_range
+            
+            # Increment plays count only on first request (start == 0)
+            if start == 0 and request.method != "HEAD":
+                counters.increment(Podcast, podcast.id, "plays", client=client_key(request))
+            
+            # Get allowed origin for CORS
+            origin = get_allowed_origin(request)
+            
+            headers = {
+                "Content-Type": media_type,  # Explicitly set Content-Type
+                "Accept-Ranges": "bytes",
+                "Content-Disposition": "inline",
+                "Cache-Control": "public, max-age=3600",
+                "Access-Control-Allow-Origin": origin,
+                "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
+                "Access-Control-Allow-Headers": "Range, Content-Type, Accept, If-Range",
+                "Access-Control-Expose-Headers": "Content-Range, Content-Length, Accept-Ranges, ETag",
+            }
+            print(f"   Streaming range {start}-{end} of {file_size} bytes with Content-Type: {media_type}")
+            # Content-Range and Content-Length are set by the range engine
+            return RangeFileResponse(
+                file_path,
+                start=start,
+                end=end,
+                file_size=file_size,
+                media_type=media_type,
+                headers=headers,
+                stat_result=stat_result
+            )
+    
+    # For full file requests, use FileResponse which handles range requests automatically
+    # This is more reliable for browser audio playback
+    # Increment plays count
+    if request.method != "HEAD":
+        counters.increment(Podcast, podcast.id, "plays", client=client_key(request))
+    
+    # Get allowed origin for CORS
+    origin = get_allowed_origin(request)
+    
+    # Use FileResponse for better browser compatibility
+    # FileResponse automatically handles range requests and sets correct headers
+    print(f"   Serving file ({file_size} bytes) with Content-Type: {media_type}")
+    response = FileResponse(
+        path=file_path,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": "inline",
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "public, max-age=3600",
+            "Access-Control-Allow-Origin": origin,
+            "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
+            "Access-Control-Allow-Headers": "Range, Content-Type, Accept, If-Range",
+            "Access-Control-Expose-Headers": "Content-Range, Content-Length, Accept-Ranges, ETag",
+            # Same validators as the 206 path (FileResponse keeps headers given here)
+            **validators,
+        },
+        stat_result=stat_result
+    )
+    return response
+
+def conditional_file_response(request: Request, path, media_type: str, cache_control: str) -> Response:
+    """FileResponse for derived media files, answering If-None-Match with a 304."""
+    response = FileResponse(
+        path,
+        media_type=media_type,
+        headers={"Cache-Control": cache_control},
+        stat_result=os.stat(path)
+    )
+    if etag_matches(request.headers.get("if-none-match"), response.headers["etag"]):
+        return Response(
+            status_code=304,
+            headers={"ETag": response.headers["etag"], "Cache-Control": cache_control}
+        )
+    return response
+
+@router.get("/{podcast_id}/hls/index.m3u8")
+async def get_hls_playlist(podcast_id: int, request: Request):
+    """HLS playlist for a podcast packaged with PODCAST_HLS_ENABLED (404 until it is ready)."""
+    path = hls_file(podcast_id, PLAYLIST_NAME)
+    if path is None:
+        raise HTTPException(status_code=404, detail="HLS playlist not available")
+    # Replaced when the audio changes, so clients revalidate it
+    return conditional_file_response(request, path, "application/vnd.apple.mpegurl", "no-cache")
+
+@router.get("/{podcast_id}/hls/{segment}")
+async def get_hls_segment(podcast_id: int, segment: str, request: Request):
+    """One HLS segment; names are tied to the audio's content, so they never change."""
+    path = hls_file(podcast_id, segment)
+    if path is None or segment == PLAYLIST_NAME:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    return conditional_file_response(request, path, "audio/aac", "public, max-age=31536000, immutable")
+
+@router.get("/{podcast_id}/peaks")
+async def get_podcast_peaks(
+    podcast_id: int,
+    request: Request,
+    v: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Waveform peaks sidecar for the podcast's audio (format in utils/peaks.py).
+    Requested with ``?v=`` matching the podcast's peaks_version (as in
+    peaks_url), the response is cacheable forever. Without a sidecar the
+    response is JSON with only ``duration_seconds``: 501 when this server
+    can't decode the audio (no ffmpeg or NumPy), 404 otherwise (not made yet,
+    or not local audio).
+    """
+    result = await db.execute(
+        select(Podcast.audio_url, Podcast.peaks_version, Podcast.duration_seconds)
+        .where(Podcast.id == podcast_id)
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Podcast not found")
+    audio_path = local_media_path(row.audio_url)
+    path = peaks_path(audio_path) if audio_path is not None else None
+    if path is None or not path.is_file():
+        # No sidecar: the player draws a plain bar from the duration instead
+        if audio_path is not None and audio_path.is_file() and not can_compute_peaks(audio_path):
+            status_code, detail = 501, "Waveform peaks need ffmpeg to decode this audio on the server"
+        else:
+            status_code, detail = 404, "Waveform peaks not available"
+        return FastJSONResponse(
+            {"detail": detail, "duration_seconds": row.duration_seconds},
+            status_code=status_code
+        )
+    immutable = v is not None and v == row.peaks_version
+    return conditional_file_response(
+        request,
+        path,
+        "application/octet-stream",
+        "public, max-age=31536000, immutable" if immutable else "no-cache"
+    )
+
+@router.api_route("/{podcast_id}/stream", methods=["GET", "HEAD"])
 async def stream_podcast_audio(
     podcast_id: int,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Stream podcast audio through backend proxy to prevent direct downloads.
@@ -431,7 +779,8 @@ async def stream_podcast_audio(
     Content is available to users, but downloads are restricted via headers.
     """
     # Get podcast
-    podcast = db.query(Podcast).filter(Podcast.id == podcast_id).first()
+    result = await db.execute(select(Podcast).where(Podcast.id == podcast_id))
+    podcast = result.scalars().first()
     if not podcast:
         print(f"❌ Stream request: Podcast {podcast_id} not found")
         raise HTTPException(status_code=404, detail="Podcast not found")
@@ -479,9 +828,6 @@ async def stream_podcast_audio(
             print(f"❌ Audio file not found: {file_path}")
             raise HTTPException(status_code=404, detail=f"Audio file not found on server: {file_path}")
         
-        # Get file size
-        file_size = os.path.getsize(file_path)
-        
         # Determine media type from file extension
         # Use standard MIME types that browsers recognize
         file_ext = os.path.splitext(file_path)[1].lower()
@@ -497,93 +843,7 @@ async def stream_podcast_audio(
         print(f"   Detected file extension: {file_ext}")
         print(f"   Using media type: {media_type}")
         
-        # Handle Range requests for audio streaming (required for browser playback)
-        range_header = request.headers.get("range")
-        
-        if range_header:
-            # Parse range header (e.g., "bytes=0-1023")
-            match = re.match(r"bytes=(\d+)-(\d*)", range_header)
-            if match:
-                start = int(match.group(1))
-                end = int(match.group(2)) if match.group(2) else file_size - 1
-                
-                # Validate range
-                if start >= file_size or end >= file_size or start > end:
-                    raise HTTPException(
-                        status_code=416,
-                        detail="Range Not Satisfiable",
-                        headers={"Content-Range": f"bytes */{file_size}"}
-                    )
-                
-                content_length = end - start + 1
-                
-                async def generate_range():
-                    """Stream audio data for range request."""
-                    with open(file_path, "rb") as f:
-                        f.seek(start)
-                        remaining = content_length
-                        while remaining > 0:
-                            chunk_size = min(8192, remaining)
-                            chunk = f.read(chunk_size)
-                            if not chunk:
-                                break
-                            yield chunk
-                            remaining -= len(chunk)
-                
-                # Increment plays count only on first request (start == 0)
-                if start == 0:
-                    podcast.plays += 1
-                    db.commit()
-                
-                # Get allowed origin for CORS
-                origin = get_allowed_origin(request)
-                
-                headers = {
-                    "Content-Type": media_type,  # Explicitly set Content-Type
-                    "Content-Range": f"bytes {start}-{end}/{file_size}",
-                    "Accept-Ranges": "bytes",
-                    "Content-Length": str(content_length),
-                    "Content-Disposition": "inline",
-                    "Cache-Control": "public, max-age=3600",
-                    "Access-Control-Allow-Origin": origin,
-                    "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
-                    "Access-Control-Allow-Headers": "Range, Content-Type, Accept",
-                    "Access-Control-Expose-Headers": "Content-Range, Content-Length, Accept-Ranges",
-                }
-                print(f"   Streaming range {start}-{end} of {file_size} bytes with Content-Type: {media_type}")
-                return StreamingResponse(
-                    generate_range(),
-                    status_code=206,  # Partial Content
-                    media_type=media_type,
-                    headers=headers
-                )
-        
-        # For full file requests, use FileResponse which handles range requests automatically
-        # This is more reliable for browser audio playback
-        # Increment plays count
-        podcast.plays += 1
-        db.commit()
-        
-        # Get allowed origin for CORS
-        origin = get_allowed_origin(request)
-        
-        # Use FileResponse for better browser compatibility
-        # FileResponse automatically handles range requests and sets correct headers
-        print(f"   Serving file ({file_size} bytes) with Content-Type: {media_type}")
-        response = FileResponse(
-            path=file_path,
-            media_type=media_type,
-            headers={
-                "Content-Disposition": "inline",
-                "Accept-Ranges": "bytes",
-                "Cache-Control": "public, max-age=3600",
-                "Access-Control-Allow-Origin": origin,
-                "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
-                "Access-Control-Allow-Headers": "Range, Content-Type, Accept",
-                "Access-Control-Expose-Headers": "Content-Range, Content-Length, Accept-Ranges",
-            }
-        )
-        return response
+        return serve_local_audio(request, file_path, media_type, podcast)
     
     # Otherwise, it's a Google Drive link - proxy it
     print(f"   Treating as Google Drive link")
@@ -594,9 +854,6 @@ async def stream_podcast_audio(
     
     print(f"   Extracted Google Drive file ID: {file_id}")
     
-    # Convert to streaming URL
-    stream_url = f"https://drive.google.com/uc?export=open&id={file_id}"
-    
     # Try to detect file type from the original URL
     # Check if we can infer from the URL
     detected_media_type = None
@@ -613,31 +870,6 @@ async def stream_podcast_audio(
     elif ".aac" in original_url_lower:
         detected_media_type = "audio/aac"
     
-    # Increment plays count
-    podcast.plays += 1
-    db.commit()
-    
-    async def generate():
-        """Stream audio data from Google Drive."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                async with client.stream('GET', stream_url, follow_redirects=True) as response:
-                    if response.status_code != 200:
-                        raise HTTPException(
-                            status_code=response.status_code,
-                            detail="Failed to fetch audio from Google Drive"
-                        )
-                    
-                    # Try to get Content-Type from Google Drive response
-                    content_type_from_drive = response.headers.get("Content-Type", "")
-                    if content_type_from_drive:
-                        print(f"   Google Drive Content-Type: {content_type_from_drive}")
-                    
-                    async for chunk in response.aiter_bytes(chunk_size=8192):
-                        yield chunk
-            except httpx.RequestError as e:
-                raise HTTPException(status_code=500, detail=f"Error streaming audio: {str(e)}")
-    
     # Determine media type: prefer detected type, then accept header, finally default
     accept_header = request.headers.get("accept", "").lower()
     media_type = None
@@ -661,6 +893,61 @@ async def stream_podcast_audio(
     
     print(f"   Final media type for Google Drive: {media_type}")
     
+    # Serve from the local cache when a previous listen already stored the file
+    cached_path = drive_cache.lookup(file_id)
+    if cached_path:
+        print(f"   Serving Google Drive file {file_id} from local cache")
+        return serve_local_audio(request, str(cached_path), media_type, podcast)
+    
+    is_head = request.method == "HEAD"
+    range_header = request.headers.get("range")
+    
+    # Increment plays count (only for an actual listen from the start)
+    if not is_head and (not range_header or range_header.strip() == "bytes=0-"):
+        counters.increment(Podcast, podcast.id, "plays", client=client_key(request))
+    
+    # Forward the client's Range so seeks only fetch the bytes they need
+    upstream_headers = {"Range": range_header} if range_header else None
+    
+    # Open the upstream response on the shared, pooled client before replying
+    # so upstream failures surface as a proper error status
+    try:
+        upstream = await open_drive_stream(
+            file_id,
+            method="HEAD" if is_head else "GET",
+            headers=upstream_headers
+        )
+    except httpx.PoolTimeout:
+        # Every upstream connection is busy; the player can retry shortly
+        raise HTTPException(
+            status_code=503,
+            detail="Too many Google Drive streams at once, please try again",
+            headers={"Retry-After": str(DRIVE_POOL_RETRY_AFTER)}
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Error streaming audio: {str(e)}")
+    
+    if upstream.status_code == 416:
+        await upstream.aclose()
+        content_range = upstream.headers.get("Content-Range")
+        raise HTTPException(
+            status_code=416,
+            detail="Range Not Satisfiable",
+            headers={"Content-Range": content_range} if content_range else None
+        )
+    
+    if upstream.status_code not in (200, 206):
+        await upstream.aclose()
+        raise HTTPException(
+            status_code=upstream.status_code,
+            detail="Failed to fetch audio from Google Drive"
+        )
+    
+    # Try to get Content-Type from Google Drive response
+    content_type_from_drive = upstream.headers.get("Content-Type", "")
+    if content_type_from_drive:
+        print(f"   Google Drive Content-Type: {content_type_from_drive}")
+    
     # Get allowed origin for CORS
     origin = get_allowed_origin(request)
     
@@ -675,9 +962,52 @@ async def stream_podcast_audio(
         "Access-Control-Allow-Headers": "Range, Content-Type, Accept",
         "Access-Control-Expose-Headers": "Content-Range, Content-Length, Accept-Ranges",
     }
-    print(f"   Streaming Google Drive file with Content-Type: {media_type}")
+    # Pass the upstream framing through so partial responses stay valid
+    for name in ("Content-Length", "Content-Range"):
+        value = upstream.headers.get(name)
+        if value:
+            headers[name] = value
+    
+    if is_head:
+        await upstream.aclose()
+        return Response(status_code=upstream.status_code, headers=headers, media_type=media_type)
+    
+    # Tee the body into the local cache when upstream sent the whole file
+    # (browsers start playback with "Range: bytes=0-", answered as 206)
+    cache_writer = None
+    expected_size = None
+    if upstream.status_code == 200 or content_range_covers_file(upstream.headers.get("Content-Range")):
+        content_length = upstream.headers.get("Content-Length")
+        expected_size = int(content_length) if content_length and content_length.isdigit() else None
+        cache_writer = drive_cache.begin_fill(file_id, expected_size)
+    
+    async def generate():
+        """Stream audio data from Google Drive, copying it to the cache."""
+        writer = cache_writer
+        completed = False
+        try:
+            async for chunk in upstream.iter_bytes():
+                if writer:
+                    try:
+                        await writer.write(chunk)
+                    except (OSError, ValueError) as e:
+                        print(f"⚠️ Drive cache: giving up on {file_id}: {e}")
+                        writer.abort()
+                        writer = None
+                yield chunk
+            completed = True
+        finally:
+            await upstream.aclose()
+            if writer:
+                if completed:
+                    await writer.commit(expected_size)
+                else:
+                    writer.abort()
+    
+    print(f"   Streaming Google Drive file ({upstream.status_code}) with Content-Type: {media_type}")
     return StreamingResponse(
         generate(),
+        status_code=upstream.status_code,
         media_type=media_type,
         headers=headers
     )
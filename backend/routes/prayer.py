@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from database import get_db
+from database import get_db, get_async_db
 from models import PrayerRequest, User
 from schemas import PrayerRequestCreate, PrayerRequestUpdate, PrayerRequest as PrayerRequestSchema
 from utils.auth import get_current_user, get_current_admin_user
+from utils.pagination import paginate, page_with_cursor
+from utils.stats import PRAYER_STATS
 
 router = APIRouter()
 
@@ -30,38 +34,46 @@ async def create_prayer_request(
 
 @router.get("/", response_model=List[PrayerRequestSchema])
 async def get_prayer_requests(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[str] = None,
     is_private: Optional[bool] = None,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get prayer requests based on user role."""
+    """
+    Get prayer requests based on user role (newest first).
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next one.
+    """
     if current_user.is_admin:
         # Admins can see all prayer requests
-        query = db.query(PrayerRequest)
+        query = select(PrayerRequest)
         
         if status_filter and status_filter != "all":
-            query = query.filter(PrayerRequest.status == status_filter)
+            query = query.where(PrayerRequest.status == status_filter)
         
         if is_private is not None:
-            query = query.filter(PrayerRequest.is_private == is_private)
+            query = query.where(PrayerRequest.is_private == is_private)
     else:
         # Regular users can only see their own prayer requests
-        query = db.query(PrayerRequest).filter(PrayerRequest.requester_id == current_user.id)
+        query = select(PrayerRequest).where(PrayerRequest.requester_id == current_user.id)
     
-    prayer_requests = query.offset(skip).limit(limit).order_by(PrayerRequest.created_at.desc()).all()
+    query = paginate(query, PrayerRequest.created_at, descending=True, cursor=cursor, skip=skip, limit=limit)
+    result = await db.execute(query)
+    prayer_requests = page_with_cursor(result.scalars().all(), "created_at", limit, response)
     return prayer_requests
 
 @router.get("/{prayer_id}", response_model=PrayerRequestSchema)
 async def get_prayer_request(
     prayer_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific prayer request."""
-    prayer_request = db.query(PrayerRequest).filter(PrayerRequest.id == prayer_id).first()
+    result = await db.execute(select(PrayerRequest).where(PrayerRequest.id == prayer_id))
+    prayer_request = result.scalars().first()
     if not prayer_request:
         raise HTTPException(status_code=404, detail="Prayer request not found")
     
@@ -150,23 +162,7 @@ async def update_prayer_status(
     return {"message": f"Prayer request status updated to {status}"}
 
 @router.get("/stats/overview")
-async def get_prayer_stats(current_user: User = Depends(get_current_admin_user), db: Session = Depends(get_db)):
+async def get_prayer_stats(current_user: User = Depends(get_current_admin_user), db: AsyncSession = Depends(get_async_db)):
     """Get prayer request statistics (admin only)."""
-    total_requests = db.query(PrayerRequest).count()
-    pending_requests = db.query(PrayerRequest).filter(PrayerRequest.status == "pending").count()
-    in_progress_requests = db.query(PrayerRequest).filter(PrayerRequest.status == "in_progress").count()
-    answered_requests = db.query(PrayerRequest).filter(PrayerRequest.status == "answered").count()
-    private_requests = db.query(PrayerRequest).filter(PrayerRequest.is_private == True).count()
-    
-    # Recent requests (last 7 days)
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_requests = db.query(PrayerRequest).filter(PrayerRequest.created_at >= seven_days_ago).count()
-    
-    return {
-        "total_requests": total_requests,
-        "pending_requests": pending_requests,
-        "in_progress_requests": in_progress_requests,
-        "answered_requests": answered_requests,
-        "private_requests": private_requests,
-        "recent_requests": recent_requests
-    }
+    # One aggregate query (or daily_stats rows with STATS_TABLE_ENABLED)
+    return await PRAYER_STATS.read(db)
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime
+
+from database import get_async_db
+from models import Podcast, LibraryItem, Event, Announcement
+from schemas import SearchResults
+from utils.search import ranked_search_query
+from utils.counters import counters
+
+router = APIRouter()
+
+# Content types available to /api/search, keyed by the response field
+SEARCH_TYPES = {
+    "podcasts": Podcast,
+    "library": LibraryItem,
+    "events": Event,
+    "announcements": Announcement,
+}
+
+@router.get("/", response_model=SearchResults)
+async def search(
+    q: str,
+    types: Optional[str] = None,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search podcasts (including transcripts), library items (including content),
+    events and announcements. Results are ranked per type, best match first.
+    `types` is an optional comma-separated subset, e.g. "podcasts,library".
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query is required")
+    
+    if types:
+        requested = [t.strip() for t in types.split(",") if t.strip()]
+        unknown = [t for t in requested if t not in SEARCH_TYPES]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown search type(s): {', '.join(unknown)}. Allowed: {', '.join(SEARCH_TYPES)}"
+            )
+    else:
+        requested = list(SEARCH_TYPES)
+    
+    limit = max(1, min(limit, 50))
+    results = {"query": q}
+    
+    for name in requested:
+        model = SEARCH_TYPES[name]
+        query = ranked_search_query(model, q)
+        
+        if model is Announcement:
+            # Only announcements that are currently shown
+            now = datetime.utcnow()
+            query = query.where(
+                Announcement.is_active == True,
+                (Announcement.expires_at.is_(None)) | (Announcement.expires_at > now)
+            )
+        
+        result = await db.execute(query.limit(limit))
+        rows = result.scalars().all()
+        
+        if model is Podcast:
+            counters.overlay(rows, "plays")
+        elif model is LibraryItem:
+            counters.overlay(rows, "views", "downloads")
+        
+        results[name] = rows
+    
+    return results
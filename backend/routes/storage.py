@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+import anyio
+
+from models import User
+from utils.auth import get_current_admin_user
+from file_server import get_storage_info, storage_usage, storage_directories
+
+router = APIRouter()
+
+@router.get("/stats")
+async def get_storage_stats(
+    reconcile: bool = False,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Storage usage per category and subcategory (admin only).
+    Served from the usage index; pass `reconcile=true` to re-scan changed directories first.
+    """
+    if reconcile:
+        await anyio.to_thread.run_sync(storage_usage.reconcile, storage_directories())
+    return get_storage_info()
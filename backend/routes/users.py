@@ -1,27 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from database import get_db
+from database import get_db, get_async_db
 from models import User, LibraryItem, PrayerRequest
 from schemas import User as UserSchema, UserUpdate, UserCreate
-from utils.auth import get_current_user, get_current_admin_user
+from utils.auth import get_current_user, get_current_admin_user, invalidate_user_cache, UserPrincipal
+from utils.stats import USER_STATS
 
 router = APIRouter()
 
+def load_current_user(principal: UserPrincipal, db: Session) -> User:
+    """The full row of the authenticated user (get_current_user only returns a principal)."""
+    user = db.query(User).filter(User.id == principal.id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
 @router.get("/me", response_model=UserSchema)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(
+    principal: UserPrincipal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Get current user information."""
-    return current_user
+    return load_current_user(principal, db)
 
 @router.put("/me", response_model=UserSchema)
 async def update_current_user(
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    principal: UserPrincipal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update current user information."""
+    current_user = load_current_user(principal, db)
     # Check if email/username already exists (if being changed)
     if user_data.email and user_data.email != current_user.email:
         existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -46,6 +60,7 @@ async def update_current_user(
     
     current_user.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_user_cache()
     db.refresh(current_user)
     
     return current_user
@@ -57,33 +72,35 @@ async def get_users(
     search: Optional[str] = None,
     is_admin: Optional[bool] = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all users (admin only)."""
-    query = db.query(User)
+    query = select(User)
     
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             (User.full_name.ilike(search_term)) |
             (User.email.ilike(search_term)) |
             (User.username.ilike(search_term))
         )
     
     if is_admin is not None:
-        query = query.filter(User.is_admin == is_admin)
+        query = query.where(User.is_admin == is_admin)
     
-    users = query.offset(skip).limit(limit).all()
+    result = await db.execute(query.offset(skip).limit(limit))
+    users = result.scalars().all()
     return users
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def get_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific user by ID (admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -125,6 +142,7 @@ async def update_user(
     
     user.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_user_cache()
     db.refresh(user)
     
     return user
@@ -158,6 +176,7 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    invalidate_user_cache()
     
     return {"message": "User deleted successfully"}
 
@@ -181,6 +200,7 @@ async def deactivate_user(
     user.is_active = False
     user.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_user_cache()
     
     return {"message": "User deactivated successfully"}
 
@@ -198,25 +218,20 @@ async def activate_user(
     user.is_active = True
     user.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_user_cache()
     
     return {"message": "User activated successfully"}
 
 @router.get("/stats/overview")
-async def get_user_stats(current_user: User = Depends(get_current_admin_user), db: Session = Depends(get_db)):
+async def get_user_stats(current_user: User = Depends(get_current_admin_user), db: AsyncSession = Depends(get_async_db)):
     """Get user statistics overview (admin only)."""
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    admin_users = db.query(User).filter(User.is_admin == True).count()
-    regular_users = total_users - admin_users
-    
-    # Recent registrations (last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_registrations = db.query(User).filter(User.created_at >= thirty_days_ago).count()
+    # One aggregate query (or daily_stats rows with STATS_TABLE_ENABLED)
+    stats = await USER_STATS.read(db)
     
     return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "admin_users": admin_users,
-        "regular_users": regular_users,
-        "recent_registrations": recent_registrations
+        "total_users": stats["total_users"],
+        "active_users": stats["active_users"],
+        "admin_users": stats["admin_users"],
+        "regular_users": stats["total_users"] - stats["admin_users"],
+        "recent_registrations": stats["recent_registrations"]
     }
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, computed_field
+from typing import Optional, List, Dict
 from datetime import datetime
 
+from utils.image_variants import variant_urls
+
 # User schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -34,6 +36,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    issued_at: Optional[int] = None
 
 class LoginRequest(BaseModel):
     username: str
@@ -80,6 +83,12 @@ class LibraryItem(LibraryItemBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
+    @computed_field
+    @property
+    def cover_image_variants(self) -> Dict[str, str]:
+        """Resized cover URLs by width (``?w=`` on the cover URL)."""
+        return variant_urls(self.cover_image)
+    
     class Config:
         from_attributes = True
 
@@ -141,6 +150,12 @@ class Event(EventBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
+    @computed_field
+    @property
+    def image_variants(self) -> Dict[str, str]:
+        """Resized image URLs by width (``?w=`` on the image URL)."""
+        return variant_urls(self.image)
+    
     class Config:
         from_attributes = True
 
@@ -182,10 +197,47 @@ class Podcast(PodcastBase):
     publish_date: datetime
     rating: float
     plays: int
+    duration_seconds: Optional[float] = None
+    bitrate: Optional[int] = None
+    sample_rate: Optional[int] = None
+    audio_codec: Optional[str] = None
+    moov_offset: Optional[int] = None
+    faststart: Optional[bool] = None
+    peaks_version: Optional[str] = None
     created_by: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
+    @computed_field
+    @property
+    def cover_variants(self) -> Dict[str, str]:
+        """Resized cover URLs by width (``?w=`` on the cover URL)."""
+        return variant_urls(self.cover)
+    
+    @computed_field
+    @property
+    def peaks_url(self) -> Optional[str]:
+        """Versioned waveform peaks URL (cacheable forever), once they are computed."""
+        if not self.peaks_version:
+            return None
+        return f"/api/podcasts/{self.id}/peaks?v={self.peaks_version}"
+    
+    class Config:
+        from_attributes = True
+
+# Listening progress schemas
+class ListeningProgressUpdate(BaseModel):
+    position_seconds: float
+    duration_seconds: Optional[float] = None
+    completed: Optional[bool] = None
+
+class ListeningProgress(BaseModel):
+    podcast_id: int
+    position_seconds: float
+    duration_seconds: Optional[float] = None
+    completed: bool = False
+    updated_at: datetime
+    
     class Config:
         from_attributes = True
 
@@ -239,6 +291,12 @@ class GeniusAcademyCourse(GeniusAcademyCourseBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
+    @computed_field
+    @property
+    def cover_variants(self) -> Dict[str, str]:
+        """Resized cover URLs by width (``?w=`` on the cover URL)."""
+        return variant_urls(self.cover)
+    
     class Config:
         from_attributes = True
 
@@ -302,3 +360,11 @@ class Announcement(AnnouncementBase):
     
     class Config:
         from_attributes = True
+
+# Search schemas
+class SearchResults(BaseModel):
+    query: str
+    podcasts: List[Podcast] = []
+    library: List[LibraryItem] = []
+    events: List[Event] = []
+    announcements: List[Announcement] = []
@@ -0,0 +1,69 @@
+"""De-duplication of uploads across a fast-start remux (utils/content_store.py)."""
+
+import hashlib
+import struct
+
+import pytest
+
+import file_server
+from utils.content_store import ContentStore
+from utils.faststart import faststart, is_faststart
+from utils.storage_usage import StorageUsage
+
+
+def _atom(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _episode() -> bytes:
+    """A minimal MP4 with moov after mdat, like the exported sample episodes."""
+    ftyp = _atom(b"ftyp", b"M4A \x00\x00\x00\x00M4A isom")
+    mdat = _atom(b"mdat", bytes(range(256)) * 16)
+    stco = _atom(b"stco", struct.pack(">4sII", b"\x00" * 4, 1, len(ftyp) + 8))
+    moov = _atom(b"moov", _atom(b"trak", _atom(b"mdia", _atom(b"minf", _atom(b"stbl", stco)))))
+    return ftyp + mdat + moov
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    root = tmp_path / "files"
+    (root / "podcasts" / "audio").mkdir(parents=True)
+    content_store = ContentStore(tmp_path / "blobs", tmp_path / "index.db", root)
+    monkeypatch.setattr(file_server, "content_store", content_store)
+    monkeypatch.setattr(file_server, "storage_usage", StorageUsage(tmp_path / "usage.db", root))
+    return content_store
+
+
+def _upload(store: ContentStore, data: bytes, name: str):
+    temp_path = store.temp_dir() / f"upload-{hashlib.sha256(data).hexdigest()}"
+    temp_path.write_bytes(data)
+    target_dir = store.root_dir / "podcasts" / "audio"
+    return file_server._store(temp_path, hashlib.sha256(data).hexdigest(), len(data), target_dir, name, True)
+
+
+def test_reupload_after_remux_reuses_the_file(store):
+    original = _episode()
+    first = _upload(store, original, "ep01.m4a")
+    assert _upload(store, original, "ep01.m4a") == first
+
+    temp_path = store.temp_dir() / "remux.tmp"
+    size, sha256 = faststart(first, temp_path)
+    file_server.replace_file(first, temp_path, sha256, size)
+    assert is_faststart(first)
+    assert store.sha256_of(first) == sha256
+
+    assert _upload(store, original, "ep01.m4a") == first
+    assert sorted(path.name for path in first.parent.iterdir()) == ["ep01.m4a"]
+
+
+def test_releasing_the_remuxed_file_removes_both_blobs(store):
+    original = _episode()
+    path = _upload(store, original, "ep02.m4a")
+    temp_path = store.temp_dir() / "remux.tmp"
+    size, sha256 = faststart(path, temp_path)
+    file_server.replace_file(path, temp_path, sha256, size)
+
+    assert not store.blob_path(hashlib.sha256(original).hexdigest()).exists()
+    assert store.release(path)
+    assert not path.exists()
+    assert not store.blob_path(sha256).exists()
@@ -0,0 +1,50 @@
+"""The peaks route's duration-only answer when there is no sidecar (routes/podcasts.py)."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import utils.peaks
+from routes import podcasts
+
+
+class _Session:
+    """Just enough of an AsyncSession for a single-row select."""
+
+    def __init__(self, row):
+        self.row = row
+
+    async def execute(self, _query):
+        return SimpleNamespace(first=lambda: self.row)
+
+
+def _get_peaks(tmp_path, monkeypatch, audio: bytes, ffmpeg: bool):
+    audio_path = tmp_path / "episode.m4a"
+    audio_path.write_bytes(audio)
+    monkeypatch.setattr(podcasts, "local_media_path", lambda url: audio_path)
+    monkeypatch.setattr(utils.peaks, "NUMPY_AVAILABLE", True)
+    monkeypatch.setattr(utils.peaks.shutil, "which", lambda name: "/usr/bin/ffmpeg" if ffmpeg else None)
+    row = SimpleNamespace(audio_url="/storage/podcasts/audio/episode.m4a", peaks_version=None, duration_seconds=1234.5)
+    response = asyncio.run(podcasts.get_podcast_peaks(1, request=None, v=None, db=_Session(row)))
+    return response.status_code, json.loads(response.body)
+
+
+def test_undecodable_audio_answers_501_with_the_duration(tmp_path, monkeypatch):
+    status_code, body = _get_peaks(tmp_path, monkeypatch, b"\x00\x00\x00\x20ftypM4A ", ffmpeg=False)
+    assert status_code == 501
+    assert "ffmpeg" in body["detail"]
+    assert body["duration_seconds"] == 1234.5
+
+
+def test_peaks_not_made_yet_answer_404_with_the_duration(tmp_path, monkeypatch):
+    status_code, body = _get_peaks(tmp_path, monkeypatch, b"\x00\x00\x00\x20ftypM4A ", ffmpeg=True)
+    assert status_code == 404
+    assert body["duration_seconds"] == 1234.5
+
+
+def test_unknown_podcast_is_still_a_404(tmp_path):
+    with pytest.raises(podcasts.HTTPException) as error:
+        asyncio.run(podcasts.get_podcast_peaks(1, request=None, v=None, db=_Session(None)))
+    assert error.value.status_code == 404
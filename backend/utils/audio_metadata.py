@@ -0,0 +1,419 @@
+"""
+Pure-Python audio metadata for uploaded episodes.
+
+Reads just enough of a file to learn its duration, bitrate, sample rate and
+codec:
+  - MP4/M4A: walks the top-level atoms to the ``moov`` atom (recording its
+    byte offset) and reads ``mvhd``/``mdhd`` timing and the ``stsd`` sample
+    entry (plus the ``esds`` average bitrate for AAC)
+  - MP3: skips an ID3v2 tag, parses the first frame header and a Xing/Info
+    or VBRI header when present (VBR), otherwise assumes CBR
+  - WAV: the ``fmt `` and ``data`` chunks
+
+Parsing is blocking file IO; request handlers go through ``read_metadata``,
+which runs it in a worker thread. ``backfill_audio_metadata`` fills in
+podcasts stored before these columns existed and runs in a background thread
+at startup (queueing the fast-start remux for files that still need it).
+"""
+
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+import anyio
+from sqlalchemy import or_
+
+from database import SessionLocal
+from file_server import STORAGE_DIR
+from models import Podcast
+from utils.cache import response_cache
+from utils.peaks import peaks_version, schedule_peaks
+
+METADATA_FIELDS = ("duration_seconds", "bitrate", "sample_rate", "audio_codec", "moov_offset", "faststart")
+
+# Atoms that only contain other atoms (walked while looking for the audio track)
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+_MP4_CODECS = {b"mp4a": "aac", b"alac": "alac", b"ac-3": "ac3", b"ec-3": "eac3", b"Opus": "opus", b"fLaC": "flac"}
+
+_MP3_BITRATES = {
+    # (MPEG-1, layer III) and (MPEG-2/2.5, layer III), kbps by index
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],   # MPEG-1
+    2: [22050, 24000, 16000],   # MPEG-2
+    0: [11025, 12000, 8000],    # MPEG-2.5
+}
+
+
+def local_media_path(url: Optional[str]) -> Optional[Path]:
+    """File on disk for a /storage or /uploads URL (None for remote URLs)."""
+    if not url:
+        return None
+    if url.startswith("/storage/"):
+        return STORAGE_DIR / url[len("/storage/"):]
+    if url.startswith("/uploads/"):
+        return Path(url.lstrip("/"))
+    return None
+
+
+def media_url(path: Path) -> str:
+    """The /storage or /uploads URL of a stored media file."""
+    try:
+        return f"/storage/{Path(path).relative_to(STORAGE_DIR).as_posix()}"
+    except ValueError:
+        return "/" + Path(path).as_posix().lstrip("/")
+
+
+def format_duration(seconds: float) -> str:
+    """Seconds as "M:SS" or "H:MM:SS", matching the hand-entered duration strings."""
+    total = int(round(seconds))
+    hours, rest = divmod(total, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def _result(duration, bitrate, sample_rate, codec, moov_offset=None, faststart=None) -> dict:
+    return {
+        "duration_seconds": round(duration, 3) if duration else None,
+        "bitrate": int(bitrate) if bitrate else None,
+        "sample_rate": int(sample_rate) if sample_rate else None,
+        "audio_codec": codec,
+        "moov_offset": moov_offset,
+        "faststart": faststart,
+    }
+
+
+# MP4 / M4A
+
+def _read_atom_header(f: BinaryIO, end: int):
+    """(type, payload start, atom end) for the atom at the current position."""
+    start = f.tell()
+    if start + 8 > end:
+        return None
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+    size, kind = struct.unpack(">I4s", header)
+    payload = start + 8
+    if size == 1:
+        size = struct.unpack(">Q", f.read(8))[0]
+        payload += 8
+    elif size == 0:
+        size = end - start
+    if size < payload - start:
+        return None
+    return kind, payload, start + size
+
+
+def _read_descriptor(data: bytes, position: int):
+    """(tag, payload start) of an MPEG-4 descriptor; the length takes 1-4 bytes."""
+    tag = data[position]
+    position += 1
+    for _ in range(4):
+        more = data[position] & 0x80
+        position += 1
+        if not more:
+            break
+    return tag, position
+
+
+def _parse_esds_bitrate(data: bytes) -> Optional[int]:
+    """avgBitrate from the DecoderConfigDescriptor of an esds atom (after version/flags)."""
+    tag, position = _read_descriptor(data, 0)
+    if tag == 0x03:
+        # ES_Descriptor: ES_ID(2), flags(1) and the optional fields they announce
+        flags = data[position + 2]
+        position += 3
+        if flags & 0x80:
+            position += 2
+        if flags & 0x40:
+            position += 1 + data[position]
+        if flags & 0x20:
+            position += 2
+        tag, position = _read_descriptor(data, position)
+    if tag != 0x04:
+        return None
+    # objectType(1) streamType(1) bufferSize(3) maxBitrate(4) avgBitrate(4)
+    avg = struct.unpack(">I", data[position + 9:position + 13])[0]
+    return avg or None
+
+
+def _parse_mp4(f: BinaryIO, file_size: int) -> Optional[dict]:
+    moov_offset = None
+    moov_end = None
+    mdat_seen = False
+    f.seek(0)
+    while True:
+        atom = _read_atom_header(f, file_size)
+        if atom is None:
+            break
+        kind, payload, end = atom
+        if kind == b"moov":
+            moov_offset = payload - 8
+            moov_end = end
+            break
+        mdat_seen = mdat_seen or kind == b"mdat"
+        f.seek(end)
+    if moov_offset is None:
+        return None
+
+    info = {"timescale": None, "duration": None, "track_timescale": None, "track_duration": None,
+            "codec": None, "sample_rate": None, "bitrate": None}
+
+    def walk(start: int, end: int, in_sound_track: bool) -> None:
+        f.seek(start)
+        while f.tell() < end:
+            atom = _read_atom_header(f, end)
+            if atom is None:
+                return
+            kind, payload, atom_end = atom
+            if kind == b"mvhd":
+                version = f.read(1)[0]
+                f.read(3)
+                if version == 1:
+                    f.read(16)
+                    info["timescale"], info["duration"] = struct.unpack(">IQ", f.read(12))
+                else:
+                    f.read(8)
+                    info["timescale"], info["duration"] = struct.unpack(">II", f.read(8))
+            elif kind == b"trak" and info["codec"] is None:
+                walk(payload, atom_end, _is_sound_track(payload, atom_end))
+            elif kind in _MP4_CONTAINERS and kind != b"trak":
+                walk(payload, atom_end, in_sound_track)
+            elif kind == b"mdhd" and in_sound_track:
+                version = f.read(1)[0]
+                f.read(3)
+                if version == 1:
+                    f.read(16)
+                    info["track_timescale"], info["track_duration"] = struct.unpack(">IQ", f.read(12))
+                else:
+                    f.read(8)
+                    info["track_timescale"], info["track_duration"] = struct.unpack(">II", f.read(8))
+            elif kind == b"stsd" and in_sound_track:
+                f.read(8)  # version/flags, entry count
+                entry = _read_atom_header(f, atom_end)
+                if entry is not None:
+                    entry_kind, entry_payload, entry_end = entry
+                    info["codec"] = _MP4_CODECS.get(entry_kind, entry_kind.decode("latin-1").strip())
+                    # SampleEntry(8) + reserved(8) + channels(2) + sample size(2) + pre-defined(4) + rate 16.16(4)
+                    f.seek(entry_payload + 24)
+                    info["sample_rate"] = struct.unpack(">I", f.read(4))[0] >> 16
+                    f.seek(entry_payload + 28)
+                    rest = f.read(max(0, min(entry_end - f.tell(), 4096)))
+                    esds = rest.find(b"esds")
+                    if esds != -1:
+                        info["bitrate"] = _parse_esds_bitrate(rest[esds + 8:])
+            f.seek(atom_end)
+
+    def _is_sound_track(start: int, end: int) -> bool:
+        # trak > mdia > hdlr with handler type "soun"
+        position = f.tell()
+        try:
+            f.seek(start)
+            data = f.read(min(end - start, 1 << 16))
+            hdlr = data.find(b"hdlr")
+            return hdlr != -1 and data[hdlr + 12:hdlr + 16] == b"soun"
+        finally:
+            f.seek(position)
+
+    walk(moov_offset + 8, moov_end, False)
+
+    if info["track_timescale"] and info["track_duration"]:
+        duration = info["track_duration"] / info["track_timescale"]
+    elif info["timescale"] and info["duration"]:
+        duration = info["duration"] / info["timescale"]
+    else:
+        duration = None
+    bitrate = info["bitrate"] or (file_size * 8 / duration if duration else None)
+    return _result(duration, bitrate, info["sample_rate"], info["codec"] or "mp4", moov_offset, not mdat_seen)
+
+
+# MP3
+
+def _id3v2_size(header: bytes) -> int:
+    if header[:3] != b"ID3" or len(header) < 10:
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_mp3(f: BinaryIO, file_size: int) -> Optional[dict]:
+    f.seek(0)
+    audio_start = _id3v2_size(f.read(10))
+    f.seek(audio_start)
+    data = f.read(64 * 1024)
+    for position in range(len(data) - 4):
+        if data[position] != 0xFF or (data[position + 1] & 0xE0) != 0xE0:
+            continue
+        header = struct.unpack(">I", data[position:position + 4])[0]
+        version = (header >> 19) & 0x3       # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+        layer = (header >> 17) & 0x3         # 1 = layer III
+        bitrate_index = (header >> 12) & 0xF
+        rate_index = (header >> 10) & 0x3
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        table = 1 if version == 3 else 2
+        bitrate = _MP3_BITRATES[table][bitrate_index] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        mono = ((header >> 6) & 0x3) == 3
+        samples_per_frame = 1152 if version == 3 else 576
+        frame_start = audio_start + position
+
+        # Xing/Info (after the side information) or VBRI (fixed offset 32)
+        if version == 3:
+            side_info = 17 if mono else 32
+        else:
+            side_info = 9 if mono else 17
+        frames = None
+        xing = data[position + 4 + side_info:position + 4 + side_info + 12]
+        if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 0x1:
+            frames = struct.unpack(">I", xing[8:12])[0]
+        vbri = data[position + 36:position + 36 + 18]
+        if frames is None and vbri[:4] == b"VBRI":
+            frames = struct.unpack(">I", vbri[14:18])[0]
+
+        audio_bytes = file_size - frame_start
+        f.seek(max(0, file_size - 128))
+        if f.read(3) == b"TAG":
+            audio_bytes -= 128
+        if frames:
+            duration = frames * samples_per_frame / sample_rate
+            bitrate = audio_bytes * 8 / duration if duration else bitrate
+        else:
+            duration = audio_bytes * 8 / bitrate
+        return _result(duration, bitrate, sample_rate, "mp3")
+    return None
+
+
+# WAV
+
+def _parse_wav(f: BinaryIO, file_size: int) -> Optional[dict]:
+    f.seek(12)
+    byte_rate = sample_rate = data_size = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        kind, size = struct.unpack("<4sI", chunk)
+        if kind == b"fmt ":
+            fmt = f.read(16)
+            _, _, sample_rate, byte_rate = struct.unpack("<HHII", fmt[:12])
+            f.seek(size - 16 + (size & 1), os.SEEK_CUR)
+        elif kind == b"data":
+            data_size = min(size, file_size - f.tell())
+            break
+        else:
+            f.seek(size + (size & 1), os.SEEK_CUR)
+    if not byte_rate or data_size is None:
+        return None
+    return _result(data_size / byte_rate, byte_rate * 8, sample_rate, "pcm")
+
+
+def probe_audio(path) -> Optional[dict]:
+    """
+    Metadata for an audio file: duration_seconds, bitrate (bits/s),
+    sample_rate, audio_codec, and for MP4 moov_offset and faststart (moov
+    before the media data). None if the format is not recognised or the file
+    is unreadable.
+    """
+    path = Path(path)
+    try:
+        file_size = path.stat().st_size
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if head[4:8] == b"ftyp":
+                return _parse_mp4(f, file_size)
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                return _parse_wav(f, file_size)
+            if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+                return _parse_mp3(f, file_size)
+            if path.suffix.lower() == ".mp3":
+                return _parse_mp3(f, file_size)
+    except (OSError, struct.error, IndexError, ZeroDivisionError) as e:
+        print(f"⚠️ Could not read audio metadata from {path.name}: {e}")
+    return None
+
+
+async def read_metadata(url: Optional[str]) -> Optional[dict]:
+    """``probe_audio`` for a local /storage or /uploads URL, off the event loop."""
+    path = local_media_path(url)
+    if path is None:
+        return None
+    return await anyio.to_thread.run_sync(probe_audio, path)
+
+
+def apply_metadata(podcast: Podcast, metadata: Optional[dict]) -> None:
+    """
+    Store probed metadata on a podcast (clearing it when there is none) and
+    fill in the display duration if it was left empty.
+    """
+    for field in METADATA_FIELDS:
+        setattr(podcast, field, metadata.get(field) if metadata else None)
+    if metadata and metadata["duration_seconds"] and not podcast.duration:
+        podcast.duration = format_duration(metadata["duration_seconds"])
+
+
+async def attach_peaks(podcast: Podcast) -> None:
+    """Record the waveform peaks of a podcast's audio, queueing them if not made yet."""
+    path = local_media_path(podcast.audio_url)
+    podcast.peaks_version = await anyio.to_thread.run_sync(peaks_version, path) if path else None
+    if podcast.peaks_version is None and path is not None and path.exists():
+        schedule_peaks(path)
+
+
+def backfill_audio_metadata() -> int:
+    """
+    Probe local audio of podcasts that have no stored metadata, and queue a
+    fast-start remux for MP4s that need one; returns how many were updated.
+    """
+    from utils.faststart import schedule_faststart
+
+    updated = 0
+    db = SessionLocal()
+    try:
+        podcasts = (
+            db.query(Podcast)
+            .filter(
+                Podcast.audio_url.isnot(None),
+                or_(Podcast.duration_seconds.is_(None), Podcast.faststart.is_(False)),
+            )
+            .all()
+        )
+        for podcast in podcasts:
+            path = local_media_path(podcast.audio_url)
+            if path is None or not path.exists():
+                continue
+            if podcast.faststart is False:
+                schedule_faststart(path)
+                continue
+            metadata = probe_audio(path)
+            if metadata is None:
+                continue
+            apply_metadata(podcast, metadata)
+            db.commit()
+            updated += 1
+            if metadata["faststart"] is False:
+                schedule_faststart(path)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Audio metadata backfill failed: {e}")
+    finally:
+        db.close()
+    if updated:
+        response_cache.invalidate(Podcast.__tablename__)
+        print(f"✅ Audio metadata stored for {updated} existing podcasts")
+    return updated
+
+
+def start_audio_backfill() -> None:
+    """Run the backfill in a background thread (called on application startup)."""
+    threading.Thread(target=backfill_audio_metadata, name="audio-backfill", daemon=True).start()
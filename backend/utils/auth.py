@@ -1,5 +1,9 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -10,21 +14,52 @@ import bcrypt
 from database import get_db
 from models import User
 from schemas import TokenData
+from utils.cache import ResponseCache, CacheEntry, cache_key
 
 # Configuration
 SECRET_KEY = "your-secret-key-here-change-in-production"  # Change this in production!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# bcrypt cost factor; stored hashes with another cost are redone at the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashing runs in its own threads (bcrypt releases the GIL) so the event loop
+# keeps serving; past the queue limit new logins get a 503 instead of waiting
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+PASSWORD_HASH_RETRY_AFTER = 2
+
 # Password hashing - use bcrypt directly to avoid passlib compatibility issues
 try:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 except:
     pwd_context = None
 
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_in_flight = 0
+_hash_lock = threading.Lock()
+
 # Security
 security = HTTPBearer()
 
+# Authenticated users seen recently, so most requests skip the user lookup
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+principal_cache = ResponseCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL)
+
+
+class UserPrincipal(NamedTuple):
+    """What request handlers need to know about the authenticated user."""
+    id: int
+    username: str
+    is_admin: bool
+    is_active: bool
+
+
+def invalidate_user_cache() -> None:
+    """Drop cached principals; call after committing any change to a user."""
+    principal_cache.invalidate(User.__tablename__)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     if pwd_context:
@@ -49,9 +84,69 @@ def get_password_hash(password: str) -> str:
             pass
     # Fallback to bcrypt directly
     password_bytes = password.encode('utf-8')
-    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
     return hashed.decode('utf-8')
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a stored bcrypt hash was made with a cost other than BCRYPT_ROUNDS."""
+    try:
+        # $2b$12$<salt and hash>
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password; on success also return a new hash if the stored one
+    uses an outdated cost (None otherwise).
+    """
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if password_needs_rehash(hashed_password):
+        return True, get_password_hash(plain_password)
+    return True, None
+
+async def _run_hashing(func, *args):
+    """Run a hashing function on the bounded pool; 503 when the queue is full."""
+    global _hash_executor, _hash_in_flight
+    with _hash_lock:
+        if _hash_in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins at once, please try again",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+            )
+        if _hash_executor is None:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+            )
+        _hash_in_flight += 1
+        future = _hash_executor.submit(func, *args)
+    # Counted until the work is done, even if the request gives up waiting
+    future.add_done_callback(_hash_done)
+    return await asyncio.wrap_future(future)
+
+def _hash_done(_future) -> None:
+    global _hash_in_flight
+    with _hash_lock:
+        _hash_in_flight -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password off the event loop."""
+    return await _run_hashing(verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash off the event loop."""
+    return await _run_hashing(get_password_hash, password)
+
+def shutdown_hash_workers() -> None:
+    """Stop the hashing threads (called on application shutdown)."""
+    global _hash_executor
+    with _hash_lock:
+        executor, _hash_executor = _hash_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -59,7 +154,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -74,7 +169,7 @@ def verify_token(token: str) -> TokenData:
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        token_data = TokenData(username=username)
+        token_data = TokenData(username=username, issued_at=payload.get("iat"))
         return token_data
     except JWTError:
         raise HTTPException(
@@ -86,13 +181,24 @@ def verify_token(token: str) -> TokenData:
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user. Uses JWT tokens."""
+) -> UserPrincipal:
+    """
+    Get the current authenticated user. Uses JWT tokens.
+    
+    Returns a UserPrincipal (id, username, is_admin, is_active), cached per
+    token subject and issue time; handlers that need the full row load it.
+    """
     token = credentials.credentials
     
     # Verify JWT token
     try:
         token_data = verify_token(token)
+        key = cache_key(User.__tablename__, "principal", sub=token_data.username, iat=token_data.issued_at)
+        entry = principal_cache.get(key)
+        if entry is not None:
+            return entry.body
+        
+        generation = principal_cache.generation(User.__tablename__)
         user = db.query(User).filter(User.username == token_data.username).first()
         if user is None:
             raise HTTPException(
@@ -107,7 +213,9 @@ def get_current_user(
                 detail="Inactive user"
             )
         
-        return user
+        principal = UserPrincipal(user.id, user.username, bool(user.is_admin), bool(user.is_active))
+        principal_cache.set(key, CacheEntry(principal), generation)
+        return principal
     except HTTPException:
         raise
     except Exception:
@@ -117,7 +225,7 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin_user(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """Get the current authenticated admin user."""
     if not current_user.is_admin:
         raise HTTPException(
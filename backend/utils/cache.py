@@ -0,0 +1,147 @@
+"""
+In-process response cache for public read endpoints.
+
+Entries are keyed on (namespace, route, normalized query parameters), expire
+after RESPONSE_CACHE_TTL seconds (or a shorter per-entry TTL) and are evicted
+least recently used first beyond RESPONSE_CACHE_MAX_ENTRIES. A namespace is a
+table name; write handlers call ``response_cache.invalidate(<table>)`` after
+committing, which drops every entry built from that table. Counter flushes
+invalidate the tables they wrote to, so cached play counts never go backwards.
+
+Bodies are stored serialized (lists of dicts), never as ORM objects.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from utils.counters import counters
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+
+class CacheEntry:
+    """A cached response body plus the headers that go with it."""
+
+    __slots__ = ("body", "headers", "ttl", "expires_at", "generation")
+
+    def __init__(self, body: Any, headers: Optional[Dict[str, str]] = None, ttl: Optional[float] = None):
+        self.body = body
+        self.headers = headers or {}
+        self.ttl = ttl
+        self.expires_at = 0.0
+        self.generation = 0
+
+    def apply_headers(self, response) -> None:
+        if response is not None:
+            for name, value in self.headers.items():
+                response.headers[name] = value
+
+
+def cache_key(namespace: str, route: str, **params) -> Tuple:
+    """Build a cache key; parameters that are unset or "all" don't vary the result."""
+    normalized = tuple(sorted(
+        (name, value) for name, value in params.items()
+        if value is not None and value != "all"
+    ))
+    return (namespace, route, normalized)
+
+
+class ResponseCache:
+    """Size-bounded LRU with per-entry expiry and per-namespace invalidation."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, CacheEntry]" = OrderedDict()
+        # Bumped on every invalidation; entries built under an older generation are stale
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+        self._evictions = 0
+
+    def generation(self, namespace: str) -> int:
+        with self._lock:
+            return self._generations[namespace]
+
+    def get(self, key: Tuple) -> Optional[CacheEntry]:
+        namespace = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > time.monotonic() and entry.generation == self._generations[namespace]:
+                    self._entries.move_to_end(key)
+                    self._hits[namespace] += 1
+                    return entry
+                del self._entries[key]
+            self._misses[namespace] += 1
+            return None
+
+    def set(self, key: Tuple, entry: CacheEntry, generation: Optional[int] = None) -> CacheEntry:
+        """
+        Store an entry. Pass the namespace generation read before the data
+        was loaded so a write that happened meanwhile is not cached over.
+        """
+        namespace = key[0]
+        ttl = self.ttl if entry.ttl is None else min(entry.ttl, self.ttl)
+        with self._lock:
+            current = self._generations[namespace]
+            if ttl <= 0 or (generation is not None and generation != current):
+                return entry
+            entry.expires_at = time.monotonic() + ttl
+            entry.generation = current
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return entry
+
+    async def get_or_load(self, key: Tuple, load: Callable[[], Awaitable[CacheEntry]]) -> CacheEntry:
+        """Return the cached entry for ``key`` or build it with ``load()`` and cache it."""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        generation = self.generation(key[0])
+        return self.set(key, await load(), generation)
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Drop every entry built from the given tables."""
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] += 1
+            stale = [key for key in self._entries if key[0] in namespaces]
+            for key in stale:
+                del self._entries[key]
+
+    def invalidate_tables(self, table_names: Iterable[str]) -> None:
+        self.invalidate(*table_names)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+            namespaces = sorted(set(self._hits) | set(self._misses))
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "evictions": self._evictions,
+                "namespaces": {
+                    name: {"hits": self._hits[name], "misses": self._misses[name]}
+                    for name in namespaces
+                },
+            }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL)
+
+# Play/view counters are cached as part of the bodies; refresh after each flush
+counters.add_flush_listener(response_cache.invalidate_tables)
@@ -0,0 +1,275 @@
+"""
+Content-addressed, de-duplicating layout for file_server storage.
+
+Every stored file's bytes live once, as a blob named by its SHA-256 and
+sharded by prefix (``blobs/ab/cd/abcd...``). The public files under
+STORAGE_DIR are hard links to their blob, so /storage URLs and the static
+file mount keep working unchanged. An index in a small SQLite file next to
+the storage (like utils/storage_usage.py) maps each logical path (relative
+to STORAGE_DIR) to its blob and counts:
+
+- per logical path, how many saves handed out its URL (``refs``); uploading
+  the same bytes under the same name again returns the existing URL instead
+  of writing "name_1", "name_2", ...
+- per blob, how many logical paths link to it (``links``)
+- per logical path rewritten by ``replace()`` (the fast-start remux), the
+  hash of the bytes originally uploaded (``source_sha256``), so uploading
+  that same original again still finds the rewritten file
+
+Lookups by hash use an index on the blob column, and each change updates
+only the rows it touches, so neither grows with the size of the library. An
+``index.json`` from before the SQLite index is imported once and renamed to
+``index.json.migrated``.
+
+``release()`` drops one reference; the logical file is only unlinked when no
+reference is left, and the blob only when no logical path uses it any more.
+Files saved before the index existed are not tracked until
+``file_server.deduplicate_storage()`` adopts them; ``release()`` returns
+False for untracked files and the caller deletes them as before.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+
+class ContentStore:
+    """SHA-256 blob store with a logical-path index and reference counts."""
+
+    def __init__(self, blob_dir: Path, index_path: Path, root_dir: Path, legacy_index_path: Optional[Path] = None):
+        self.blob_dir = blob_dir
+        self.index_path = index_path
+        self.root_dir = root_dir
+        self.legacy_index_path = legacy_index_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def temp_dir(self) -> Path:
+        """Where new files are written before they become blobs (same filesystem)."""
+        path = self.blob_dir / ".tmp"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.blob_dir / sha256[:2] / sha256[2:4] / sha256
+
+    def _relative(self, file_path: Path) -> str:
+        return Path(file_path).relative_to(self.root_dir).as_posix()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.index_path), check_same_thread=False, isolation_level=None)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, sha256 TEXT NOT NULL, refs INTEGER NOT NULL, source_sha256 TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+            if "source_sha256" not in columns:
+                conn.execute("ALTER TABLE files ADD COLUMN source_sha256 TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_files_sha256 ON files(sha256)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_files_source_sha256 ON files(source_sha256)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, links INTEGER NOT NULL)"
+            )
+            self._conn = conn
+            self._import_legacy_index()
+        return self._conn
+
+    def _import_legacy_index(self) -> None:
+        path = self.legacy_index_path
+        if path is None or not path.exists():
+            return
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Old storage index unreadable, not imported: {e}")
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO files (path, sha256, refs) VALUES (?, ?, ?)",
+                [(relative, entry["sha256"], entry["refs"]) for relative, entry in data.get("files", {}).items()]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO blobs (sha256, size, links) VALUES (?, ?, ?)",
+                [(sha256, entry["size"], entry["links"]) for sha256, entry in data.get("blobs", {}).items()]
+            )
+        os.replace(path, path.with_name(f"{path.name}.migrated"))
+        print(f"✅ Storage index imported from {path.name}")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _link_blob(self, conn: sqlite3.Connection, sha256: str, size: int) -> None:
+        conn.execute(
+            "INSERT INTO blobs (sha256, size, links) VALUES (?, ?, 1) "
+            "ON CONFLICT(sha256) DO UPDATE SET links = links + 1",
+            (sha256, size)
+        )
+
+    def _unlink_blob(self, conn: sqlite3.Connection, sha256: str) -> None:
+        """Drop one link to a blob; the blob goes when nothing links to it."""
+        conn.execute("UPDATE blobs SET links = links - 1 WHERE sha256 = ?", (sha256,))
+        row = conn.execute("SELECT links FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is not None and row[0] <= 0:
+            conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            self.blob_path(sha256).unlink(missing_ok=True)
+
+    def find(self, sha256: str, directory: Path, accept: Callable[[str], bool]) -> Optional[Path]:
+        """
+        An existing logical file in ``directory`` holding these bytes, or a
+        rewritten version of them, whose name passes ``accept(name)``; it
+        gains a reference. None if there is none.
+        """
+        with self._lock:
+            conn = self._connection()
+            candidates = [
+                relative for (relative,) in conn.execute(
+                    "SELECT path FROM files WHERE sha256 = ? OR source_sha256 = ?", (sha256, sha256)
+                )
+            ]
+            matches = [
+                relative for relative in candidates
+                if (self.root_dir / relative).parent == directory
+                and accept((self.root_dir / relative).name)
+                and (self.root_dir / relative).exists()
+            ]
+            if not matches:
+                return None
+            # Prefer the plain name over numbered variants ("a.jpeg" over "a_1.jpeg")
+            relative = min(matches, key=lambda name: (len(name), name))
+            conn.execute("UPDATE files SET refs = refs + 1 WHERE path = ?", (relative,))
+            return self.root_dir / relative
+
+    def add(self, temp_path: Path, sha256: str, size: int, file_path: Path) -> Path:
+        """
+        Store the bytes in ``temp_path`` (consumed) under ``file_path``, as a
+        hard link to the blob for ``sha256``. Returns ``file_path``.
+        """
+        with self._lock:
+            blob = self.blob_path(sha256)
+            if blob.exists():
+                temp_path.unlink(missing_ok=True)
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, blob)
+            try:
+                os.link(blob, file_path)
+            except OSError:
+                # No hard links on this filesystem: keep a plain copy
+                shutil.copy2(blob, file_path)
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (path, sha256, refs, source_sha256) VALUES (?, ?, 1, NULL)",
+                    (self._relative(file_path), sha256)
+                )
+                self._link_blob(conn, sha256, size)
+            return file_path
+
+    def adopt(self, file_path: Path, sha256: str, size: int) -> bool:
+        """
+        Track a file saved before the index existed, replacing it with a link
+        to an existing blob with the same bytes. Returns False if the file is
+        already tracked.
+        """
+        with self._lock:
+            relative = self._relative(file_path)
+            if self.sha256_of(file_path) is not None:
+                return False
+            blob = self.blob_path(sha256)
+            if blob.exists():
+                temp_path = file_path.with_name(f".{file_path.name}.link")
+                try:
+                    os.link(blob, temp_path)
+                    os.replace(temp_path, file_path)
+                except OSError:
+                    temp_path.unlink(missing_ok=True)
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(file_path, blob)
+                except OSError:
+                    shutil.copy2(file_path, blob)
+            with self._transaction() as conn:
+                conn.execute("INSERT INTO files (path, sha256, refs) VALUES (?, ?, 1)", (relative, sha256))
+                self._link_blob(conn, sha256, size)
+            return True
+
+    def release(self, file_path: Path) -> bool:
+        """
+        Drop one reference to a logical file. Returns False if the file is
+        not tracked by the index.
+        """
+        with self._lock:
+            relative = self._relative(file_path)
+            with self._transaction() as conn:
+                row = conn.execute("SELECT sha256, refs FROM files WHERE path = ?", (relative,)).fetchone()
+                if row is None:
+                    return False
+                sha256, refs = row
+                if refs > 1:
+                    conn.execute("UPDATE files SET refs = refs - 1 WHERE path = ?", (relative,))
+                    return True
+                conn.execute("DELETE FROM files WHERE path = ?", (relative,))
+                Path(file_path).unlink(missing_ok=True)
+                self._unlink_blob(conn, sha256)
+            return True
+
+    def replace(self, file_path: Path, temp_path: Path, sha256: str, size: int) -> bool:
+        """
+        Swap the bytes behind a tracked logical file for those in ``temp_path``
+        (consumed), keeping its references and the hash of the originally
+        uploaded bytes. The logical path is replaced atomically. Returns False
+        if the file is not tracked by the index.
+        """
+        with self._lock:
+            relative = self._relative(file_path)
+            old_sha256 = self.sha256_of(file_path)
+            if old_sha256 is None:
+                return False
+            if old_sha256 == sha256:
+                temp_path.unlink(missing_ok=True)
+                return True
+            blob = self.blob_path(sha256)
+            if blob.exists():
+                temp_path.unlink(missing_ok=True)
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, blob)
+            link_path = Path(file_path).with_name(f".{Path(file_path).name}.link")
+            try:
+                os.link(blob, link_path)
+            except OSError:
+                shutil.copy2(blob, link_path)
+            os.replace(link_path, file_path)
+            with self._transaction() as conn:
+                # The first rewrite keeps the uploaded hash; later ones leave it alone
+                conn.execute(
+                    "UPDATE files SET sha256 = ?, source_sha256 = COALESCE(source_sha256, ?) WHERE path = ?",
+                    (sha256, old_sha256, relative)
+                )
+                self._link_blob(conn, sha256, size)
+                self._unlink_blob(conn, old_sha256)
+            return True
+
+    def sha256_of(self, file_path: Path) -> Optional[str]:
+        """Blob hash of a tracked logical file."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT sha256 FROM files WHERE path = ?", (self._relative(file_path),)
+            ).fetchone()
+            return row[0] if row else None
@@ -0,0 +1,202 @@
+"""
+Write-behind aggregator for play, view and download counters.
+
+Hot read paths call ``counters.increment(...)`` instead of doing
+``row.plays += 1; db.commit()``. Increments are buffered per
+(table, id, column) and flushed every COUNTER_FLUSH_INTERVAL seconds (and on
+shutdown) as one batch of ``UPDATE ... SET col = col + :n`` statements, so no
+increment is lost to a read-modify-write race. Reads overlay the buffered
+amounts on top of the persisted values.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import anyio
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from database import engine
+
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "5"))
+# Count the same client at most once per window for a given counter (0 disables)
+COUNTER_DEDUPE_WINDOW = float(os.getenv("COUNTER_DEDUPE_WINDOW", "0"))
+
+CounterKey = Tuple[str, int, str]
+
+
+def client_key(request) -> Optional[str]:
+    """Identify a listener for de-duplication (address plus user agent)."""
+    if request is None or request.client is None:
+        return None
+    return f"{request.client.host}|{request.headers.get('user-agent', '')}"
+
+
+class CounterBuffer:
+    """Buffers counter increments in memory and flushes them in batches."""
+
+    def __init__(self, flush_interval: float, dedupe_window: float):
+        self.flush_interval = flush_interval
+        self.dedupe_window = dedupe_window
+        self._pending: Dict[CounterKey, int] = defaultdict(int)
+        # Increments accepted per table, for cache validators (ETags)
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._tables = {}
+        self._seen: Dict[Tuple[CounterKey, str], float] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_listeners: List[Callable[[set], None]] = []
+
+    def increment(self, model, row_id: int, column: str, amount: int = 1, client: Optional[str] = None) -> bool:
+        """
+        Buffer an increment of ``model.column`` for row ``row_id``.
+
+        Returns False when the increment was dropped as a duplicate from the
+        same client within the de-duplication window.
+        """
+        table = model.__table__
+        key = (table.name, row_id, column)
+        now = time.monotonic()
+        with self._lock:
+            if client and self.dedupe_window > 0:
+                seen_key = (key, client)
+                last_seen = self._seen.get(seen_key)
+                if last_seen is not None and now - last_seen < self.dedupe_window:
+                    return False
+                self._seen[seen_key] = now
+            self._tables[table.name] = table
+            self._pending[key] += amount
+            self._versions[table.name] += 1
+        return True
+
+    def version(self, model) -> int:
+        """Number of increments accepted for ``model``'s table since startup."""
+        with self._lock:
+            return self._versions[model.__table__.name]
+
+    def pending(self, model, row_id: int, column: str) -> int:
+        """Amount buffered but not yet written for one counter."""
+        with self._lock:
+            return self._pending.get((model.__table__.name, row_id, column), 0)
+
+    def pending_total(self, model, column: str) -> int:
+        """Amount buffered but not yet written for ``column`` across all rows."""
+        table_name = model.__table__.name
+        with self._lock:
+            return sum(
+                amount for (pending_table, _, pending_column), amount in self._pending.items()
+                if pending_table == table_name and pending_column == column
+            )
+
+    def overlay(self, rows: Iterable, *columns: str) -> None:
+        """
+        Add buffered increments to loaded ORM rows so responses show
+        persisted-plus-buffered values. The rows are not marked dirty.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            for row in rows:
+                table_name = row.__table__.name
+                for column in columns:
+                    amount = self._pending.get((table_name, row.id, column))
+                    if amount:
+                        set_committed_value(row, column, (getattr(row, column) or 0) + amount)
+
+    def overlay_dicts(self, model, rows: Iterable[dict], *columns: str) -> List[dict]:
+        """
+        overlay() for serialized rows (e.g. cached response bodies). Returns
+        copies of the rows that have buffered increments; the input is not
+        modified.
+        """
+        table_name = model.__table__.name
+        with self._lock:
+            if not self._pending:
+                return list(rows)
+            result = []
+            for row in rows:
+                amounts = {column: self._pending.get((table_name, row["id"], column)) for column in columns}
+                if any(amounts.values()):
+                    row = dict(row)
+                    for column, amount in amounts.items():
+                        if amount:
+                            row[column] = (row.get(column) or 0) + amount
+                result.append(row)
+            return result
+
+    def add_flush_listener(self, callback: Callable[[set], None]) -> None:
+        """Call ``callback(table_names)`` after each successful flush."""
+        self._flush_listeners.append(callback)
+
+    def flush(self) -> int:
+        """Write all buffered increments; returns the number of rows updated."""
+        with self._lock:
+            if not self._pending:
+                self._prune_seen()
+                return 0
+            pending, self._pending = self._pending, defaultdict(int)
+            self._prune_seen()
+
+        batches = defaultdict(list)
+        for (table_name, row_id, column), amount in pending.items():
+            batches[(table_name, column)].append({"row_id": row_id, "amount": amount})
+
+        try:
+            with engine.begin() as conn:
+                for (table_name, column), params in batches.items():
+                    table = self._tables[table_name]
+                    stmt = (
+                        update(table)
+                        .where(table.c.id == bindparam("row_id"))
+                        .values({column: func.coalesce(table.c[column], 0) + bindparam("amount")})
+                    )
+                    conn.execute(stmt, params)
+        except Exception as e:
+            print(f"⚠️ Counter flush failed, will retry: {e}")
+            with self._lock:
+                for key, amount in pending.items():
+                    self._pending[key] += amount
+            return 0
+
+        flushed_tables = {table_name for table_name, _ in batches}
+        for callback in self._flush_listeners:
+            try:
+                callback(flushed_tables)
+            except Exception as e:
+                print(f"⚠️ Counter flush listener failed: {e}")
+
+        return len(pending)
+
+    def _prune_seen(self) -> None:
+        if not self._seen:
+            return
+        cutoff = time.monotonic() - self.dedupe_window
+        self._seen = {key: seen for key, seen in self._seen.items() if seen >= cutoff}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await anyio.to_thread.run_sync(self.flush)
+
+    def start(self) -> None:
+        """Start the periodic flush task (called on application startup)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await anyio.to_thread.run_sync(self.flush)
+
+
+counters = CounterBuffer(COUNTER_FLUSH_INTERVAL, COUNTER_DEDUPE_WINDOW)
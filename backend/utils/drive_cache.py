@@ -0,0 +1,180 @@
+"""
+Read-through disk cache for Google Drive hosted podcast audio.
+
+The first full listen of a Drive episode is written to disk while it streams
+(tee-to-disk). Later plays, including Range requests for seeking, are served
+from the local copy through the normal local-file path. The cache is keyed by
+Drive file ID, bounded by DRIVE_CACHE_MAX_BYTES and evicts least recently
+used files first.
+
+The cache lives next to the public storage tree, not inside it: files under
+STORAGE_DIR are served as-is by the /storage mount, which would let anyone
+download cached episodes by path and skip the podcast route.
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import anyio
+
+from file_server import BASE_STORAGE_DIR, STORAGE_DIR
+
+DRIVE_CACHE_DIR = Path(os.getenv("DRIVE_CACHE_DIR", str(BASE_STORAGE_DIR / "cache" / "drive")))
+# Where the cache used to be, inside the /storage mount; removed on first use
+LEGACY_DRIVE_CACHE_DIR = STORAGE_DIR / "cache" / "drive"
+DRIVE_CACHE_MAX_BYTES = int(os.getenv("DRIVE_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+PARTIAL_SUFFIX = ".part"
+
+
+class DriveCacheWriter:
+    """Writes one upstream body to a temp file and publishes it on commit."""
+
+    def __init__(self, cache: "DriveCache", file_id: str):
+        self.cache = cache
+        self.file_id = file_id
+        self.temp_path = cache.directory / f"{file_id}.{uuid.uuid4().hex[:8]}{PARTIAL_SUFFIX}"
+        self.size = 0
+        self._file = open(self.temp_path, "wb")
+
+    async def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.cache.max_bytes:
+            raise ValueError("File is larger than the Drive cache budget")
+        await anyio.to_thread.run_sync(self._file.write, chunk)
+
+    async def commit(self, expected_size: Optional[int] = None) -> None:
+        """Publish the file; discards it if the body was truncated."""
+        await anyio.to_thread.run_sync(self._file.close)
+        if expected_size is not None and expected_size != self.size:
+            print(f"⚠️ Drive cache: incomplete body for {self.file_id} ({self.size}/{expected_size} bytes)")
+            self.cache._finish(self.file_id, None, 0)
+            self._unlink()
+            return
+        self.cache._finish(self.file_id, self.temp_path, self.size)
+
+    def abort(self) -> None:
+        """Drop the partial file (listener went away or upstream failed)."""
+        try:
+            self._file.close()
+        finally:
+            self.cache._finish(self.file_id, None, 0)
+            self._unlink()
+
+    def _unlink(self) -> None:
+        try:
+            self.temp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class DriveCache:
+    """Size-bounded LRU of Drive files stored on local disk."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._filling = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """Index files left by a previous run, oldest access first."""
+        if self._loaded:
+            return
+        if LEGACY_DRIVE_CACHE_DIR.exists() and LEGACY_DRIVE_CACHE_DIR != self.directory:
+            shutil.rmtree(LEGACY_DRIVE_CACHE_DIR, ignore_errors=True)
+            try:
+                LEGACY_DRIVE_CACHE_DIR.parent.rmdir()
+            except OSError:
+                pass
+            print(f"✅ Drive cache: removed the old public copy at {LEGACY_DRIVE_CACHE_DIR}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        found = []
+        for path in self.directory.iterdir():
+            if not path.is_file():
+                continue
+            if path.name.endswith(PARTIAL_SUFFIX):
+                # Leftover from an interrupted fill
+                path.unlink()
+                continue
+            stat = path.stat()
+            found.append((stat.st_atime, path.name, stat.st_size))
+        for _, file_id, size in sorted(found):
+            self._entries[file_id] = size
+            self._total_bytes += size
+        self._loaded = True
+
+    def path_for(self, file_id: str) -> Path:
+        return self.directory / file_id
+
+    def lookup(self, file_id: str) -> Optional[Path]:
+        """Return the cached file for a Drive file ID and mark it recently used."""
+        with self._lock:
+            self._load()
+            if file_id not in self._entries:
+                return None
+            path = self.path_for(file_id)
+            if not path.exists():
+                self._total_bytes -= self._entries.pop(file_id)
+                return None
+            self._entries.move_to_end(file_id)
+        try:
+            # Access time only: mtime feeds the ETag/Last-Modified used for If-Range
+            os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+        except OSError:
+            pass
+        return path
+
+    def begin_fill(self, file_id: str, expected_size: Optional[int] = None) -> Optional[DriveCacheWriter]:
+        """
+        Start caching a file, or return None if it is already cached, another
+        listener is filling it, or it would not fit in the budget.
+        """
+        if expected_size is not None and expected_size > self.max_bytes:
+            return None
+        with self._lock:
+            self._load()
+            if file_id in self._entries or file_id in self._filling:
+                return None
+            self._filling.add(file_id)
+        try:
+            return DriveCacheWriter(self, file_id)
+        except OSError as e:
+            print(f"⚠️ Drive cache: cannot start fill for {file_id}: {e}")
+            with self._lock:
+                self._filling.discard(file_id)
+            return None
+
+    def _finish(self, file_id: str, temp_path: Optional[Path], size: int) -> None:
+        with self._lock:
+            self._filling.discard(file_id)
+            if temp_path is None:
+                return
+            os.replace(temp_path, self.path_for(file_id))
+            self._entries[file_id] = size
+            self._total_bytes += size
+            self._evict()
+        print(f"✅ Drive cache: stored {file_id} ({size} bytes, {self._total_bytes} bytes cached)")
+
+    def _evict(self) -> None:
+        """Drop least recently used files until the cache fits its budget."""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            file_id, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                self.path_for(file_id).unlink()
+            except FileNotFoundError:
+                pass
+            print(f"   Drive cache: evicted {file_id} ({size} bytes)")
+
+
+drive_cache = DriveCache(DRIVE_CACHE_DIR, DRIVE_CACHE_MAX_BYTES)
@@ -0,0 +1,198 @@
+"""
+Shared HTTP client for the Google Drive audio proxy.
+
+One application-lifetime httpx.AsyncClient (HTTP/2 when the h2 package is
+installed) keeps TLS connections to Google warm across plays. The
+``drive.google.com/uc`` redirect chain is resolved once per file ID and the
+final download URL is cached for a short while.
+
+Open connections are bounded by the client's pool (DRIVE_MAX_CONNECTIONS,
+waiting up to DRIVE_POOL_WAIT_SECONDS for a free one). The per-host limit
+only covers requests waiting for response headers, so it evens out bursts of
+new plays without capping how many listens can stream at once. Running out
+of either raises httpx.PoolTimeout, which the podcast route answers with a
+503 and Retry-After.
+"""
+
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+# Base download URL (overridable so benchmarks can point at a local stand-in)
+DRIVE_DOWNLOAD_URL = os.getenv("DRIVE_DOWNLOAD_URL", "https://drive.google.com/uc")
+
+# Connection pool settings
+DRIVE_MAX_CONNECTIONS = int(os.getenv("DRIVE_MAX_CONNECTIONS", "100"))
+DRIVE_MAX_KEEPALIVE = int(os.getenv("DRIVE_MAX_KEEPALIVE", "20"))
+# Requests to one host waiting for response headers at the same time
+DRIVE_MAX_CONNECTIONS_PER_HOST = int(os.getenv("DRIVE_MAX_CONNECTIONS_PER_HOST", "20"))
+DRIVE_POOL_WAIT_SECONDS = 10.0
+# Seconds a client is asked to wait after a PoolTimeout
+DRIVE_POOL_RETRY_AFTER = 5
+
+# Resolved download URLs are signed by Google and expire, so keep them briefly
+DRIVE_REDIRECT_CACHE_TTL = int(os.getenv("DRIVE_REDIRECT_CACHE_TTL", "600"))
+DRIVE_MAX_REDIRECTS = 10
+
+_client: Optional[httpx.AsyncClient] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+_redirect_cache: Dict[str, Tuple[str, float]] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=DRIVE_MAX_CONNECTIONS,
+            max_keepalive_connections=DRIVE_MAX_KEEPALIVE,
+            keepalive_expiry=60.0,
+        ),
+        timeout=httpx.Timeout(30.0, connect=10.0, pool=DRIVE_POOL_WAIT_SECONDS),
+        # Redirects are followed by hand so the final URL can be cached
+        follow_redirects=False,
+    )
+
+
+async def start_drive_client() -> None:
+    """Create the shared client (called on application startup)."""
+    global _client
+    if _client is None:
+        _client = _create_client()
+        print(f"✅ Drive HTTP client started (HTTP/2: {_http2_available()})")
+
+
+async def close_drive_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+    _redirect_cache.clear()
+
+
+def get_drive_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily outside the app lifespan."""
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+def drive_download_url(file_id: str) -> str:
+    """Build the public download URL for a Drive file ID."""
+    return f"{DRIVE_DOWNLOAD_URL}?export=open&id={file_id}"
+
+
+def get_cached_download_url(file_id: str) -> Optional[str]:
+    """Return the cached final download URL for a file ID, if still fresh."""
+    cached = _redirect_cache.get(file_id)
+    if not cached:
+        return None
+    url, expires_at = cached
+    if expires_at < time.monotonic():
+        _redirect_cache.pop(file_id, None)
+        return None
+    return url
+
+
+def _host_slot(host: str) -> asyncio.Semaphore:
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = asyncio.Semaphore(DRIVE_MAX_CONNECTIONS_PER_HOST)
+        _host_slots[host] = slot
+    return slot
+
+
+class DriveStream:
+    """An open upstream response; its connection goes back to the pool on close."""
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self._closed = False
+
+    @property
+    def status_code(self) -> int:
+        return self.response.status_code
+
+    @property
+    def headers(self) -> httpx.Headers:
+        return self.response.headers
+
+    async def iter_bytes(self, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        async for chunk in self.response.aiter_bytes(chunk_size=chunk_size):
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            await self.response.aclose()
+
+
+async def _send(method: str, url: str, headers: Optional[Dict[str, str]]) -> DriveStream:
+    """Send one request; a per-host slot is held until the response headers arrive."""
+    client = get_drive_client()
+    request = client.build_request(method, url, headers=headers)
+    slot = _host_slot(request.url.host)
+    try:
+        await asyncio.wait_for(slot.acquire(), timeout=DRIVE_POOL_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        raise httpx.PoolTimeout(f"Too many concurrent requests to {request.url.host}")
+    try:
+        response = await client.send(request, stream=True)
+    finally:
+        slot.release()
+    return DriveStream(response)
+
+
+async def _follow(method: str, url: str, headers: Optional[Dict[str, str]]) -> Tuple[DriveStream, str]:
+    """Send a request and follow redirects by hand, returning the final URL too."""
+    for _ in range(DRIVE_MAX_REDIRECTS):
+        stream = await _send(method, url, headers)
+        if not stream.response.is_redirect:
+            return stream, url
+        next_url = str(stream.response.next_request.url) if stream.response.next_request else None
+        await stream.aclose()
+        if not next_url:
+            break
+        url = next_url
+    raise httpx.TooManyRedirects(f"Too many redirects for {url}")
+
+
+async def open_drive_stream(
+    file_id: str,
+    method: str = "GET",
+    headers: Optional[Dict[str, str]] = None
+) -> DriveStream:
+    """
+    Open a streaming request for a Drive file.
+
+    Uses the cached download URL when there is one and falls back to the
+    ``/uc`` redirect chain if the cached URL has expired upstream. The caller
+    must ``aclose()`` the returned stream.
+    """
+    cached_url = get_cached_download_url(file_id)
+    if cached_url:
+        stream, _ = await _follow(method, cached_url, headers)
+        if stream.status_code < 400:
+            return stream
+        # Signed URL expired or was revoked; resolve again from scratch
+        await stream.aclose()
+        _redirect_cache.pop(file_id, None)
+
+    start_url = drive_download_url(file_id)
+    stream, final_url = await _follow(method, start_url, headers)
+    if stream.status_code < 400 and final_url != start_url:
+        _redirect_cache[file_id] = (final_url, time.monotonic() + DRIVE_REDIRECT_CACHE_TTL)
+    return stream
@@ -0,0 +1,54 @@
+"""
+ETags and conditional GET for catalog endpoints.
+
+The validator is derived from the response cache generation of the table
+(bumped on every write and counter flush) plus the request's cache key, so a
+matching ``If-None-Match`` is answered with 304 before any query runs. A
+random per-process token is mixed in because generations restart at zero
+when the server restarts.
+"""
+
+import hashlib
+import uuid
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+
+from utils.cache import response_cache
+
+# Clients may store the response but must revalidate it on every use
+CATALOG_CACHE_CONTROL = "no-cache"
+
+_PROCESS_TOKEN = uuid.uuid4().hex
+
+
+def make_etag(key: Tuple, *versions) -> str:
+    """Strong ETag for the response identified by a ``cache_key``."""
+    state = (_PROCESS_TOKEN, response_cache.generation(key[0]), key, versions)
+    return '"' + hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so a W/ prefix is ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+def check_etag(request: Request, response: Response, key: Tuple, *versions) -> Optional[Response]:
+    """
+    Return a 304 response when the client already has the current version;
+    otherwise set the ETag on ``response`` and return None.
+
+    Call before loading anything: a write that lands while the data is loaded
+    changes the ETag, so the response is never older than its ETag claims.
+    """
+    etag = make_etag(key, *versions)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
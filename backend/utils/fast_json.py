@@ -0,0 +1,131 @@
+"""
+Fast JSON path for list endpoints.
+
+A list route with ``response_model=List[Schema]`` normally loads full ORM
+objects, validates each one through the Pydantic schema and has FastAPI
+validate the returned list a second time before encoding it. For a page of
+100 podcasts with long descriptions that is most of the request's CPU.
+
+``RowSerializer`` selects exactly the schema's columns, turns each result row
+into a dict in the schema's field order and fills in the computed fields with
+the schema's own property code. ``json_response()`` encodes the list with
+orjson (Pydantic's encoder if orjson is not installed) and returns it as a
+ready Response, so FastAPI skips validation; ``response_model`` stays on the
+route for the OpenAPI docs.
+
+Large text fields that catalog cards never show (transcripts, full content)
+are ``deferred``: they are neither selected nor sent unless the request names
+them in ``include=`` (comma-separated), and rows without them simply lack the
+keys.
+
+The bytes are the same as the schema path produces (datetimes as ISO 8601
+with ``Z`` for UTC); the one known difference is the exponent notation of
+floats of 1e16 and above. benchmarks/bench_serializers.py checks parity.
+"""
+
+from types import SimpleNamespace
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    print("⚠️  orjson not installed, list endpoints use Pydantic's JSON encoder")
+
+if orjson is None:
+    from pydantic_core import to_json
+
+
+def encode_json(content: Any) -> bytes:
+    """Compact UTF-8 JSON, formatted like Pydantic's ``model_dump_json``."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return to_json(content)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+# Set by FastAPI on the injected Response; the real response computes its own
+_RENDER_HEADERS = {"content-length", "content-type"}
+
+
+def json_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Encoded response carrying the headers the handler set on the injected
+    ``response`` (ETag, X-Next-Cursor), which FastAPI does not copy onto a
+    returned Response.
+    """
+    headers = {}
+    if response is not None:
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name not in _RENDER_HEADERS
+        }
+    return FastJSONResponse(content, headers=headers)
+
+
+class RowSerializer:
+    """Column projection and dict conversion for one response schema."""
+
+    def __init__(self, schema: Type[BaseModel], model, deferred: Sequence[str] = ()):
+        self.schema = schema
+        self.model = model
+        self.fields = list(schema.model_fields)
+        unknown = set(deferred) - set(self.fields)
+        if unknown:
+            raise ValueError(f"{schema.__name__} has no field(s) {', '.join(sorted(unknown))}")
+        self.deferred = tuple(name for name in self.fields if name in deferred)
+        # Raises AttributeError at import if the schema has a field the table lacks
+        self.columns = {name: getattr(model, name) for name in self.fields}
+        self.computed = [
+            (name, info.wrapped_property.fget)
+            for name, info in schema.model_computed_fields.items()
+        ]
+
+    def included(self, include: Optional[str]) -> Tuple[str, ...]:
+        """
+        Deferred fields named in an ``include`` query parameter, in field
+        order (part of the cache key); a 400 for names that can't be included.
+        """
+        if not include:
+            return ()
+        requested = {name.strip() for name in include.split(",") if name.strip()}
+        unknown = requested - set(self.deferred)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown include field(s): {', '.join(sorted(unknown))}. "
+                       f"Allowed: {', '.join(self.deferred) or 'none'}"
+            )
+        return tuple(name for name in self.deferred if name in requested)
+
+    def select(self, included: Sequence[str] = ()):
+        """
+        ``select()`` of the schema's columns in field order, leaving out the
+        deferred ones that are not in ``included``.
+        """
+        return select(*(
+            column for name, column in self.columns.items()
+            if name not in self.deferred or name in included
+        ))
+
+    def to_dict(self, row) -> dict:
+        """One result row (from ``select()``) as the schema would serialize it."""
+        data = dict(zip(row._fields, row))
+        if self.computed:
+            view = SimpleNamespace(**data)
+            for name, fget in self.computed:
+                data[name] = fget(view)
+        return data
+
+    def to_dicts(self, rows: Iterable) -> List[dict]:
+        return [self.to_dict(row) for row in rows]
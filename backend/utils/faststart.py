@@ -0,0 +1,261 @@
+"""
+Fast-start remux for MP4/M4A episodes.
+
+A file exported with its ``moov`` atom after the media data makes browsers
+fetch the tail of the file (a second Range request) before playback can
+start. ``faststart()`` rewrites the container with ``moov`` in front of the
+first ``mdat``, shifting every chunk offset in the ``stco``/``co64`` tables by
+the distance its media data moved (tables are widened to ``co64`` if an
+offset no longer fits in 32 bits). Only ``moov`` is parsed; everything else
+is copied byte for byte.
+
+``schedule_faststart()`` runs the remux after an upload in a single worker
+thread, swaps the stored file atomically and updates the podcasts that use it.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+from database import SessionLocal
+from file_server import UPLOAD_CHUNK_SIZE, content_store, replace_file
+from models import Podcast
+from utils.audio_metadata import apply_metadata, media_url, probe_audio
+from utils.cache import response_cache
+
+MP4_EXTENSIONS = {".m4a", ".mp4", ".m4b", ".mov", ".aac"}
+# Containers on the way from moov to the chunk offset tables
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class Atom:
+    """A top-level atom: its type, byte offset and total size (header included)."""
+
+    def __init__(self, kind: bytes, offset: int, size: int):
+        self.kind = kind
+        self.offset = offset
+        self.size = size
+
+
+def _top_level_atoms(f: BinaryIO, file_size: int) -> List[Atom]:
+    atoms = []
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+        elif size == 0:
+            size = file_size - offset
+        if size < 8 or offset + size > file_size:
+            raise ValueError(f"truncated or corrupt atom {kind!r} at {offset}")
+        atoms.append(Atom(kind, offset, size))
+        offset += size
+    return atoms
+
+
+def _rewrite_moov(data: bytes, relocate: Callable[[int], int], widen: bool) -> bytes:
+    """
+    Rebuild an atom (``data`` includes its 8-byte header) with relocated chunk
+    offsets. With ``widen``, every stco table is written as co64.
+    """
+    kind = data[4:8]
+    if kind in _CONTAINERS:
+        payload = b""
+        position = 8
+        while position + 8 <= len(data):
+            size = struct.unpack(">I", data[position:position + 4])[0]
+            if size == 1:
+                size = struct.unpack(">Q", data[position + 8:position + 16])[0]
+            elif size == 0:
+                size = len(data) - position
+            payload += _rewrite_moov(data[position:position + size], relocate, widen)
+            position += size
+        return struct.pack(">I4s", 8 + len(payload), kind) + payload
+    if kind == b"stco":
+        count = struct.unpack(">I", data[12:16])[0]
+        offsets = [relocate(offset) for offset in struct.unpack(f">{count}I", data[16:16 + 4 * count])]
+        if widen:
+            return struct.pack(">I4s4sI", 16 + 8 * count, b"co64", data[8:12], count) + struct.pack(f">{count}Q", *offsets)
+        return data[:16] + struct.pack(f">{count}I", *offsets)
+    if kind == b"co64":
+        count = struct.unpack(">I", data[12:16])[0]
+        offsets = [relocate(offset) for offset in struct.unpack(f">{count}Q", data[16:16 + 8 * count])]
+        return data[:16] + struct.pack(f">{count}Q", *offsets)
+    return data
+
+
+def _needs_widening(data: bytes, relocate: Callable[[int], int]) -> bool:
+    """Whether any relocated chunk offset is too large for an stco table."""
+    largest = [0]
+
+    def track(offset: int) -> int:
+        largest[0] = max(largest[0], relocate(offset))
+        return 0
+
+    _rewrite_moov(data, track, widen=True)
+    return largest[0] > 0xFFFFFFFF
+
+
+def _layout(atoms: List[Atom], moov: Atom, moov_size: int) -> Tuple[List[Atom], Callable[[int], int]]:
+    """New atom order (moov before the first mdat) and the old-to-new offset mapping."""
+    rest = [atom for atom in atoms if atom is not moov]
+    first_mdat = next(index for index, atom in enumerate(rest) if atom.kind == b"mdat")
+    order = rest[:first_mdat] + [moov] + rest[first_mdat:]
+
+    moves = []  # (old start, old end, shift) for every atom that was not rewritten
+    position = 0
+    for atom in order:
+        size = moov_size if atom is moov else atom.size
+        if atom is not moov:
+            moves.append((atom.offset, atom.offset + atom.size, position - atom.offset))
+        position += size
+
+    def relocate(offset: int) -> int:
+        for start, end, shift in moves:
+            if start <= offset < end:
+                return offset + shift
+        return offset
+
+    return order, relocate
+
+
+def _copy_range(src: BinaryIO, dst: BinaryIO, start: int, length: int, digest) -> None:
+    src.seek(start)
+    while length > 0:
+        chunk = src.read(min(UPLOAD_CHUNK_SIZE, length))
+        if not chunk:
+            raise ValueError("unexpected end of file")
+        dst.write(chunk)
+        digest.update(chunk)
+        length -= len(chunk)
+
+
+def is_faststart(path) -> Optional[bool]:
+    """Whether moov precedes every mdat (None if the file is not a readable MP4)."""
+    try:
+        with open(path, "rb") as f:
+            atoms = _top_level_atoms(f, os.fstat(f.fileno()).st_size)
+    except (OSError, ValueError, struct.error):
+        return None
+    kinds = [atom.kind for atom in atoms]
+    if b"moov" not in kinds or b"mdat" not in kinds:
+        return None
+    return kinds.index(b"moov") < kinds.index(b"mdat")
+
+
+def faststart(source: Path, destination: Path) -> Optional[Tuple[int, str]]:
+    """
+    Write a fast-start copy of ``source`` to ``destination``. Returns
+    (size, sha256) of the new file, or None if the file is already fast-start
+    (or not an MP4 with moov and mdat).
+    """
+    with open(source, "rb") as src:
+        atoms = _top_level_atoms(src, os.fstat(src.fileno()).st_size)
+        moov = next((atom for atom in atoms if atom.kind == b"moov"), None)
+        mdats = [index for index, atom in enumerate(atoms) if atom.kind == b"mdat"]
+        if moov is None or not mdats or atoms.index(moov) < mdats[0]:
+            return None
+        src.seek(moov.offset)
+        moov_data = src.read(moov.size)
+        if moov_data[:4] == b"\x00\x00\x00\x01":
+            # 64-bit header on moov itself: rebuild with the regular one
+            moov_data = struct.pack(">I4s", moov.size - 8, b"moov") + moov_data[16:]
+
+        _, relocate = _layout(atoms, moov, len(moov_data))
+        widen = _needs_widening(moov_data, relocate)
+        if widen:
+            # co64 entries are larger, which moves the media data again
+            size = len(_rewrite_moov(moov_data, lambda offset: offset, widen=True))
+            _, relocate = _layout(atoms, moov, size)
+        new_moov = _rewrite_moov(moov_data, relocate, widen)
+        order, _ = _layout(atoms, moov, len(new_moov))
+
+        digest = hashlib.sha256()
+        with open(destination, "wb") as dst:
+            for atom in order:
+                if atom is moov:
+                    dst.write(new_moov)
+                    digest.update(new_moov)
+                else:
+                    _copy_range(src, dst, atom.offset, atom.size, digest)
+            dst.flush()
+            os.fsync(dst.fileno())
+            size = dst.tell()
+    return size, digest.hexdigest()
+
+
+def remux_stored_file(file_path: Path) -> bool:
+    """Replace a stored MP4 with its fast-start version; returns False if nothing changed."""
+    temp_path = content_store.temp_dir() / f"faststart-{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        result = faststart(file_path, temp_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    if result is None:
+        temp_path.unlink(missing_ok=True)
+        return False
+    size, sha256 = result
+    replace_file(file_path, temp_path, sha256, size)
+    return True
+
+
+def _update_podcasts(file_path: Path) -> None:
+    """Store the new moov offset on the podcasts that use this file."""
+    metadata = probe_audio(file_path)
+    db = SessionLocal()
+    try:
+        podcasts = db.query(Podcast).filter(Podcast.audio_url == media_url(file_path)).all()
+        for podcast in podcasts:
+            apply_metadata(podcast, metadata)
+        db.commit()
+    finally:
+        db.close()
+    if podcasts:
+        response_cache.invalidate(Podcast.__tablename__)
+
+
+def _run(file_path: Path) -> None:
+    try:
+        if remux_stored_file(file_path):
+            print(f"✅ Fast-start remux: {file_path.name}")
+            _update_podcasts(file_path)
+    except Exception as e:
+        print(f"⚠️ Fast-start remux failed for {file_path}: {e}")
+    finally:
+        with _lock:
+            _pending.discard(file_path)
+
+
+def schedule_faststart(file_path) -> None:
+    """Queue a fast-start remux for a stored MP4/M4A (no-op for other files)."""
+    global _executor
+    file_path = Path(file_path)
+    if file_path.suffix.lower() not in MP4_EXTENSIONS:
+        return
+    with _lock:
+        if file_path in _pending:
+            return
+        _pending.add(file_path)
+        if _executor is None:
+            # One at a time: a remux reads and writes the whole episode
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="faststart")
+    _executor.submit(_run, file_path)
+
+
+def shutdown_faststart_worker() -> None:
+    """Stop the worker; queued files are picked up again by the startup backfill."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,394 @@
+"""
+HLS packaging for AAC podcast audio (optional, PODCAST_HLS_ENABLED=true).
+
+An MP4/M4A episode is cut into segments of about HLS_SEGMENT_SECONDS without
+decoding: the sound track's sample tables (stsz, stsc, stco/co64, stts) give
+the byte range and duration of every AAC frame, and each segment is a run of
+whole frames written as ADTS ("packed audio" in HLS terms) behind the ID3
+timestamp tag the spec requires. Output lives under
+``STORAGE_DIR/podcasts/hls/<podcast id>/``:
+
+    index.m3u8
+    3f2a9c1b7d04_00000.aac
+    3f2a9c1b7d04_00001.aac
+    ...
+
+Segment names start with a hash of the source audio, so a segment's bytes
+never change under its name and can be cached forever; re-packaging new audio
+writes new names, swaps the playlist in atomically and then removes the old
+segments.
+"""
+
+import hashlib
+import math
+import os
+import re
+import shutil
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from database import SessionLocal
+from file_server import STORAGE_DIR, content_store
+from models import Podcast
+from utils.audio_metadata import local_media_path
+
+PODCAST_HLS_ENABLED = os.getenv("PODCAST_HLS_ENABLED", "false").lower() == "true"
+HLS_SEGMENT_SECONDS = float(os.getenv("HLS_SEGMENT_SECONDS", "6"))
+HLS_DIR = STORAGE_DIR / "podcasts" / "hls"
+
+PLAYLIST_NAME = "index.m3u8"
+SEGMENT_NAME = re.compile(r"^[0-9a-f]{12}_\d{5}\.aac$")
+MP4_EXTENSIONS = {".m4a", ".mp4", ".m4b"}
+# Timestamps in the ID3 PRIV frame are on the 90 kHz MPEG-TS clock
+_PTS_CLOCK = 90000
+_ADTS_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class SoundTrack:
+    """What the packager needs from an MP4's sound track."""
+
+    def __init__(self):
+        self.timescale = 0
+        self.sample_sizes: List[int] = []
+        self.sample_durations: List[int] = []
+        self.chunk_offsets: List[int] = []
+        self.samples_per_chunk: List[Tuple[int, int]] = []  # (first chunk, samples per chunk)
+        self.codec: Optional[bytes] = None
+        self.audio_config: Optional[bytes] = None  # AudioSpecificConfig from esds
+
+
+def _children(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """(type, payload start, end) for each atom in ``data[start:end]``."""
+    position = start
+    while position + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[position:position + 8])
+        payload = position + 8
+        if size == 1:
+            size = struct.unpack(">Q", data[payload:payload + 8])[0]
+            payload += 8
+        elif size == 0:
+            size = end - position
+        if size < payload - position:
+            return
+        yield kind, payload, position + size
+        position += size
+
+
+def _audio_specific_config(esds: bytes) -> Optional[bytes]:
+    """DecoderSpecificInfo (tag 0x05) from an esds payload, after version/flags."""
+    position = 4
+    while position < len(esds):
+        tag = esds[position]
+        position += 1
+        length = 0
+        for _ in range(4):
+            byte = esds[position]
+            position += 1
+            length = (length << 7) | (byte & 0x7F)
+            if not byte & 0x80:
+                break
+        if tag == 0x03:
+            flags = esds[position + 2]
+            position += 3 + (2 if flags & 0x80 else 0) + (2 if flags & 0x20 else 0)
+            if flags & 0x40:
+                position += 1 + esds[position]
+        elif tag == 0x04:
+            position += 13
+        elif tag == 0x05:
+            return esds[position:position + length]
+        else:
+            position += length
+    return None
+
+
+def _read_sound_track(f: BinaryIO) -> Optional[SoundTrack]:
+    file_size = os.fstat(f.fileno()).st_size
+    position = 0
+    moov = None
+    while position + 8 <= file_size:
+        f.seek(position)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+        elif size == 0:
+            size = file_size - position
+        if size < 8:
+            return None
+        if kind == b"moov":
+            f.seek(position)
+            moov = f.read(size)
+            break
+        position += size
+    if moov is None:
+        return None
+
+    for kind, payload, end in _children(moov, 8, len(moov)):
+        if kind != b"trak":
+            continue
+        mdia = next(((p, e) for k, p, e in _children(moov, payload, end) if k == b"mdia"), None)
+        if mdia is None:
+            continue
+        atoms = {k: (p, e) for k, p, e in _children(moov, *mdia)}
+        if b"hdlr" not in atoms or moov[atoms[b"hdlr"][0] + 8:atoms[b"hdlr"][0] + 12] != b"soun":
+            continue
+        if b"mdhd" not in atoms or b"minf" not in atoms:
+            return None
+        track = SoundTrack()
+        mdhd = atoms[b"mdhd"][0]
+        track.timescale = struct.unpack(">I", moov[mdhd + (20 if moov[mdhd] == 1 else 12):][:4])[0]
+        stbl = next(((p, e) for k, p, e in _children(moov, *atoms[b"minf"]) if k == b"stbl"), None)
+        if stbl is None:
+            return None
+        for table, start, table_end in _children(moov, *stbl):
+            body = moov[start:table_end]
+            if table == b"stsd":
+                entry = next(_children(body, 8, len(body)), None)
+                if entry is not None:
+                    track.codec = entry[0]
+                    # Audio sample entry fields are 28 bytes; child atoms follow
+                    for child, child_start, child_end in _children(body, entry[1] + 28, entry[2]):
+                        if child == b"esds":
+                            track.audio_config = _audio_specific_config(body[child_start:child_end])
+            elif table == b"stsz":
+                sample_size, count = struct.unpack(">II", body[4:12])
+                track.sample_sizes = (
+                    [sample_size] * count if sample_size else list(struct.unpack(f">{count}I", body[12:12 + 4 * count]))
+                )
+            elif table == b"stts":
+                count = struct.unpack(">I", body[4:8])[0]
+                for index in range(count):
+                    samples, duration = struct.unpack(">II", body[8 + 8 * index:16 + 8 * index])
+                    track.sample_durations.extend([duration] * samples)
+            elif table == b"stsc":
+                count = struct.unpack(">I", body[4:8])[0]
+                for index in range(count):
+                    first, per_chunk, _ = struct.unpack(">III", body[8 + 12 * index:20 + 12 * index])
+                    track.samples_per_chunk.append((first, per_chunk))
+            elif table in (b"stco", b"co64"):
+                count = struct.unpack(">I", body[4:8])[0]
+                fmt = f">{count}I" if table == b"stco" else f">{count}Q"
+                track.chunk_offsets = list(struct.unpack(fmt, body[8:8 + struct.calcsize(fmt)]))
+        return track
+    return None
+
+
+def _sample_offsets(track: SoundTrack) -> List[int]:
+    """File offset of every sample, from the chunk offsets and sample-to-chunk runs."""
+    offsets = []
+    sample = 0
+    runs = track.samples_per_chunk + [(len(track.chunk_offsets) + 1, 0)]
+    for (first, per_chunk), (next_first, _) in zip(runs, runs[1:]):
+        for chunk in range(first - 1, min(next_first - 1, len(track.chunk_offsets))):
+            position = track.chunk_offsets[chunk]
+            for _ in range(per_chunk):
+                if sample >= len(track.sample_sizes):
+                    return offsets
+                offsets.append(position)
+                position += track.sample_sizes[sample]
+                sample += 1
+    return offsets
+
+
+def _adts_header_prefix(audio_config: bytes) -> Optional[Tuple[int, int, int]]:
+    """(profile, sampling frequency index, channel configuration) for ADTS headers."""
+    if not audio_config or len(audio_config) < 2:
+        return None
+    bits = int.from_bytes(audio_config[:4].ljust(4, b"\0"), "big")
+    object_type = bits >> 27
+    frequency_index = (bits >> 23) & 0xF
+    channels = (bits >> 19) & 0xF
+    if object_type in (5, 29) and frequency_index != 15:
+        # Explicit SBR/PS signalling: ADTS carries the core AAC-LC stream (implicit SBR)
+        object_type = 2
+    if not 1 <= object_type <= 4 or frequency_index >= len(_ADTS_SAMPLE_RATES):
+        return None
+    return object_type - 1, frequency_index, channels
+
+
+def _adts_header(prefix: Tuple[int, int, int], frame_size: int) -> bytes:
+    profile, frequency_index, channels = prefix
+    length = frame_size + 7
+    return bytes([
+        0xFF, 0xF1,
+        (profile << 6) | (frequency_index << 2) | (channels >> 2),
+        ((channels & 0x3) << 6) | (length >> 11),
+        (length >> 3) & 0xFF,
+        ((length & 0x7) << 5) | 0x1F,
+        0xFC,
+    ])
+
+
+def _id3_timestamp(seconds: float) -> bytes:
+    """ID3 tag with the PRIV timestamp frame that starts every packed-audio segment."""
+    owner = b"com.apple.streaming.transportStreamTimestamp\x00"
+    frame_data = owner + struct.pack(">Q", int(round(seconds * _PTS_CLOCK)) & 0x1FFFFFFFF)
+
+    def syncsafe(value: int) -> bytes:
+        return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+    frame = b"PRIV" + syncsafe(len(frame_data)) + b"\x00\x00" + frame_data
+    return b"ID3\x04\x00\x00" + syncsafe(len(frame)) + frame
+
+
+def _source_hash(path: Path) -> str:
+    """Hash naming the segments: the content store's SHA-256, else size and mtime."""
+    try:
+        sha256 = content_store.sha256_of(path)
+    except ValueError:
+        sha256 = None
+    if sha256 is None:
+        stat = path.stat()
+        sha256 = hashlib.sha256(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+    return sha256[:12]
+
+
+def package_hls(source: Path, output_dir: Path, segment_seconds: float = HLS_SEGMENT_SECONDS) -> Optional[int]:
+    """
+    Write segments and the playlist for an AAC MP4 into ``output_dir``.
+    Returns the number of segments, or None if the file can't be packaged.
+    """
+    with open(source, "rb") as f:
+        track = _read_sound_track(f)
+        if track is None or track.codec != b"mp4a" or not track.timescale or not track.sample_sizes:
+            return None
+        prefix = _adts_header_prefix(track.audio_config)
+        if prefix is None:
+            return None
+        offsets = _sample_offsets(track)
+        durations = track.sample_durations or [1024] * len(offsets)
+
+        name = _source_hash(source)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        segments: List[Tuple[str, float]] = []
+        limit = segment_seconds * track.timescale
+        sample = 0
+        elapsed = 0
+        while sample < len(offsets):
+            segment_name = f"{name}_{len(segments):05d}.aac"
+            start_time = elapsed
+            frames = []
+            segment_duration = 0
+            while sample < len(offsets) and (segment_duration < limit or not frames):
+                f.seek(offsets[sample])
+                data = f.read(track.sample_sizes[sample])
+                frames.append(_adts_header(prefix, len(data)) + data)
+                segment_duration += durations[sample] if sample < len(durations) else 1024
+                sample += 1
+            elapsed += segment_duration
+            target = output_dir / segment_name
+            if not target.exists():
+                temp_path = output_dir / f".{segment_name}.tmp"
+                with open(temp_path, "wb") as out:
+                    out.write(_id3_timestamp(start_time / track.timescale))
+                    out.write(b"".join(frames))
+                os.replace(temp_path, target)
+            segments.append((segment_name, segment_duration / track.timescale))
+
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{math.ceil(max(duration for _, duration in segments))}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+    ]
+    for segment_name, duration in segments:
+        lines.append(f"#EXTINF:{duration:.3f},")
+        lines.append(segment_name)
+    lines.append("#EXT-X-ENDLIST")
+    temp_path = output_dir / f".{PLAYLIST_NAME}.tmp"
+    temp_path.write_text("\n".join(lines) + "\n")
+    os.replace(temp_path, output_dir / PLAYLIST_NAME)
+
+    # Segments of earlier audio are no longer referenced by the playlist
+    current = {segment_name for segment_name, _ in segments}
+    for path in output_dir.iterdir():
+        if SEGMENT_NAME.match(path.name) and path.name not in current:
+            path.unlink(missing_ok=True)
+    return len(segments)
+
+
+def hls_dir(podcast_id: int) -> Path:
+    return HLS_DIR / str(podcast_id)
+
+
+def hls_file(podcast_id: int, name: str) -> Optional[Path]:
+    """The playlist or a segment of a packaged podcast, if it exists."""
+    if name != PLAYLIST_NAME and not SEGMENT_NAME.match(name):
+        return None
+    path = hls_dir(podcast_id) / name
+    return path if path.is_file() else None
+
+
+def remove_hls(podcast_id: int) -> None:
+    shutil.rmtree(hls_dir(podcast_id), ignore_errors=True)
+
+
+def _run(podcast_id: int, source: Path) -> None:
+    try:
+        count = package_hls(source, hls_dir(podcast_id))
+        if count is None:
+            # Not AAC in MP4: drop segments left over from earlier audio
+            remove_hls(podcast_id)
+        else:
+            print(f"✅ HLS packaged podcast {podcast_id}: {count} segments")
+    except Exception as e:
+        print(f"⚠️ HLS packaging failed for podcast {podcast_id}: {e}")
+    finally:
+        with _lock:
+            _pending.discard(podcast_id)
+
+
+def schedule_hls(podcast_id: int, audio_url: Optional[str]) -> None:
+    """Queue HLS packaging of a podcast's audio (no-op unless enabled and stored locally)."""
+    global _executor
+    if not PODCAST_HLS_ENABLED:
+        return
+    source = local_media_path(audio_url)
+    if source is None or source.suffix.lower() not in MP4_EXTENSIONS:
+        remove_hls(podcast_id)
+        return
+    with _lock:
+        if podcast_id in _pending:
+            return
+        _pending.add(podcast_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hls")
+    _executor.submit(_run, podcast_id, source)
+
+
+def backfill_hls() -> int:
+    """Queue packaging for podcasts with local AAC audio and no playlist yet."""
+    if not PODCAST_HLS_ENABLED:
+        return 0
+    db = SessionLocal()
+    try:
+        podcasts: Dict[int, str] = dict(
+            db.query(Podcast.id, Podcast.audio_url).filter(Podcast.audio_url.isnot(None)).all()
+        )
+    finally:
+        db.close()
+    queued = 0
+    for podcast_id, audio_url in podcasts.items():
+        source = local_media_path(audio_url)
+        if source is None or source.suffix.lower() not in MP4_EXTENSIONS or not source.exists():
+            continue
+        if hls_file(podcast_id, PLAYLIST_NAME) is None:
+            schedule_hls(podcast_id, audio_url)
+            queued += 1
+    return queued
+
+
+def shutdown_hls_worker() -> None:
+    """Stop the worker; podcasts still without a playlist are queued again at startup."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,188 @@
+"""
+Resized WebP/AVIF variants of uploaded cover images.
+
+When an image is stored, a small worker pool writes downscaled copies at
+IMAGE_VARIANT_WIDTHS next to the original, in a hidden ``.variants`` folder:
+
+    podcasts/covers/cover.jpg
+    podcasts/covers/.variants/cover.jpg/320.webp
+    podcasts/covers/.variants/cover.jpg/320.avif
+
+``VariantStaticFiles`` replaces StaticFiles for /storage and /uploads. A request
+for ``/storage/podcasts/covers/cover.jpg?w=320`` is answered with the smallest
+variant at least 320px wide in a format the client accepts, falling back to
+the original. Originals are never upscaled, so a width wider than the
+original is served by the original itself.
+
+Pillow is optional: without it no variants are made and ``?w=`` serves the
+original.
+"""
+
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+    print("⚠️  Pillow not installed, cover image variants disabled")
+
+IMAGE_VARIANT_WIDTHS = sorted(
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "160,320,640,1280").split(",") if width.strip()
+)
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+# Preferred first; formats Pillow can't encode are dropped
+IMAGE_VARIANT_FORMATS = [
+    fmt.strip() for fmt in os.getenv("IMAGE_VARIANT_FORMATS", "avif,webp").split(",")
+    if Image is not None and fmt.strip() and features.check(fmt.strip())
+]
+IMAGE_VARIANT_QUALITY = {"webp": 80, "avif": 60}
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+VARIANTS_DIRNAME = ".variants"
+MIME_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def is_image(path) -> bool:
+    return Path(str(path)).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def variant_dir(original: Path) -> Path:
+    return original.parent / VARIANTS_DIRNAME / original.name
+
+
+def variant_urls(url: Optional[str]) -> Dict[str, str]:
+    """``{width: url}`` for a locally stored image (empty for remote or non-image URLs)."""
+    if not url or not url.startswith(("/storage/", "/uploads/")) or not is_image(url.split("?", 1)[0]):
+        return {}
+    return {str(width): f"{url}?w={width}" for width in IMAGE_VARIANT_WIDTHS}
+
+
+def generate_variants(original: Path) -> int:
+    """Write the variants for one image; returns how many files were written."""
+    if Image is None or not IMAGE_VARIANT_FORMATS or not original.exists():
+        return 0
+    written = 0
+    # Created even when there is nothing to write, so the image isn't queued again
+    target_dir = variant_dir(original)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    with Image.open(original) as image:
+        if getattr(image, "is_animated", False):
+            # Keep animated GIFs animated: serve the original
+            return 0
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.mode in ("LA", "P", "PA") else "RGB")
+        for width in IMAGE_VARIANT_WIDTHS:
+            if width >= image.width:
+                break
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for fmt in IMAGE_VARIANT_FORMATS:
+                target = target_dir / f"{width}.{fmt}"
+                temp_path = target_dir / f".{width}.{fmt}.tmp"
+                resized.save(temp_path, format=fmt.upper(), quality=IMAGE_VARIANT_QUALITY.get(fmt, 80))
+                os.replace(temp_path, target)
+                written += 1
+    return written
+
+
+def _run(original: Path) -> None:
+    try:
+        count = generate_variants(original)
+        if count:
+            print(f"✅ Image variants: {count} written for {original.name}")
+    except Exception as e:
+        print(f"⚠️ Image variants failed for {original}: {e}")
+    finally:
+        with _lock:
+            _pending.discard(original)
+
+
+def schedule_variants(original) -> None:
+    """Queue variant generation for a stored image (no-op for other files)."""
+    global _executor
+    original = Path(original)
+    if Image is None or not is_image(original):
+        return
+    with _lock:
+        if original in _pending:
+            return
+        _pending.add(original)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_VARIANT_WORKERS, thread_name_prefix="image-variants")
+    _executor.submit(_run, original)
+
+
+def remove_variants(original: Path) -> None:
+    shutil.rmtree(variant_dir(Path(original)), ignore_errors=True)
+
+
+def shutdown_variant_workers() -> None:
+    """Stop the worker pool; queued images are picked up on their next request."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _accepted_formats(scope) -> List[str]:
+    accept = ""
+    for name, value in scope.get("headers", []):
+        if name == b"accept":
+            accept = value.decode("latin-1")
+    return [fmt for fmt in IMAGE_VARIANT_FORMATS if MIME_TYPES[fmt] in accept]
+
+
+def _requested_width(scope) -> Optional[int]:
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("w")
+    if not values:
+        return None
+    try:
+        width = int(values[0])
+    except ValueError:
+        return None
+    return width if width > 0 else None
+
+
+class VariantStaticFiles(StaticFiles):
+    """StaticFiles that serves a resized variant for ``?w=<width>`` image requests."""
+
+    def _best_variant(self, path: str, width: int, formats: List[str]) -> Optional[str]:
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None:
+            return None
+        original = Path(full_path)
+        variants = variant_dir(original)
+        if not variants.exists():
+            # Stored before variants existed (or not generated yet): make them for next time
+            schedule_variants(original)
+            return None
+        base = os.path.join(os.path.dirname(path), VARIANTS_DIRNAME, os.path.basename(path))
+        for candidate in [w for w in IMAGE_VARIANT_WIDTHS if w >= width]:
+            for fmt in formats:
+                if (variants / f"{candidate}.{fmt}").exists():
+                    return os.path.join(base, f"{candidate}.{fmt}")
+        return None
+
+    async def get_response(self, path: str, scope):
+        width = _requested_width(scope)
+        if width is None or not is_image(path):
+            return await super().get_response(path, scope)
+        variant = await anyio.to_thread.run_sync(self._best_variant, path, width, _accepted_formats(scope))
+        response = await super().get_response(variant or path, scope)
+        response.headers["Vary"] = "Accept"
+        return response
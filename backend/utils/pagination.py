@@ -0,0 +1,108 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A page is ordered by one sort column plus ``id`` as a tie-breaker. The cursor
+is an opaque token naming the last row of the previous page; the next page
+starts strictly after that row's (sort value, id), so it stays stable while
+rows are inserted and costs the same on every page (with a composite index on
+the sort column and id). ``skip`` still works when no cursor is given.
+
+The next cursor is returned in the ``X-Next-Cursor`` response header so the
+list responses keep their shape.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, func, select, tuple_
+from sqlalchemy.orm import aliased
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(row_id: int, value) -> str:
+    payload = {"id": row_id, "v": value.isoformat() if isinstance(value, datetime) else value}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, Optional[str]]:
+    """Return (id, sort value) from a cursor; raises a 400 if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return int(payload["id"]), payload.get("v")
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query,
+    sort_column,
+    descending: bool = True,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+):
+    """
+    Order ``query`` by ``sort_column, id`` and select one page.
+
+    One extra row is fetched so ``page_with_cursor`` can tell whether another
+    page follows.
+    """
+    model = sort_column.class_
+    if descending:
+        query = query.order_by(sort_column.desc(), model.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), model.id.asc())
+
+    if cursor:
+        row_id, value = decode_cursor(cursor)
+        # Compare against the stored value of the cursor row so the comparison
+        # uses the database's own representation (SQLite keeps timestamps as
+        # text in more than one format). If that row has been deleted since,
+        # fall back to the value carried in the cursor
+        anchor = aliased(model)
+        stored_value = (
+            select(getattr(anchor, sort_column.key))
+            .where(anchor.id == row_id)
+            .scalar_subquery()
+        )
+        if isinstance(value, str) and isinstance(sort_column.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        position = tuple_(sort_column, model.id)
+        boundary = tuple_(func.coalesce(stored_value, value), row_id)
+        query = query.where(position < boundary if descending else position > boundary)
+    elif skip:
+        query = query.offset(skip)
+
+    return query.limit(limit + 1)
+
+
+def cursor_headers(response: Optional[Response]) -> dict:
+    """The next-cursor header set on ``response``, if any (for cached responses)."""
+    if response is None or NEXT_CURSOR_HEADER not in response.headers:
+        return {}
+    return {NEXT_CURSOR_HEADER: response.headers[NEXT_CURSOR_HEADER]}
+
+
+def page_with_cursor(rows: Sequence, sort_key: str, limit: int, response: Optional[Response] = None) -> list:
+    """
+    Trim the extra row fetched by ``paginate`` and, when another page
+    follows, set the next cursor on ``response``. Returns the page rows.
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    if response is not None and rows:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.id, getattr(last, sort_key))
+    return rows
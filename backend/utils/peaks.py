@@ -0,0 +1,326 @@
+"""
+Precomputed waveform peaks for the audio player.
+
+Each uploaded episode is decoded once, in a process pool, to 16-bit mono
+samples. Every PEAKS_SAMPLES_PER_PEAK samples become one (min, max) pair, and
+each further zoom level merges PEAKS_LEVEL_FACTOR pairs of the level before
+it (all with NumPy, a block at a time, so memory stays flat for long files).
+The result is a small binary sidecar next to the audio, in a hidden
+``.peaks`` folder:
+
+    podcasts/audio/episode.m4a
+    podcasts/audio/.peaks/episode.m4a.peaks
+
+Sidecar layout (little-endian):
+
+    "FOGP"  u8 version  u32 sample rate  u16 level count
+    per level: u32 samples per peak, u32 peak count
+    per level: peak count x (i16 min, i16 max)
+
+WAV is decoded directly; other formats (M4A, MP3) need ``ffmpeg`` on the
+PATH, which the Railway build installs (nixpacks.toml) but Render's native
+Python runtime does not have. Without ffmpeg only WAV files get peaks, nothing
+else is queued, and the peaks route answers 501 with the duration only, so
+the player falls back to a plain progress bar. NumPy is optional: without it
+no peaks are made. It is imported by the pool workers when they compute
+peaks, not when the server starts.
+
+Pool workers are spawned processes. Spawn imports this module in each worker
+and also re-imports the server's ``__main__`` script as ``__mp_main__``: under
+``uvicorn main:app`` (Procfile, railway.json, render.yaml) that is uvicorn's
+launcher, but under ``python main.py`` it is main.py, whose module-level setup
+then runs once in every worker. The application modules used to record
+results are imported inside the functions that run in the server process.
+"""
+
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import wave
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+if not NUMPY_AVAILABLE:
+    print("⚠️  NumPy not installed, waveform peaks disabled")
+np = None  # imported on first use by _load_numpy()
+
+PEAKS_SAMPLES_PER_PEAK = int(os.getenv("PEAKS_SAMPLES_PER_PEAK", "1000"))
+PEAKS_LEVELS = int(os.getenv("PEAKS_LEVELS", "4"))
+PEAKS_LEVEL_FACTOR = int(os.getenv("PEAKS_LEVEL_FACTOR", "4"))
+PEAKS_WORKERS = int(os.getenv("PEAKS_WORKERS", "1"))
+# ffmpeg output rate for formats that are not decoded directly
+PEAKS_DECODE_RATE = 44100
+
+PEAKS_DIRNAME = ".peaks"
+PEAKS_MAGIC = b"FOGP"
+PEAKS_VERSION = 1
+_READ_FRAMES = 1 << 18
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def peaks_path(audio_path) -> Path:
+    audio_path = Path(audio_path)
+    return audio_path.parent / PEAKS_DIRNAME / f"{audio_path.name}.peaks"
+
+
+def remove_peaks(audio_path) -> None:
+    peaks_path(audio_path).unlink(missing_ok=True)
+
+
+def peaks_version(audio_path) -> Optional[str]:
+    """Short hash of an existing sidecar (None if there is none)."""
+    try:
+        return hashlib.sha256(peaks_path(audio_path).read_bytes()).hexdigest()[:12]
+    except FileNotFoundError:
+        return None
+
+
+# Decoding (runs in pool workers)
+
+def _load_numpy() -> None:
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+def _read_wav(path: Path) -> Tuple[int, Iterator["np.ndarray"]]:
+    reader = wave.open(str(path), "rb")
+    sample_rate = reader.getframerate()
+    channels = reader.getnchannels()
+    width = reader.getsampwidth()
+
+    def blocks():
+        with reader:
+            while True:
+                raw = reader.readframes(_READ_FRAMES)
+                if not raw:
+                    return
+                if width == 1:
+                    samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8
+                elif width == 2:
+                    samples = np.frombuffer(raw, dtype="<i2")
+                elif width == 3:
+                    # Keep the top two bytes of each 24-bit sample
+                    samples = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)[:, 1:].copy().view("<i2").ravel()
+                else:
+                    samples = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+                # Mono from the loudest channel at each frame keeps the envelope
+                frames = samples.reshape(-1, channels)
+                lows, highs = frames.min(axis=1), frames.max(axis=1)
+                yield np.where(-lows.astype(np.int32) > highs, lows, highs)
+
+    return sample_rate, blocks()
+
+
+def _read_ffmpeg(path: Path) -> Tuple[int, Iterator["np.ndarray"]]:
+    command = [
+        "ffmpeg", "-v", "error", "-nostdin", "-i", str(path),
+        "-f", "s16le", "-ac", "1", "-ar", str(PEAKS_DECODE_RATE), "-",
+    ]
+
+    def blocks():
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            leftover = b""
+            while True:
+                raw = process.stdout.read(_READ_FRAMES * 2)
+                if not raw:
+                    break
+                raw = leftover + raw
+                usable = len(raw) - len(raw) % 2
+                leftover = raw[usable:]
+                yield np.frombuffer(raw[:usable], dtype="<i2")
+        finally:
+            process.stdout.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg could not decode {path.name}")
+
+    return PEAKS_DECODE_RATE, blocks()
+
+
+def _base_peaks(blocks: Iterator["np.ndarray"], samples_per_peak: int) -> "np.ndarray":
+    """(min, max) per ``samples_per_peak`` samples, as an (n, 2) int16 array."""
+    parts: List["np.ndarray"] = []
+    carry = np.empty(0, dtype=np.int16)
+    for block in blocks:
+        block = np.concatenate([carry, block.astype(np.int16, copy=False)])
+        whole = len(block) - len(block) % samples_per_peak
+        if whole:
+            windows = block[:whole].reshape(-1, samples_per_peak)
+            parts.append(np.stack([windows.min(axis=1), windows.max(axis=1)], axis=1))
+        carry = block[whole:]
+    if len(carry):
+        parts.append(np.array([[carry.min(), carry.max()]], dtype=np.int16))
+    if not parts:
+        return np.zeros((0, 2), dtype=np.int16)
+    return np.concatenate(parts).astype(np.int16)
+
+
+def _merge_level(peaks: "np.ndarray", factor: int) -> "np.ndarray":
+    """Next zoom level: every ``factor`` pairs merged into one."""
+    if not len(peaks):
+        return peaks
+    padding = -len(peaks) % factor
+    if padding:
+        # Repeat the last pair; it doesn't change a min or a max
+        peaks = np.concatenate([peaks, np.repeat(peaks[-1:], padding, axis=0)])
+    grouped = peaks.reshape(-1, factor, 2)
+    return np.stack([grouped[:, :, 0].min(axis=1), grouped[:, :, 1].max(axis=1)], axis=1)
+
+
+def _is_wav(path: Path) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(12)
+    return head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+
+def can_compute_peaks(audio_path) -> bool:
+    """Whether this server can decode ``audio_path`` (WAV, or anything with ffmpeg)."""
+    if not NUMPY_AVAILABLE:
+        return False
+    try:
+        return _is_wav(Path(audio_path)) or shutil.which("ffmpeg") is not None
+    except OSError:
+        return False
+
+
+def compute_peaks(source: str, target: str) -> Optional[str]:
+    """
+    Decode ``source`` and write its peaks sidecar to ``target``. Returns the
+    sidecar's version hash, or None if the file can't be decoded here.
+    """
+    if not NUMPY_AVAILABLE:
+        return None
+    _load_numpy()
+    source_path = Path(source)
+    if _is_wav(source_path):
+        sample_rate, blocks = _read_wav(source_path)
+    elif shutil.which("ffmpeg"):
+        sample_rate, blocks = _read_ffmpeg(source_path)
+    else:
+        print(f"⚠️ Waveform peaks need ffmpeg to decode {source_path.name}")
+        return None
+
+    levels = [(PEAKS_SAMPLES_PER_PEAK, _base_peaks(blocks, PEAKS_SAMPLES_PER_PEAK))]
+    for _ in range(PEAKS_LEVELS - 1):
+        samples_per_peak, peaks = levels[-1]
+        levels.append((samples_per_peak * PEAKS_LEVEL_FACTOR, _merge_level(peaks, PEAKS_LEVEL_FACTOR)))
+
+    data = struct.pack("<4sBIH", PEAKS_MAGIC, PEAKS_VERSION, sample_rate, len(levels))
+    data += b"".join(struct.pack("<II", samples_per_peak, len(peaks)) for samples_per_peak, peaks in levels)
+    data += b"".join(peaks.astype("<i2").tobytes() for _, peaks in levels)
+
+    target_path = Path(target)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target_path.with_name(f".{target_path.name}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, target_path)
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+# Scheduling (server process)
+
+def _record(audio_path: Path, future: Future) -> None:
+    """Store the new peaks version on the podcasts that use this audio."""
+    from database import SessionLocal
+    from models import Podcast
+    from utils.audio_metadata import media_url
+    from utils.cache import response_cache
+
+    with _lock:
+        _pending.discard(audio_path)
+    try:
+        version = future.result()
+    except Exception as e:
+        print(f"⚠️ Waveform peaks failed for {audio_path}: {e}")
+        return
+    if version is None:
+        return
+    print(f"✅ Waveform peaks: {audio_path.name}")
+    db = SessionLocal()
+    try:
+        updated = (
+            db.query(Podcast)
+            .filter(Podcast.audio_url == media_url(audio_path))
+            .update({Podcast.peaks_version: version}, synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+    if updated:
+        response_cache.invalidate(Podcast.__tablename__)
+
+
+def schedule_peaks(audio_path) -> bool:
+    """Queue peak computation for a stored audio file; False if it can't be decoded here."""
+    global _executor
+    audio_path = Path(audio_path)
+    if not can_compute_peaks(audio_path):
+        return False
+    with _lock:
+        if audio_path in _pending:
+            return True
+        _pending.add(audio_path)
+        if _executor is None:
+            # Spawned workers start clean instead of forking the running server
+            _executor = ProcessPoolExecutor(
+                max_workers=PEAKS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        future = _executor.submit(compute_peaks, str(audio_path), str(peaks_path(audio_path)))
+    future.add_done_callback(lambda done: _record(audio_path, done))
+    return True
+
+
+def backfill_peaks() -> int:
+    """Queue peaks for podcasts with local audio and none recorded yet."""
+    from database import SessionLocal
+    from models import Podcast
+    from utils.audio_metadata import local_media_path
+
+    if not NUMPY_AVAILABLE:
+        return 0
+    db = SessionLocal()
+    try:
+        podcasts = (
+            db.query(Podcast)
+            .filter(Podcast.audio_url.isnot(None), Podcast.peaks_version.is_(None))
+            .all()
+        )
+        queued = skipped = 0
+        for podcast in podcasts:
+            path = local_media_path(podcast.audio_url)
+            if path is None or not path.exists():
+                continue
+            version = peaks_version(path)
+            if version is not None:
+                podcast.peaks_version = version
+            elif schedule_peaks(path):
+                queued += 1
+            else:
+                skipped += 1
+        db.commit()
+    finally:
+        db.close()
+    if skipped:
+        print(f"⚠️ Waveform peaks skipped for {skipped} podcast(s): install ffmpeg to decode non-WAV audio")
+    return queued
+
+
+def shutdown_peaks_workers() -> None:
+    """Stop the pool; files still without peaks are queued again at startup."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
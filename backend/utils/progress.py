@@ -0,0 +1,173 @@
+"""
+Write-behind buffer for listening progress (resume positions).
+
+Players report their position every few seconds. Each report replaces the
+buffered entry for its (user, podcast), so any number of heartbeats between
+flushes costs one row. Every PROGRESS_FLUSH_INTERVAL seconds (and on
+shutdown) the buffer is written as one bulk upsert in a single transaction.
+An upsert never replaces a row with an older report, so several server
+processes can share the table. Reads merge the buffered entries over the
+stored rows.
+
+Times are naive UTC (``datetime.utcnow()``) like the rest of the models, so
+buffered and stored entries serialize the same way and the upsert compares
+like with like.
+"""
+
+import asyncio
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import anyio
+
+from database import engine
+from models import ListeningProgress
+
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "10"))
+# Within this share of the duration an episode counts as finished
+PROGRESS_COMPLETE_RATIO = 0.95
+
+ProgressKey = Tuple[int, int]
+
+
+def _upsert_statement():
+    # Imported here: the PostgreSQL dialect is slow to import and SQLite setups never need it
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    table = ListeningProgress.__table__
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.podcast_id],
+        set_={
+            "position_seconds": stmt.excluded.position_seconds,
+            "duration_seconds": stmt.excluded.duration_seconds,
+            "completed": stmt.excluded.completed,
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=table.c.updated_at <= stmt.excluded.updated_at,
+    )
+
+
+class ProgressBuffer:
+    """Latest reported position per (user, podcast), flushed in bulk."""
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: Dict[ProgressKey, dict] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def report(
+        self,
+        user_id: int,
+        podcast_id: int,
+        position_seconds: float,
+        duration_seconds: Optional[float] = None,
+        completed: Optional[bool] = None,
+    ) -> dict:
+        """Buffer a position report; returns the entry as it will be stored."""
+        if completed is None:
+            completed = bool(duration_seconds and position_seconds >= duration_seconds * PROGRESS_COMPLETE_RATIO)
+        entry = {
+            "user_id": user_id,
+            "podcast_id": podcast_id,
+            "position_seconds": max(0.0, position_seconds),
+            "duration_seconds": duration_seconds,
+            "completed": completed,
+            "updated_at": datetime.utcnow(),
+        }
+        with self._lock:
+            self._pending[(user_id, podcast_id)] = entry
+        return entry
+
+    def pending_for_user(self, user_id: int) -> Dict[int, dict]:
+        """Buffered entries of one user by podcast id."""
+        with self._lock:
+            return {
+                podcast_id: dict(entry)
+                for (entry_user_id, podcast_id), entry in self._pending.items()
+                if entry_user_id == user_id
+            }
+
+    def merge(self, user_id: int, rows: Iterable) -> List[dict]:
+        """
+        Stored rows (ORM objects) of one user with the buffered entries laid
+        over them, most recently updated first.
+        """
+        merged = {
+            row.podcast_id: {
+                "podcast_id": row.podcast_id,
+                "position_seconds": row.position_seconds,
+                "duration_seconds": row.duration_seconds,
+                "completed": bool(row.completed),
+                "updated_at": _utc_naive(row.updated_at),
+            }
+            for row in rows
+        }
+        merged.update(self.pending_for_user(user_id))
+        return sorted(merged.values(), key=lambda entry: entry["updated_at"] or datetime.min, reverse=True)
+
+    def discard(self, podcast_id: int) -> None:
+        """Drop buffered entries for a deleted podcast."""
+        with self._lock:
+            for key in [key for key in self._pending if key[1] == podcast_id]:
+                del self._pending[key]
+
+    def flush(self) -> int:
+        """Write all buffered entries; returns the number of rows written."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+
+        rows = list(pending.values())
+        try:
+            with engine.begin() as conn:
+                conn.execute(_upsert_statement(), rows)
+        except Exception as e:
+            # One bad row (e.g. a podcast deleted since) must not hold back the rest
+            print(f"⚠️ Progress flush failed, writing rows one by one: {e}")
+            written = 0
+            for row in rows:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(_upsert_statement(), [row])
+                    written += 1
+                except Exception as row_error:
+                    print(f"⚠️ Dropped progress for user {row['user_id']}, podcast {row['podcast_id']}: {row_error}")
+            return written
+        return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await anyio.to_thread.run_sync(self.flush)
+
+    def start(self) -> None:
+        """Start the periodic flush task (called on application startup)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await anyio.to_thread.run_sync(self.flush)
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # PostgreSQL hands back aware timestamps, SQLite naive UTC ones
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+progress = ProgressBuffer(PROGRESS_FLUSH_INTERVAL)
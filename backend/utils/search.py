@@ -0,0 +1,182 @@
+"""
+Full-text search for podcasts, library items, events and announcements.
+
+PostgreSQL gets a generated ``search_vector`` tsvector column with a GIN index
+on each table; SQLite gets an external-content FTS5 table (``<table>_fts``)
+kept in sync by triggers. ``ensure_search_indexes()`` creates whichever applies
+and is safe to run on every startup. Queries match every word of the search
+term as a prefix ("pray wor" finds "prayer" and "worship"). If the index for a
+table is not available the old ILIKE scan is used instead.
+"""
+
+import re
+from typing import List, Optional, Sequence
+
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+
+from database import engine
+from models import Announcement, Event, LibraryItem, Podcast
+
+# Columns indexed per model, most important first (weighted in that order)
+SEARCH_TARGETS = {
+    "podcasts": (Podcast, ["title", "host", "description", "transcript"]),
+    "library_items": (LibraryItem, ["title", "author", "description", "content"]),
+    "events": (Event, ["title", "description", "location"]),
+    "announcements": (Announcement, ["title", "content"]),
+}
+
+# Text search configuration for PostgreSQL (stemming, stop words)
+TS_CONFIG = "english"
+PG_WEIGHTS = ["A", "B", "C", "D"]
+# bm25() column weights for SQLite, matching the PostgreSQL A-D weights
+FTS_WEIGHTS = [10.0, 5.0, 2.0, 1.0]
+
+# Cap on words taken from a search term
+MAX_SEARCH_TERMS = 8
+
+# Tables whose search index is in place (filled by ensure_search_indexes)
+_indexed_tables = set()
+
+
+def _pg_vector_expression(columns: Sequence[str]) -> str:
+    parts = []
+    for position, name in enumerate(columns):
+        weight = PG_WEIGHTS[min(position, len(PG_WEIGHTS) - 1)]
+        parts.append(f"setweight(to_tsvector('{TS_CONFIG}', coalesce({name}, '')), '{weight}')")
+    return " || ".join(parts)
+
+
+def _ensure_postgres(conn, table_name: str, columns: Sequence[str]) -> None:
+    conn.execute(text(
+        f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({_pg_vector_expression(columns)}) STORED"
+    ))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search_vector "
+        f"ON {table_name} USING GIN (search_vector)"
+    ))
+
+
+def _ensure_sqlite(conn, table_name: str, columns: Sequence[str]) -> None:
+    fts_name = f"{table_name}_fts"
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": fts_name}
+    ).first()
+    if not exists:
+        # No porter stemmer: it would stem the prefix too ("pray" -> "prai")
+        # and "pray*" would stop matching "prayer"
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {fts_name} USING fts5("
+            f"{column_list}, content='{table_name}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        ))
+
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts_name}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    # Only re-index when an indexed column changes (not on play/view counter updates)
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_au AFTER UPDATE OF {column_list} ON {table_name} BEGIN "
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts_name}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+    ))
+
+    if not exists:
+        # Index rows that were there before the search table existed
+        conn.execute(text(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')"))
+
+
+def ensure_search_indexes(bind=None) -> None:
+    """Create the search columns/tables, indexes and triggers if missing."""
+    bind = bind or engine
+    dialect = bind.dialect.name
+    for table_name, (_, columns) in SEARCH_TARGETS.items():
+        try:
+            with bind.begin() as conn:
+                if dialect == "postgresql":
+                    _ensure_postgres(conn, table_name, columns)
+                elif dialect == "sqlite":
+                    _ensure_sqlite(conn, table_name, columns)
+                else:
+                    continue
+            _indexed_tables.add(table_name)
+        except Exception as e:
+            _indexed_tables.discard(table_name)
+            print(f"⚠️  Search index for {table_name} unavailable, using ILIKE: {e}")
+    if _indexed_tables:
+        print(f"✅ Full-text search ready for: {', '.join(sorted(_indexed_tables))}")
+
+
+def search_terms(term: Optional[str]) -> List[str]:
+    """Split a user search term into the words used for prefix matching."""
+    if not term:
+        return []
+    return re.findall(r"\w+", term.lower())[:MAX_SEARCH_TERMS]
+
+
+def _fts_table(table_name: str):
+    fts_name = f"{table_name}_fts"
+    return table(fts_name, column("rowid"), column(fts_name))
+
+
+def _match_condition(table_name: str, terms: Sequence[str]):
+    """Index match for the terms: (condition, rank expression, FTS table or None)."""
+    if engine.dialect.name == "postgresql":
+        query = func.to_tsquery(TS_CONFIG, " & ".join(f"{word}:*" for word in terms))
+        vector = literal_column(f"{table_name}.search_vector")
+        return vector.op("@@")(query), func.ts_rank(vector, query).desc(), None
+
+    fts = _fts_table(table_name)
+    fts_name = f"{table_name}_fts"
+    query = " ".join(f'"{word}"*' for word in terms)
+    weights = ", ".join(str(weight) for weight in FTS_WEIGHTS[:len(SEARCH_TARGETS[table_name][1])])
+    # bm25() is lower-is-better
+    rank = literal_column(f"bm25({fts_name}, {weights})")
+    return fts.c[fts_name].op("MATCH")(query), rank, fts
+
+
+def _ilike_condition(model, columns: Sequence[str], term: str):
+    search_term = f"%{term}%"
+    return or_(*(getattr(model, name).ilike(search_term) for name in columns))
+
+
+def search_filter(model, term: str):
+    """
+    WHERE clause matching ``term`` for a list endpoint's ``search`` parameter.
+    Uses the full-text index when available, ILIKE otherwise.
+    """
+    table_name = model.__tablename__
+    _, columns = SEARCH_TARGETS[table_name]
+    terms = search_terms(term)
+    if table_name not in _indexed_tables or not terms:
+        return _ilike_condition(model, columns, term)
+
+    condition, _, fts = _match_condition(table_name, terms)
+    if fts is None:
+        return condition
+    return model.id.in_(select(fts.c.rowid).where(condition))
+
+
+def ranked_search_query(model, term: str):
+    """SELECT for ``model`` rows matching ``term``, best match first."""
+    table_name = model.__tablename__
+    _, columns = SEARCH_TARGETS[table_name]
+    terms = search_terms(term)
+    if table_name not in _indexed_tables or not terms:
+        return select(model).where(_ilike_condition(model, columns, term)).order_by(model.id.desc())
+
+    condition, rank, fts = _match_condition(table_name, terms)
+    query = select(model)
+    if fts is not None:
+        query = query.join(fts, fts.c.rowid == model.id)
+    return query.where(condition).order_by(rank)
@@ -0,0 +1,140 @@
+"""
+Application startup: database schema setup and the backfills that follow it.
+
+STARTUP_MODE=lazy (the default) lets uvicorn accept connections right away:
+the connection test, create_all, the ensure_* schema helpers and the storage
+usage reconcile run in a background task started from the lifespan, retried
+every STARTUP_RETRY_INTERVAL seconds until the database answers. /api/health
+answers from the first moment; /api/ready returns 503 until the schema is in
+place.
+
+STARTUP_MODE=eager keeps the old behaviour: the schema is set up while main.py
+is imported and the backfills run before the server starts listening.
+"""
+
+import asyncio
+import os
+import time
+from typing import Optional
+
+import anyio
+
+from database import check_database_connection, engine
+from file_server import reconcile_storage_usage
+from models import Base, ensure_columns, ensure_indexes
+from utils.audio_metadata import start_audio_backfill
+from utils.hls import backfill_hls
+from utils.peaks import backfill_peaks
+from utils.search import ensure_search_indexes
+from utils.stats import rebuild_daily_stats
+
+STARTUP_MODE = os.getenv("STARTUP_MODE", "lazy").lower()
+STARTUP_RETRY_INTERVAL = float(os.getenv("STARTUP_RETRY_INTERVAL", "5"))
+
+
+def prepare_database() -> bool:
+    """Create tables and bring columns/indexes up to date; returns whether it succeeded."""
+    try:
+        print("Initializing database tables...")
+        if not check_database_connection():
+            return False
+        Base.metadata.create_all(bind=engine)
+        # Columns and indexes added to existing tables (audio metadata, pagination indexes, ...)
+        ensure_columns(engine)
+        ensure_indexes(engine)
+        # Full-text search columns/tables, indexes and triggers
+        ensure_search_indexes()
+        print("✅ Database tables ready")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating database tables: {e}")
+        import traceback
+        traceback.print_exc()
+        print("   Check Railway logs and DATABASE_URL configuration")
+        return False
+
+
+def run_backfills_sync() -> None:
+    """Backfills for data stored before a feature existed (each skips what is done)."""
+    # Duration/bitrate for podcasts uploaded before audio metadata was stored
+    start_audio_backfill()
+    # HLS packaging (PODCAST_HLS_ENABLED) for podcasts that have no playlist yet
+    backfill_hls()
+    # Waveform peaks for podcasts uploaded before they were computed
+    backfill_peaks()
+    # Admin dashboard counts (STATS_TABLE_ENABLED) from the source tables
+    rebuild_daily_stats()
+
+
+class Startup:
+    """Readiness of the application and the background task that gets it there."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.database_ready = False
+        self.ready = False
+        self.attempts = 0
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def prepare(self) -> None:
+        """Eager mode: set up the schema now, blocking the import of main.py."""
+        self.attempts += 1
+        self.database_ready = prepare_database()
+
+    async def _run(self) -> None:
+        while not self.database_ready:
+            self.attempts += 1
+            self.database_ready = await anyio.to_thread.run_sync(prepare_database)
+            if not self.database_ready:
+                print(f"⚠️  Database not ready, retrying in {STARTUP_RETRY_INTERVAL:g}s")
+                await asyncio.sleep(STARTUP_RETRY_INTERVAL)
+        if self.mode != "eager":
+            try:
+                await anyio.to_thread.run_sync(reconcile_storage_usage)
+            except Exception as e:
+                print(f"⚠️ Storage usage reconcile failed: {e}")
+        self._mark_ready()
+        try:
+            await anyio.to_thread.run_sync(run_backfills_sync)
+        except Exception as e:
+            print(f"⚠️ Startup backfill failed: {e}")
+
+    def _mark_ready(self) -> None:
+        self.ready = True
+        self.ready_at = time.time()
+        print(f"✅ Application ready ({self.ready_at - self.started_at:.1f}s after import)")
+
+    async def start(self) -> None:
+        """
+        Called from the lifespan. Eager mode with a working database runs the
+        backfills before returning; otherwise everything left is a background task.
+        """
+        if self.mode == "eager" and self.database_ready:
+            await anyio.to_thread.run_sync(run_backfills_sync)
+            self._mark_ready()
+        elif self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "mode": self.mode,
+            "database": self.database_ready,
+            "attempts": self.attempts,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "ready_after_seconds": round(self.ready_at - self.started_at, 1) if self.ready_at else None,
+        }
+
+
+startup = Startup(STARTUP_MODE)
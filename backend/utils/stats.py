@@ -0,0 +1,262 @@
+"""
+Admin dashboard statistics in one query per endpoint.
+
+A ``StatSet`` is a group of named counts over one table: every row, rows with
+a column equal to a value, and rows created in the last N days. By default
+they are computed with a single SELECT of conditional aggregates
+(``COUNT(*) FILTER (WHERE ...)`` on PostgreSQL, ``COUNT(CASE WHEN ... THEN 1
+END)`` elsewhere), so the table is scanned once instead of once per count.
+
+With STATS_TABLE_ENABLED=true the counts are also kept in ``daily_stats``,
+one row per metric and per day the counted rows were created. ORM mapper
+events adjust it in the same transaction as every insert, update and delete
+of a counted table, and the endpoints then sum a few dozen small rows instead
+of scanning (the "last N days" windows become whole days).
+``rebuild_daily_stats()`` recomputes the table from the source tables at
+startup, which also repairs drift from writes made outside the ORM (SQL
+scripts, bulk updates); until it has run, the aggregate query is used.
+"""
+
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, inspect, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import engine
+from models import DailyStat, PrayerRequest, User
+
+STATS_TABLE_ENABLED = os.getenv("STATS_TABLE_ENABLED", "false").lower() == "true"
+
+# Day used for rows without a creation time
+_NO_DAY = date(1970, 1, 1)
+
+
+def count_where(condition):
+    """COUNT of the rows matching ``condition``, as a conditional aggregate."""
+    if engine.dialect.name == "postgresql":
+        return func.count().filter(condition)
+    return func.count(case((condition, 1)))
+
+
+def _upsert_statement():
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    table = DailyStat.__table__
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.metric, table.c.day],
+        set_={"value": table.c.value + stmt.excluded.value},
+    )
+
+
+def _utc_date(column):
+    """SQL date of a timestamp column in UTC, matching ``_day()`` for the mapper events."""
+    if engine.dialect.name == "postgresql":
+        # date() alone would use the session time zone
+        return func.date(func.timezone("UTC", column))
+    # SQLite stores naive UTC, and date() converts values with an offset to UTC
+    return func.date(column)
+
+
+def _day(value) -> date:
+    """UTC date of a created_at value."""
+    if value is None:
+        return _NO_DAY
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date()
+    return value
+
+
+class StatSet:
+    """Named counts over one table; see the module docstring."""
+
+    def __init__(
+        self,
+        model,
+        counts: Dict[str, Optional[Tuple[str, Any]]],
+        recent: Dict[str, int],
+    ):
+        # counts: name -> None (every row) or (column, value); recent: name -> days
+        self.model = model
+        self.counts = counts
+        self.recent = recent
+        self.total = next(name for name, condition in counts.items() if condition is None)
+        self.table_ready = False
+
+    def metric(self, name: str) -> str:
+        return f"{self.model.__tablename__}.{name}"
+
+    def _condition(self, name: str):
+        column, value = self.counts[name]
+        return getattr(self.model, column) == value
+
+    def _cutoff(self, days: int) -> datetime:
+        return datetime.utcnow() - timedelta(days=days)
+
+    def aggregate_query(self):
+        """The single SELECT over the source table."""
+        columns = []
+        for name, condition in self.counts.items():
+            columns.append((func.count() if condition is None else count_where(self._condition(name))).label(name))
+        for name, days in self.recent.items():
+            columns.append(count_where(self.model.created_at >= self._cutoff(days)).label(name))
+        return select(*columns).select_from(self.model)
+
+    def table_query(self):
+        """The single SELECT over daily_stats."""
+        value = DailyStat.value
+        columns = [
+            func.coalesce(func.sum(case((DailyStat.metric == self.metric(name), value), else_=0)), 0).label(name)
+            for name in self.counts
+        ]
+        total_metric = self.metric(self.total)
+        for name, days in self.recent.items():
+            recent = and_(DailyStat.metric == total_metric, DailyStat.day >= self._cutoff(days).date())
+            columns.append(func.coalesce(func.sum(case((recent, value), else_=0)), 0).label(name))
+        return select(*columns).where(DailyStat.metric.in_([self.metric(name) for name in self.counts]))
+
+    async def read(self, db: AsyncSession) -> Dict[str, int]:
+        query = self.table_query() if self.table_ready else self.aggregate_query()
+        row = (await db.execute(query)).one()
+        return {name: int(value or 0) for name, value in row._mapping.items()}
+
+    # daily_stats maintenance
+
+    def _matches(self, values: Dict[str, Any]) -> Dict[str, int]:
+        return {
+            name: 1 if condition is None or values.get(condition[0]) == condition[1] else 0
+            for name, condition in self.counts.items()
+        }
+
+    def _apply(self, connection, day: date, deltas: Dict[str, int]) -> None:
+        rows = [
+            {"metric": self.metric(name), "day": day, "value": delta}
+            for name, delta in deltas.items() if delta
+        ]
+        if rows:
+            connection.execute(_upsert_statement(), rows)
+
+    def _created_day(self, connection, target) -> date:
+        created_at = target.__dict__.get("created_at")
+        if created_at is None and target.id is not None:
+            table = self.model.__table__
+            created_at = connection.scalar(select(table.c.created_at).where(table.c.id == target.id))
+        return _day(created_at)
+
+    def _current_values(self, connection, target) -> Dict[str, Any]:
+        columns = {column for column, _ in filter(None, self.counts.values())}
+        values = {column: target.__dict__[column] for column in columns if column in target.__dict__}
+        # Expired or never loaded attributes are read from the row
+        missing = sorted(columns - set(values))
+        if missing and target.id is not None:
+            table = self.model.__table__
+            row = connection.execute(
+                select(*(table.c[column] for column in missing)).where(table.c.id == target.id)
+            ).first()
+            if row is not None:
+                values.update(row._mapping)
+        return values
+
+    def _after_insert(self, mapper, connection, target) -> None:
+        # created_at comes from the database clock; it is "now" either way
+        day = _day(target.__dict__.get("created_at") or datetime.utcnow())
+        self._apply(connection, day, self._matches(self._current_values(connection, target)))
+
+    def _before_update(self, mapper, connection, target) -> None:
+        state = inspect(target)
+        new_values = self._current_values(connection, target)
+        old_values = dict(new_values)
+        for column in new_values:
+            history = state.attrs[column].history
+            if history.deleted:
+                old_values[column] = history.deleted[0]
+        if old_values == new_values:
+            return
+        old, new = self._matches(old_values), self._matches(new_values)
+        self._apply(connection, self._created_day(connection, target), {
+            name: new[name] - old[name] for name in self.counts
+        })
+
+    def _before_delete(self, mapper, connection, target) -> None:
+        # Values as stored, not as edited in this session
+        values = self._current_values(connection, target)
+        state = inspect(target)
+        for column in values:
+            history = state.attrs[column].history
+            if history.deleted:
+                values[column] = history.deleted[0]
+        self._apply(connection, self._created_day(connection, target), {
+            name: -matched for name, matched in self._matches(values).items()
+        })
+
+    def listen(self) -> None:
+        """Keep daily_stats up to date on ORM writes to this table."""
+        event.listen(self.model, "after_insert", self._after_insert)
+        event.listen(self.model, "before_update", self._before_update)
+        event.listen(self.model, "before_delete", self._before_delete)
+
+    def rebuild(self) -> None:
+        """Recompute this set's daily_stats rows from the source table."""
+        day = func.coalesce(_utc_date(self.model.created_at), literal(_NO_DAY))
+        columns = [
+            (func.count() if condition is None else count_where(self._condition(name))).label(name)
+            for name, condition in self.counts.items()
+        ]
+        with engine.begin() as conn:
+            rows = conn.execute(select(day.label("day"), *columns).select_from(self.model).group_by(day)).all()
+            conn.execute(delete(DailyStat).where(DailyStat.metric.in_([self.metric(name) for name in self.counts])))
+            values = [
+                {"metric": self.metric(name), "day": _day(row.day), "value": row._mapping[name]}
+                for row in rows for name in self.counts if row._mapping[name]
+            ]
+            if values:
+                conn.execute(DailyStat.__table__.insert(), values)
+        self.table_ready = True
+
+
+USER_STATS = StatSet(
+    User,
+    counts={
+        "total_users": None,
+        "active_users": ("is_active", True),
+        "admin_users": ("is_admin", True),
+    },
+    recent={"recent_registrations": 30},
+)
+
+PRAYER_STATS = StatSet(
+    PrayerRequest,
+    counts={
+        "total_requests": None,
+        "pending_requests": ("status", "pending"),
+        "in_progress_requests": ("status", "in_progress"),
+        "answered_requests": ("status", "answered"),
+        "private_requests": ("is_private", True),
+    },
+    recent={"recent_requests": 7},
+)
+
+STAT_SETS = (USER_STATS, PRAYER_STATS)
+
+if STATS_TABLE_ENABLED:
+    for stat_set in STAT_SETS:
+        stat_set.listen()
+
+
+def rebuild_daily_stats() -> None:
+    """Rebuild daily_stats (STATS_TABLE_ENABLED) and switch the endpoints over to it."""
+    if not STATS_TABLE_ENABLED:
+        return
+    for stat_set in STAT_SETS:
+        try:
+            stat_set.rebuild()
+        except Exception as e:
+            print(f"⚠️ Rebuilding daily stats for {stat_set.model.__tablename__} failed: {e}")
+    print("📊 Daily stats rebuilt")
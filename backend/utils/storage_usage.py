@@ -0,0 +1,191 @@
+"""
+Incrementally maintained storage usage (file counts and bytes per directory).
+
+Usage lives in a small SQLite file next to the storage it describes, one row
+per storage directory (``podcasts/audio``, ``images/events``, ...). Saves
+and deletes in file_server update their row as they happen, so reading the
+totals never touches the files themselves.
+
+Each row also remembers the directory's mtime. ``reconcile()`` re-scans only
+directories whose mtime no longer matches, which picks up files added or
+removed behind file_server's back (manual copies, a fresh volume). A change
+made through file_server only moves the stored mtime forward if the row was
+current beforehand; otherwise the directory stays marked for a re-scan.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import anyio
+
+STORAGE_RECONCILE_INTERVAL = float(os.getenv("STORAGE_RECONCILE_INTERVAL", "300"))
+
+
+class UsageChange:
+    """Counts and bytes added to or removed from one directory."""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+
+    def add(self, size: int) -> None:
+        self.files += 1
+        self.bytes += size
+
+    def remove(self, size: int) -> None:
+        self.files -= 1
+        self.bytes -= size
+
+
+def _dir_mtime(directory: Path) -> Optional[int]:
+    try:
+        return directory.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def scan_directory(directory: Path) -> Dict[str, int]:
+    """Count the files directly in ``directory`` (temp and hidden files excluded)."""
+    files = 0
+    total = 0
+    if directory.exists():
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                    continue
+                files += 1
+                total += entry.stat(follow_symlinks=False).st_size
+    return {"files": files, "bytes": total}
+
+
+class StorageUsage:
+    """Per-directory usage rows in SQLite, updated on every save and delete."""
+
+    def __init__(self, db_path: Path, root_dir: Path):
+        self.db_path = db_path
+        self.root_dir = root_dir
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._task: Optional[asyncio.Task] = None
+        self.last_reconcile: Optional[float] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS storage_usage ("
+                "directory TEXT PRIMARY KEY, file_count INTEGER NOT NULL, "
+                "total_bytes INTEGER NOT NULL, mtime_ns INTEGER)"
+            )
+        return self._conn
+
+    def _key(self, directory: Path) -> str:
+        return Path(directory).relative_to(self.root_dir).as_posix()
+
+    @contextmanager
+    def change(self, directory: Path) -> Iterator[UsageChange]:
+        """
+        Wrap a change to the files in ``directory``; record what was added or
+        removed on the yielded UsageChange. Failures here never fail the save.
+        """
+        with self._lock:
+            before = _dir_mtime(directory)
+            usage = UsageChange()
+            yield usage
+            if not usage.files and not usage.bytes:
+                return
+            try:
+                after = _dir_mtime(directory)
+                conn = self._connection()
+                key = self._key(directory)
+                row = conn.execute(
+                    "SELECT mtime_ns FROM storage_usage WHERE directory = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    # Never scanned: leave it to reconcile() rather than count from zero
+                    return
+                mtime_ns = after if row[0] == before else row[0]
+                conn.execute(
+                    "UPDATE storage_usage SET file_count = file_count + ?, "
+                    "total_bytes = total_bytes + ?, mtime_ns = ? WHERE directory = ?",
+                    (usage.files, usage.bytes, mtime_ns, key)
+                )
+            except (sqlite3.Error, ValueError) as e:
+                print(f"⚠️ Storage usage update failed: {e}")
+
+    def reconcile(self, directories: Iterable[Path]) -> int:
+        """Re-scan the directories whose mtime changed; returns how many were scanned."""
+        scanned = 0
+        with self._lock:
+            conn = self._connection()
+            stored = {
+                key: mtime_ns
+                for key, mtime_ns in conn.execute("SELECT directory, mtime_ns FROM storage_usage")
+            }
+            for directory in directories:
+                key = self._key(directory)
+                mtime_ns = _dir_mtime(directory)
+                if key in stored and stored[key] == mtime_ns:
+                    continue
+                usage = scan_directory(directory)
+                conn.execute(
+                    "INSERT OR REPLACE INTO storage_usage (directory, file_count, total_bytes, mtime_ns) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, usage["files"], usage["bytes"], mtime_ns)
+                )
+                scanned += 1
+            self.last_reconcile = time.time()
+        return scanned
+
+    def stats(self) -> dict:
+        """Totals per category and subcategory, from the stored rows only."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT directory, file_count, total_bytes FROM storage_usage ORDER BY directory"
+            ).fetchall()
+        categories: Dict[str, dict] = {}
+        total_files = 0
+        total_bytes = 0
+        for directory, file_count, total in rows:
+            category, _, subcategory = directory.partition("/")
+            entry = categories.setdefault(category, {"files": 0, "bytes": 0, "subcategories": {}})
+            entry["files"] += file_count
+            entry["bytes"] += total
+            entry["subcategories"][subcategory or category] = {"files": file_count, "bytes": total}
+            total_files += file_count
+            total_bytes += total
+        return {
+            "total_files": total_files,
+            "total_size_bytes": total_bytes,
+            "categories": categories,
+            "last_reconcile": self.last_reconcile,
+        }
+
+    async def _run(self, directories: Callable[[], List[Path]], interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await anyio.to_thread.run_sync(self.reconcile, directories())
+            except Exception as e:
+                print(f"⚠️ Storage usage reconcile failed: {e}")
+
+    def start(self, directories: Callable[[], List[Path]], interval: float = STORAGE_RECONCILE_INTERVAL) -> None:
+        """Start the periodic reconcile task (called on application startup)."""
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._run(directories, interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,226 @@
+"""
+Range-serving engine for local audio files.
+
+Single byte ranges are handed to the ASGI server when it supports a
+zero-copy extension (``http.response.zerocopysend`` is the ASGI form of
+``os.sendfile``; ``http.response.pathsend`` covers whole-file ranges).
+Otherwise the file is read in large chunks on a worker thread so the event
+loop never blocks on disk I/O.
+
+Stored files can be rewritten in place under the same URL (the fast-start
+remux moves the moov atom to the front), so every response carries an ETag
+and Last-Modified from the file's stat, and a ranged request whose
+``If-Range`` no longer matches gets the whole file instead of a 206 that a
+cache would splice onto bytes of the old layout.
+"""
+
+import hashlib
+import os
+import re
+from email.utils import formatdate
+from typing import Dict, Mapping, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Large reads keep the number of thread hops per range low
+READ_CHUNK_SIZE = 256 * 1024
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``Range: bytes=...`` header into an inclusive (start, end).
+
+    Returns None when the header is not a single byte range we understand (the
+    caller should then serve the whole file). Raises a 416 HTTPException when
+    the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+
+    if not start_str:
+        # Suffix range (e.g. "bytes=-500" means the last 500 bytes)
+        suffix_length = int(end_str)
+        if suffix_length == 0 or file_size == 0:
+            raise range_not_satisfiable(file_size)
+        start = max(file_size - suffix_length, 0)
+        end = file_size - 1
+    else:
+        start = int(start_str)
+        end = int(end_str) if end_str else file_size - 1
+        # Clients may ask past the end of the file; clamp to the last byte
+        end = min(end, file_size - 1)
+
+    if start >= file_size or start > end:
+        raise range_not_satisfiable(file_size)
+
+    return start, end
+
+
+def content_range_covers_file(content_range: Optional[str]) -> bool:
+    """True when a Content-Range header (``bytes 0-N/total``) spans the whole file."""
+    if not content_range:
+        return False
+    match = re.match(r"^bytes 0-(\d+)/(\d+)$", content_range.strip())
+    return bool(match) and int(match.group(1)) + 1 == int(match.group(2))
+
+
+def file_validators(stat_result: os.stat_result) -> Dict[str, str]:
+    """
+    ETag and Last-Modified for a file. The inode is part of the ETag because a
+    replaced file can come back with the same size (and, with hard-linked
+    blobs, an older mtime).
+    """
+    etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}-{stat_result.st_ino}"
+    return {
+        "ETag": f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"',
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+
+
+def if_range_matches(if_range: Optional[str], validators: Mapping[str, str]) -> bool:
+    """
+    Whether a Range request may be answered with a 206: no ``If-Range``, or
+    one naming the current ETag (strong comparison) or Last-Modified date.
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith("W/"):
+        return False
+    return if_range in (validators["ETag"], validators["Last-Modified"])
+
+
+def range_not_satisfiable(file_size: int) -> HTTPException:
+    """Build the 416 error for a range outside the file."""
+    return HTTPException(
+        status_code=416,
+        detail="Range Not Satisfiable",
+        headers={"Content-Range": f"bytes */{file_size}"}
+    )
+
+
+def _read_chunk(file_obj, offset: int, size: int) -> bytes:
+    """Blocking positional read, run on a worker thread."""
+    file_obj.seek(offset)
+    return file_obj.read(size)
+
+
+class RangeFileResponse(Response):
+    """
+    Serve ``start..end`` (inclusive) of a file as a 206 Partial Content response.
+
+    Picks the cheapest transport the ASGI server offers for the range and falls
+    back to thread-offloaded reads of READ_CHUNK_SIZE bytes. With
+    ``stat_result`` the response carries the file's ETag and Last-Modified.
+    """
+
+    chunk_size = READ_CHUNK_SIZE
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        file_size: int,
+        status_code: int = 206,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        stat_result: Optional[os.stat_result] = None,
+    ) -> None:
+        self.path = path
+        self.start = start
+        self.end = end
+        self.file_size = file_size
+        self.content_length = end - start + 1
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(self.content_length)
+        if status_code == 206:
+            self.headers["content-range"] = f"bytes {start}-{end}/{file_size}"
+        self.headers.setdefault("accept-ranges", "bytes")
+        if stat_result is not None:
+            for name, value in file_validators(stat_result).items():
+                self.headers.setdefault(name.lower(), value)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope.get("method", "GET").upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        whole_file = self.start == 0 and self.end == self.file_size - 1
+
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file_obj:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file_obj,
+                    "offset": self.start,
+                    "count": self.content_length,
+                    "more_body": False,
+                })
+            return
+
+        if whole_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        async with anyio.create_task_group() as task_group:
+
+            async def stream_range() -> None:
+                await self._send_chunks(send)
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(stream_range)
+
+            # Stop reading from disk as soon as the listener goes away (seeks
+            # abort the previous range request all the time)
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    task_group.cancel_scope.cancel()
+                    break
+
+    async def _send_chunks(self, send: Send) -> None:
+        """Read the range on a worker thread and forward it chunk by chunk."""
+        file_obj = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            offset = self.start
+            remaining = self.content_length
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(
+                    _read_chunk, file_obj, offset, min(self.chunk_size, remaining)
+                )
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                # File shrank underneath us; close the body cleanly
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(file_obj.close)
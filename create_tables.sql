@@ -104,6 +104,13 @@ CREATE TABLE IF NOT EXISTS podcasts (
     plays INTEGER DEFAULT 0,
     tags VARCHAR(255),
     audio_url VARCHAR(500),
+    duration_seconds DOUBLE PRECISION,
+    bitrate INTEGER,
+    sample_rate INTEGER,
+    audio_codec VARCHAR(50),
+    moov_offset BIGINT,
+    faststart BOOLEAN,
+    peaks_version VARCHAR(64),
     transcript TEXT,
     created_by INTEGER REFERENCES users(id),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
@@ -181,6 +188,27 @@ CREATE TABLE IF NOT EXISTS announcements (
 CREATE INDEX IF NOT EXISTS idx_announcements_date ON announcements(date);
 CREATE INDEX IF NOT EXISTS idx_announcements_is_active ON announcements(is_active);
 
+-- Listening progress (resume positions)
+CREATE TABLE IF NOT EXISTS listening_progress (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    podcast_id INTEGER NOT NULL REFERENCES podcasts(id) ON DELETE CASCADE,
+    position_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    duration_seconds DOUBLE PRECISION,
+    completed BOOLEAN DEFAULT FALSE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (user_id, podcast_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_listening_progress_user_id_updated_at ON listening_progress(user_id, updated_at);
+
+-- Admin dashboard counts per day (STATS_TABLE_ENABLED)
+CREATE TABLE IF NOT EXISTS daily_stats (
+    metric VARCHAR NOT NULL,
+    day DATE NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, day)
+);
+
 -- Success message
 DO $$
 BEGIN
@@ -5,9 +5,13 @@ Shows file count, sizes, and organization by category.
 """
 
 import os
+import sys
 from pathlib import Path
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+from utils.storage_usage import StorageUsage
+
 # Storage directory (same as in file_server.py)
 STORAGE_DIR = Path(__file__).parent / "storage" / "files"
 
@@ -39,31 +43,31 @@ def format_size(size_bytes):
     return f"{size_bytes:.2f} PB"
 
 
-def get_directory_info(directory_path):
-    """Get information about files in a directory."""
+def get_directory_info(directory_path, usage, max_files=None):
+    """
+    Get information about files in a directory. Count and total size come
+    from the storage usage index; only the listed files are stat()ed.
+    """
     if not directory_path.exists():
         return {"files": [], "count": 0, "total_size": 0}
     
+    names = sorted(
+        entry.name for entry in os.scandir(directory_path)
+        if not entry.name.startswith(".") and entry.is_file()
+    )
     files = []
-    total_size = 0
-    
-    for file_path in directory_path.iterdir():
-        if file_path.is_file():
-            size = file_path.stat().st_size
-            files.append({
-                "name": file_path.name,
-                "size": size,
-                "path": file_path
-            })
-            total_size += size
-    
-    # Sort by name
-    files.sort(key=lambda x: x["name"])
+    for name in names[:max_files]:
+        file_path = directory_path / name
+        files.append({
+            "name": name,
+            "size": file_path.stat().st_size,
+            "path": file_path
+        })
     
     return {
         "files": files,
-        "count": len(files),
-        "total_size": total_size
+        "count": usage["files"],
+        "total_size": usage["bytes"]
     }
 
 
@@ -81,6 +85,13 @@ def list_all_files():
         print("   python backend/file_server.py")
         return
     
+    # Usage index maintained by the server (re-scans only directories that changed)
+    storage_usage = StorageUsage(STORAGE_DIR.parent / "usage.db", STORAGE_DIR)
+    storage_usage.reconcile([path for subdirs in DIRECTORIES.values() for path in subdirs.values()])
+    usage_by_category = storage_usage.stats()["categories"]
+    verbose = "--verbose" in sys.argv or "-v" in sys.argv
+    max_files = 50 if verbose else 10
+    
     total_files = 0
     total_size = 0
     category_stats = defaultdict(lambda: {"count": 0, "size": 0})
@@ -94,7 +105,10 @@ def list_all_files():
         category_size = 0
         
         for subcategory, subdir_path in subdirs.items():
-            info = get_directory_info(subdir_path)
+            subdir_usage = usage_by_category.get(category, {}).get("subcategories", {}).get(
+                subcategory, {"files": 0, "bytes": 0}
+            )
+            info = get_directory_info(subdir_path, subdir_usage, max_files)
             
             if info["count"] > 0:
                 print(f"\n  📁 {subcategory}/")
@@ -102,10 +116,7 @@ def list_all_files():
                 print(f"     Size: {format_size(info['total_size'])}")
                 
                 # List files (limit to 10, show more if verbose)
-                verbose = "--verbose" in sys.argv or "-v" in sys.argv
-                max_files = 50 if verbose else 10
-                
-                for i, file_info in enumerate(info["files"][:max_files]):
+                for i, file_info in enumerate(info["files"]):
                     size_str = format_size(file_info["size"])
                     print(f"     • {file_info['name']} ({size_str})")
                 
@@ -115,7 +126,7 @@ def list_all_files():
                     print(f"     (Use --verbose to see all files)")
                 
                 # Show URL format
-                if info["count"] > 0:
+                if info["files"]:
                     example_file = info["files"][0]
                     relative_path = example_file["path"].relative_to(STORAGE_DIR)
                     url = f"http://localhost:8000/storage/{relative_path.as_posix()}"
@@ -162,6 +173,5 @@ def list_all_files():
 
 
 if __name__ == "__main__":
-    import sys
     list_all_files()
 
@@ -58,7 +58,7 @@ const AdminDashboard = () => {
         userStats,
         prayerStats,
         eventsData,
-        podcastsData,
+        podcastStats,
         libraryData
       ] = await Promise.all([
         memberService.getUserStats().catch(() => ({
@@ -77,7 +77,7 @@ const AdminDashboard = () => {
           recent_requests: 0
         })),
         eventService.getEvents().catch(() => []),
-        podcastService.getPodcasts().catch(() => []),
+        podcastService.getPodcastStats().catch(() => ({ total_podcasts: 0 })),
         libraryService.getLibraryItems().catch(() => [])
       ]);
 
@@ -98,7 +98,7 @@ const AdminDashboard = () => {
         },
         content: {
           events: { total: eventsData.length || 0, loading: false },
-          podcasts: { total: podcastsData.length || 0, loading: false },
+          podcasts: { total: podcastStats.total_podcasts || 0, loading: false },
           library: { total: libraryData.length || 0, loading: false }
         }
       });
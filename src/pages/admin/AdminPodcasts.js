@@ -56,7 +56,7 @@ const AdminPodcasts = () => {
   const loadPodcasts = async () => {
     try {
       setLoading(true);
-      const data = await podcastService.getPodcasts();
+      const data = await podcastService.getPodcasts({ include: 'transcript' }); // the edit form needs transcripts
       setPodcasts(data);
     } catch (error) {
       console.error('Error loading podcasts:', error);
@@ -366,6 +366,11 @@ export const podcastService = {
     return apiRequest(`/api/podcasts/${podcastId}`);
   },
 
+  // Get podcast totals and most played episodes (admin only)
+  async getPodcastStats() {
+    return apiRequest('/api/podcasts/stats');
+  },
+
   async createPodcast(podcastData) {
     return apiRequest('/api/podcasts/', {
       method: 'POST',